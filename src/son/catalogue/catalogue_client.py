@@ -26,9 +26,11 @@
 
 import logging
 import requests
-import yaml
 import sys
+import threading
 import validators
+from son.schema import descriptor_io
+from son.trace import tracer
 
 log = logging.getLogger(__name__)
 
@@ -43,11 +45,19 @@ class CatalogueClient(object):
     CAT_URI_VNF_ID = "/vnfs/id/"                 # Get a specific VNF by id
     CAT_URI_VNF_NAME = "/vnfs/name/"             # GET VNF list by name
 
-    def __init__(self, base_url, auth=('', '')):
+    # Seconds to wait for the server to respond (connect, read)
+    CAT_TIMEOUT = (3.05, 30)
+
+    def __init__(self, base_url, auth=('', ''), timeout=CAT_TIMEOUT):
         # Assign parameters
         self._base_url = base_url
         self._auth = auth   # Just basic auth for now
         self._headers = {'Content-Type': 'application/x-yaml'}
+        self._timeout = timeout
+
+        # Reuse connections to the server across requests. A session
+        # is not thread-safe, so each thread has its own.
+        self._local = threading.local()
 
         # Ensure parameters are valid
         assert validators.url(self._base_url),\
@@ -58,6 +68,14 @@ class CatalogueClient(object):
     def base_url(self):
         return self._base_url
 
+    @property
+    def _session(self):
+        """The session of the calling thread"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
     def alive(self):
         """
         Checks if the catalogue API server is alive and
@@ -67,16 +85,20 @@ class CatalogueClient(object):
         """
         url = self._base_url + CatalogueClient.CAT_URI_BASE
         try:
-            response = requests.get(url,
-                                    auth=self._auth,
-                                    headers=self._headers)
+            with tracer.span('GET', 'http', url=url) as span:
+                response = self._session.get(url,
+                                             auth=self._auth,
+                                             headers=self._headers,
+                                             timeout=self._timeout)
+                span.annotate(status=response.status_code)
 
         except requests.exceptions.InvalidURL:
             log.warning("Invalid URL: '{}'. Please specify "
                         "a valid address to a catalogue server".format(url))
             return False
 
-        except requests.exceptions.ConnectionError:
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout):
             log.warning("Connection Error while contacting '{}'. "
                         "Error message: '{}'".format(url, sys.exc_info()))
             return False
@@ -104,7 +126,7 @@ class CatalogueClient(object):
             return
 
         log.debug("Obtained NS schema:\n{}".format(cat_obj))
-        return yaml.load(cat_obj)
+        return descriptor_io.load(cat_obj)
 
     def post_ns(self, nsd_data):
         """
@@ -150,7 +172,7 @@ class CatalogueClient(object):
             return
 
         log.debug("Obtained VNF schema:\n{}".format(cat_obj))
-        return yaml.load(cat_obj)
+        return descriptor_io.load(cat_obj)
 
     def post_vnf(self, vnf_data):
         """
@@ -184,7 +206,12 @@ class CatalogueClient(object):
         :return:
         """
         url = self._base_url + cat_uri + obj_id
-        response = requests.get(url, auth=self._auth, headers=self._headers)
+        with tracer.span('GET', 'http', url=url) as span:
+            response = self._session.get(url, auth=self._auth,
+                                         headers=self._headers,
+                                         timeout=self._timeout)
+            span.annotate(status=response.status_code)
+            span.count('bytes', len(response.content))
         if not response.status_code == requests.codes.ok:
             return
         return response.text
@@ -200,10 +227,13 @@ class CatalogueClient(object):
         log.debug("Object POST to: {}\n{}".format(url, obj_data))
 
         try:
-            response = requests.post(url,
-                                     data=obj_data,
-                                     auth=self._auth,
-                                     headers=self._headers)
+            with tracer.span('POST', 'http', url=url) as span:
+                response = self._session.post(url,
+                                              data=obj_data,
+                                              auth=self._auth,
+                                              headers=self._headers,
+                                              timeout=self._timeout)
+                span.annotate(status=response.status_code)
             return response
 
         except requests.exceptions.ConnectionError:
@@ -28,12 +28,13 @@ import sys
 import os
 import logging
 import coloredlogs
-import yaml
 from os.path import expanduser
 from son.workspace.workspace import Workspace
 from son.workspace.project import Project
 from son.catalogue.catalogue_client import CatalogueClient
 from son.schema.validator import SchemaValidator
+from son.schema import descriptor_io
+from son.trace import tracer
 
 log = logging.getLogger(__name__)
 
@@ -146,13 +147,12 @@ class Publisher(object):
             return
 
         # Load component descriptor
-        with open(filename, 'r') as compf:
-            compd = yaml.load(compf)
+        compd = descriptor_io.load_descriptor(filename)
 
         # Determine descriptor type of component
         descriptor_type = self._schema_validator.get_descriptor_type(compd)
 
-        comp_data = yaml.dump(compd)
+        comp_data = compd.digested.decode('utf-8')
 
         # Publish to the catalogue servers based on the descriptor type
         errors_publishing = False
@@ -203,8 +203,13 @@ def main():
                         help="Catalogue ID where to publish. "
                              "Overrides defaults in workspace config.")
 
+    tracer.add_arguments(parser)
+
     args = parser.parse_args()
 
+    if args.trace:
+        tracer.trace_to(args.trace, args.trace_format)
+
     # Ensure that either --component or --project
     # argument is given, but not the two simultaneously (XOR)
     if bool(args.component) == bool(args.project):
@@ -0,0 +1,50 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import threading
+import unittest
+from son.catalogue.catalogue_client import CatalogueClient
+
+
+class UnitCatalogueClientTests(unittest.TestCase):
+
+    def test_session_per_thread(self):
+        """
+        Ensures that each thread using a client has its own
+        session, which is reused by its following requests
+        """
+        client = CatalogueClient('http://catalogue.example.com')
+        session = client._session
+        self.assertIs(client._session, session)
+
+        sessions = []
+        thread = threading.Thread(
+            target=lambda: sessions.extend([client._session,
+                                            client._session]))
+        thread.start()
+        thread.join()
+        self.assertIs(sessions[0], sessions[1])
+        self.assertIsNot(sessions[0], session)
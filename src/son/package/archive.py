@@ -0,0 +1,383 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import collections
+import copy
+import hashlib
+import io
+import logging
+import os
+import stat
+import struct
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from son.package.hashing import CHUNK_SIZE, get_buffer
+from son.trace import tracer
+
+log = logging.getLogger(__name__)
+
+# Size of the chunks of a member that are deflated independently.
+# It is fixed, so that the package is the same for any number of jobs.
+DEFLATE_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Maximum number of chunks of a member being compressed or waiting to
+# be written. It bounds the memory used to compress a member, whatever
+# its size and the number of jobs.
+MAX_PENDING_CHUNKS = 8
+
+# Timestamp and attributes (regular file, rw-r--r--) of all the
+# members of reproducible packages. SOURCE_DATE_EPOCH, if set,
+# overrides the timestamp.
+REPRODUCIBLE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+REPRODUCIBLE_ATTR = (stat.S_IFREG | 0o644) << 16
+
+# Zip data descriptor signature and flag
+_DD_SIGNATURE = 0x08074b50
+_FLAG_DATA_DESCRIPTOR = 0x08
+
+
+class HashingWriter(object):
+    """
+    Write-only file object that hashes all the bytes written to
+    the underlying file. It does not support seeking, so zipfile
+    writes the archive as a stream (sizes and CRCs are stored in
+    data descriptors) and every byte is written exactly once.
+    """
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._md5 = hashlib.md5()
+        self._pos = 0
+
+    def write(self, data):
+        self._fileobj.write(data)
+        self._md5.update(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        self._fileobj.flush()
+
+    def hexdigest(self):
+        return self._md5.hexdigest()
+
+
+class PackageArchive(object):
+    """
+    Writes package artifacts straight from their sources into a
+    package file. The MD5 of each member, and of the package itself,
+    is computed from the bytes as they are written, so no artifact
+    has to be read back from disk.
+    """
+
+    def __init__(self, filename, policy=None, jobs=1, reproducible=False):
+        """
+        :param filename: The package file to create
+        :param policy: The CompressionPolicy of the members.
+                       If not specified, members are stored uncompressed.
+        :param jobs: Number of chunks compressed in parallel
+        :param reproducible: Give all the members the same timestamp
+                             and permissions, so that the package only
+                             depends on the names, content and order
+                             of its members
+        """
+        self._filename = filename
+        self._policy = policy
+        self._jobs = max(1, jobs)
+        self._date_time = reproducible_date_time() if reproducible else None
+        self._executor = None
+        self._file = open(filename, 'wb')
+        self._writer = HashingWriter(self._file)
+        self._zip = zipfile.ZipFile(self._writer, 'w')
+        self._md5 = None
+
+        # zipfile only allows one member to be written at a time
+        self._lock = threading.Lock()
+
+    @property
+    def filename(self):
+        return self._filename
+
+    @property
+    def md5(self):
+        """The MD5 of the package, available once it is closed"""
+        return self._md5
+
+    @tracer.traced(category='archive')
+    def add_file(self, src, arcname, content_type=None, md5=None):
+        """
+        Add a file to the package.
+        :param src: The source file
+        :param arcname: The name of the member in the package
+        :param content_type: The package content type of the member
+        :param md5: The MD5 of the file, if already known.
+                    It is then not computed again.
+        :return: The MD5 of the member content
+        """
+        zinfo = zipfile.ZipInfo.from_file(src, arcname)
+        tracer.annotate(file=arcname)
+        tracer.count('bytes', zinfo.file_size)
+        self._set_attributes(zinfo)
+        self._set_compression(zinfo, content_type, src)
+        hasher = None if md5 else hashlib.md5()
+        with open(src, 'rb') as fsrc:
+            self._add_member(fsrc, zinfo, hasher)
+
+        return md5 or hasher.hexdigest()
+
+    def add_bytes(self, data, arcname, content_type=None):
+        """
+        Add a member with the given content to the package.
+        :param data: The content of the member
+        :param arcname: The name of the member in the package
+        :param content_type: The package content type of the member
+        :return: The MD5 of the member content
+        """
+        zinfo = zipfile.ZipInfo(arcname,
+                                date_time=time.localtime()[:6])
+        zinfo.external_attr = 0o644 << 16
+        zinfo.file_size = len(data)
+        self._set_attributes(zinfo)
+        self._set_compression(zinfo, content_type)
+
+        # Written as a file with the same content would be
+        self._add_member(io.BytesIO(data), zinfo)
+
+        return hashlib.md5(data).hexdigest()
+
+    def _add_member(self, fsrc, zinfo, hasher=None):
+        """
+        Add a member, reading its content from a file object.
+        The content is also given to the hasher, if any.
+        """
+        if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+            self._add_deflated_member(fsrc, zinfo, hasher)
+            return
+
+        buf = get_buffer(CHUNK_SIZE)
+        view = memoryview(buf)
+
+        with self._lock, self._zip.open(zinfo, 'w') as member:
+            while True:
+                n = fsrc.readinto(buf)
+                if not n:
+                    break
+                if hasher:
+                    hasher.update(view[:n])
+                member.write(view[:n])
+
+    def _add_deflated_member(self, fsrc, zinfo, hasher=None):
+        """
+        Add a member, compressing its chunks in parallel. Each chunk is
+        an independent raw deflate stream ended by a sync flush, so
+        their concatenation is a valid deflate stream. The local
+        header, data and data descriptor are written here and the
+        member is then registered in the central directory of zipfile.
+        The content is also given to the hasher, if any.
+        """
+        level = self._policy.level if self._policy else -1
+        crc = 0
+        compress_size = 0
+        zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+        zinfo.flag_bits |= _FLAG_DATA_DESCRIPTOR
+
+        with self._lock:
+            executor = self._get_executor()
+            zinfo.header_offset = self._writer.tell()
+            self._writer.write(zinfo.FileHeader(zip64))
+
+            def write_chunk(future):
+                data = future.result()
+                self._writer.write(data)
+                return len(data)
+
+            # Keep a bounded number of chunks in flight, in order
+            pending = collections.deque()
+            while True:
+                data = fsrc.read(DEFLATE_CHUNK_SIZE)
+                if not data:
+                    break
+                if hasher:
+                    hasher.update(data)
+                crc = zlib.crc32(data, crc)
+                pending.append(executor.submit(deflate_chunk, data, level))
+                if len(pending) > min(2 * self._jobs, MAX_PENDING_CHUNKS):
+                    compress_size += write_chunk(pending.popleft())
+
+            while pending:
+                compress_size += write_chunk(pending.popleft())
+
+            # Final empty block, ending the deflate stream
+            end = zlib.compressobj(level, zlib.DEFLATED,
+                                   -zlib.MAX_WBITS).flush()
+            self._writer.write(end)
+            compress_size += len(end)
+
+            zinfo.CRC = crc
+            zinfo.compress_size = compress_size
+            self._writer.write(struct.pack(
+                "<LLQQ" if zip64 else "<LLLL", _DD_SIGNATURE,
+                zinfo.CRC, zinfo.compress_size, zinfo.file_size))
+
+            self._zip.filelist.append(zinfo)
+            self._zip.NameToInfo[zinfo.filename] = zinfo
+            self._zip.start_dir = self._writer.tell()
+
+    def copy_member(self, source, name, arcname=None):
+        """
+        Copy a member of another package as it is stored,
+        without decompressing and compressing it again.
+        :param source: The zipfile.ZipFile of the other package
+        :param name: The name of the member
+        :param arcname: The name of the copy. Default is the same name.
+        """
+        zinfo = copy.copy(source.getinfo(name))
+        if arcname:
+            zinfo.filename = zinfo.orig_filename = arcname
+
+        # Written as the members added to the archive, with the sizes
+        # and CRC in a data descriptor, so that a copied member is
+        # stored exactly as if its content was added again
+        zinfo.flag_bits |= _FLAG_DATA_DESCRIPTOR
+        zinfo.extra = b''
+        zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+
+        with self._lock, open(source.filename, 'rb') as fsrc:
+            # Skip the local header of the source member
+            fsrc.seek(zinfo.header_offset)
+            header = struct.unpack(zipfile.structFileHeader,
+                                   fsrc.read(zipfile.sizeFileHeader))
+            fsrc.seek(header[zipfile._FH_FILENAME_LENGTH] +
+                      header[zipfile._FH_EXTRA_FIELD_LENGTH], os.SEEK_CUR)
+
+            zinfo.header_offset = self._writer.tell()
+            self._writer.write(zinfo.FileHeader(zip64))
+
+            buf = get_buffer(CHUNK_SIZE)
+            view = memoryview(buf)
+            remaining = zinfo.compress_size
+            while remaining:
+                n = fsrc.readinto(view[:min(remaining, len(buf))])
+                if not n:
+                    raise zipfile.BadZipFile(
+                        "Truncated member '{}'".format(name))
+                self._writer.write(view[:n])
+                remaining -= n
+
+            self._writer.write(struct.pack(
+                "<LLQQ" if zip64 else "<LLLL", _DD_SIGNATURE,
+                zinfo.CRC, zinfo.compress_size, zinfo.file_size))
+
+            self._zip.filelist.append(zinfo)
+            self._zip.NameToInfo[zinfo.filename] = zinfo
+            self._zip.start_dir = self._writer.tell()
+
+    def _get_executor(self):
+        # zlib releases the GIL while compressing, so threads
+        # are enough to use several cores
+        if not self._executor:
+            self._executor = ThreadPoolExecutor(max_workers=self._jobs)
+        return self._executor
+
+    def _set_attributes(self, zinfo):
+        if not self._date_time:
+            return
+
+        zinfo.date_time = self._date_time
+        zinfo.external_attr = REPRODUCIBLE_ATTR
+        # Unix attributes, whatever the platform of the build
+        zinfo.create_system = 3
+
+    def _set_compression(self, zinfo, content_type, filename=None):
+        if not self._policy:
+            return
+
+        compress_type, level = \
+            self._policy.compression(content_type, filename)
+        set_compression(zinfo, compress_type, level)
+
+    def close(self):
+        """
+        Finish the package.
+        :return: The MD5 of the package file
+        """
+        if self._md5:
+            return self._md5
+
+        if self._executor:
+            self._executor.shutdown()
+
+        self._zip.close()
+        self._file.close()
+        self._md5 = self._writer.hexdigest()
+        return self._md5
+
+    def discard(self):
+        """Abort the package, removing its file"""
+        self.close()
+        if os.path.isfile(self._filename):
+            os.remove(self._filename)
+
+
+def reproducible_date_time():
+    """
+    Obtain the timestamp of the members of reproducible packages,
+    taken from SOURCE_DATE_EPOCH if it is set.
+    """
+    epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if not epoch:
+        return REPRODUCIBLE_DATE_TIME
+
+    # Zip timestamps can not be older than 1980
+    return max(time.gmtime(int(epoch))[:6], REPRODUCIBLE_DATE_TIME)
+
+
+def deflate_chunk(data, level=-1):
+    """
+    Compress a chunk of data as a raw deflate stream ended by a
+    sync flush, which may be followed by other such streams.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def set_compression(zinfo, compress_type, level):
+    """
+    Set the compression method and level of a zip member.
+    """
+    zinfo.compress_type = compress_type
+    if hasattr(zinfo, 'compress_level'):
+        zinfo.compress_level = level
+    else:
+        # Before Python 3.13, the level is a private attribute
+        zinfo._compresslevel = level
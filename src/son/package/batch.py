@@ -0,0 +1,197 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import glob
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from son.catalogue.catalogue_client import CatalogueClient
+from son.package.package import Packager
+from son.schema.validator import SchemaValidator
+from son.trace import tracer
+from son.workspace.project import Project
+
+log = logging.getLogger(__name__)
+
+
+class BatchPackager(object):
+    """
+    Packages several projects of the same workspace in a single
+    process. The schema validator (and the schemas it loads) and the
+    catalogue clients are shared by all the builds.
+    """
+
+    STATUS_OK = 'OK'
+    STATUS_FAILED = 'FAILED'
+
+    def __init__(self, workspace, dst_path=None, jobs=1, **options):
+        """
+        :param workspace: The workspace of the projects
+        :param dst_path: Folder where the packages are created, each one
+                         in a sub-folder named after its project. If not
+                         specified, each project uses its own target.
+        :param jobs: Number of projects packaged in parallel
+        :param options: Additional options given to each Packager
+        """
+        self._workspace = workspace
+        self._dst_path = dst_path
+        self._jobs = max(1, jobs)
+        self._options = options
+
+        self._schema_validator = SchemaValidator(workspace)
+        self._catalogue_clients = [CatalogueClient(cat['url'])
+                                   for cat in workspace.catalogue_servers]
+
+    def package_projects(self, project_roots):
+        """
+        Package a list of projects.
+        :param project_roots: The root folders of the projects
+        :return: List with a summary (project, status, duration,
+                 package and md5) of each build, in the given order
+        :raise ValueError: If several projects have the same destination
+        """
+        destinations = self.destinations(project_roots)
+
+        # Load all the schemas once, before the builds share them
+        for schema_id in (SchemaValidator.SCHEMA_PACKAGE_DESCRIPTOR,
+                          SchemaValidator.SCHEMA_SERVICE_DESCRIPTOR,
+                          SchemaValidator.SCHEMA_FUNCTION_DESCRIPTOR):
+            self._schema_validator.load_schema(schema_id)
+
+        log.info("Packaging {} projects using {} jobs"
+                 .format(len(project_roots), self._jobs))
+
+        with ThreadPoolExecutor(max_workers=self._jobs) as executor:
+            return list(executor.map(tracer.propagate(self.package_project),
+                                     project_roots, destinations))
+
+    def destinations(self, project_roots):
+        """
+        Obtain the destination folder of each project, named after the
+        project folder. If several project folders have the same name,
+        each destination is named after the path of the project
+        relative to the common folder of all the projects instead,
+        e.g. 'a-prj' and 'b-prj' for 'a/prj' and 'b/prj'.
+        :param project_roots: The root folders of the projects
+        :return: List with the destination of each project, in the
+                 given order. None for each one if no destination
+                 folder was specified, i.e. each project uses its own.
+        :raise ValueError: If several projects have the same destination
+        """
+        if not self._dst_path:
+            return [None] * len(project_roots)
+
+        roots = [os.path.abspath(prj_root) for prj_root in project_roots]
+        names = [os.path.basename(root) for root in roots]
+        if len(set(names)) < len(names):
+            common = os.path.commonpath(roots)
+            if common in roots:
+                # A project holds the others, name it after its folder
+                common = os.path.dirname(common)
+            names = [os.path.relpath(root, common).replace(os.sep, '-')
+                     for root in roots]
+
+        duplicates = sorted({name for name in names
+                             if names.count(name) > 1})
+        if duplicates:
+            raise ValueError("Several projects would be packaged in the "
+                             "same destination: {}"
+                             .format(', '.join(duplicates)))
+
+        return [os.path.join(self._dst_path, name) for name in names]
+
+    @tracer.traced(category='packager')
+    def package_project(self, prj_root, dst_path=None):
+        """
+        Package a single project.
+        :param prj_root: The root folder of the project
+        :param dst_path: The destination folder of the package.
+                         If not specified, the project target.
+        :return: The summary of the build
+        """
+        summary = {'project': prj_root,
+                   'status': BatchPackager.STATUS_FAILED,
+                   'duration': 0.0,
+                   'package': None,
+                   'md5': None}
+
+        tracer.annotate(project=prj_root)
+        start = time.perf_counter()
+        try:
+            project = Project.__create_from_descriptor__(self._workspace,
+                                                         prj_root)
+            if project:
+                pck = Packager(self._workspace, project, dst_path=dst_path,
+                               schema_validator=self._schema_validator,
+                               catalogue_clients=self._catalogue_clients,
+                               **self._options)
+
+                summary['md5'] = pck.generate_package(None)
+                summary['package'] = pck.package_file
+                summary['status'] = BatchPackager.STATUS_OK
+
+        except SystemExit:
+            # Packager exits on fatal errors
+            log.error("Failed to package project '{}'".format(prj_root))
+
+        except Exception:
+            log.exception("Unexpected error packaging project '{}'"
+                          .format(prj_root))
+
+        summary['duration'] = time.perf_counter() - start
+        return summary
+
+
+def find_projects(patterns):
+    """
+    Obtain the project root folders matching a list of paths or globs.
+    :param patterns: The paths or glob patterns
+    :return: Sorted list of project root folders
+    """
+    projects = set()
+    for pattern in patterns:
+        for path in glob.glob(os.path.expanduser(pattern)):
+            if os.path.isfile(os.path.join(path, Project.__descriptor_name__)):
+                projects.add(os.path.normpath(path))
+
+    return sorted(projects)
+
+
+def print_summary(summaries, file=sys.stdout):
+    """
+    Print the summary of a batch of builds.
+    """
+    width = max([len(s['project']) for s in summaries] + [len('Project')])
+    row = "{:<" + str(width) + "}  {:<6}  {:>9}  {}"
+
+    print(row.format("Project", "Status", "Time (s)", "MD5"), file=file)
+    for s in summaries:
+        print(row.format(s['project'], s['status'],
+                         "{:.3f}".format(s['duration']), s['md5'] or '-'),
+              file=file)
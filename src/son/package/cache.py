@@ -0,0 +1,228 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import logging
+import os
+import threading
+
+from son.schema import descriptor_io
+
+log = logging.getLogger(__name__)
+
+
+class BuildCache(object):
+    """
+    Keeps track of the artifacts staged in the package destination
+    folder by previous builds. Each staged file is associated with
+    the source it was produced from, identified by its path, size,
+    modification time and inode, with its MD5 hash and with the way
+    it was staged (e.g. copied or hard linked). As long as neither the
+    source nor the staged copy change, the staged copy and its hash
+    are reused instead of being generated again.
+    """
+
+    CACHE_VERSION = "0.1"
+
+    __cache_name__ = '.son-cache.yml'
+
+    def __init__(self, dst_path):
+        self._dst_path = dst_path
+        self._filename = os.path.join(dst_path, BuildCache.__cache_name__)
+        self._entries = dict()
+
+        # Staged files (re)used in the current build
+        self._staged = set()
+        self._lock = threading.Lock()
+
+    @property
+    def filename(self):
+        return self._filename
+
+    @staticmethod
+    def exists(dst_path):
+        """Checks if a build cache is present in a destination folder"""
+        return os.path.isfile(os.path.join(dst_path,
+                                           BuildCache.__cache_name__))
+
+    def load(self):
+        """
+        Load the cache index left by a previous build.
+        An unreadable or outdated index is discarded.
+        """
+        self._entries = dict()
+        if not os.path.isfile(self._filename):
+            return
+
+        try:
+            with open(self._filename, 'r') as cache_file:
+                cache = descriptor_io.load(cache_file)
+
+        except descriptor_io.YAMLError:
+            log.warning("Discarding invalid build cache '{}'"
+                        .format(self._filename))
+            return
+
+        if not isinstance(cache, dict) or \
+                cache.get('version') != BuildCache.CACHE_VERSION:
+            log.debug("Discarding outdated build cache '{}'"
+                      .format(self._filename))
+            return
+
+        self._entries = cache.get('entries') or dict()
+        log.debug("Loaded {} build cache entries"
+                  .format(len(self._entries)))
+
+    def save(self):
+        """
+        Write the cache index, keeping only the entries
+        of the artifacts staged by the current build.
+        """
+        with self._lock:
+            entries = {dst: entry for dst, entry in self._entries.items()
+                       if dst in self._staged}
+
+        with open(self._filename, 'w') as cache_file:
+            descriptor_io.dump({'version': BuildCache.CACHE_VERSION,
+                                'entries': entries}, cache_file)
+
+    def lookup(self, src, dst, staged=True, staged_as=None):
+        """
+        Obtain the MD5 of a previously staged artifact.
+        :param src: The source file of the artifact
+        :param dst: The staged location of the artifact
+        :param staged: Also require the staged file to be unchanged.
+                       If False, only the source is checked, e.g. to
+                       restore a staged copy that was removed.
+        :param staged_as: The ways of staging the artifact allowed by
+                          the current build. A staged file produced
+                          otherwise is not reused. Default is any.
+        :return: The MD5 of the artifact if it is still valid,
+                 None otherwise
+        """
+        rel_dst = self._relpath(dst)
+        with self._lock:
+            entry = self._entries.get(rel_dst)
+
+        if not entry or entry['source'] != _source_key(src):
+            return
+
+        if not staged:
+            return entry['md5']
+
+        if entry['staged'] != _staged_key(dst):
+            return
+
+        if staged_as is not None and \
+                entry.get('staged_as') not in staged_as:
+            return
+
+        with self._lock:
+            self._staged.add(rel_dst)
+        return entry['md5']
+
+    def store(self, src, dst, md5, staged_as=None):
+        """
+        Record a newly staged artifact.
+        :param src: The source file of the artifact
+        :param dst: The staged location of the artifact
+        :param md5: The MD5 of the staged file
+        :param staged_as: How the staged file was produced from
+                          the source, e.g. 'copy' or 'hardlink'
+        """
+        rel_dst = self._relpath(dst)
+        entry = {'source': _source_key(src),
+                 'staged': _staged_key(dst),
+                 'md5': md5,
+                 'staged_as': staged_as}
+
+        with self._lock:
+            self._entries[rel_dst] = entry
+            self._staged.add(rel_dst)
+
+    def staged_as(self, dst):
+        """
+        Obtain how an artifact was staged.
+        :param dst: The staged location of the artifact
+        :return: The way given when the artifact was
+                 stored, None if it is unknown
+        """
+        with self._lock:
+            entry = self._entries.get(self._relpath(dst))
+        return entry.get('staged_as') if entry else None
+
+    def prune(self, keep=()):
+        """
+        Remove every file of the destination folder that was
+        not staged by the current build, e.g. artifacts that
+        were removed from the project or previous packages.
+        :param keep: Other files to keep, e.g. the base
+                     package of a delta package
+        """
+        keep = {os.path.abspath(path) for path in keep}
+        prune_tree(self._dst_path,
+                   lambda path: path == self._filename or
+                   self._relpath(path) in self._staged or
+                   os.path.abspath(path) in keep)
+
+    def _relpath(self, path):
+        return os.path.relpath(path, self._dst_path).replace(os.sep, '/')
+
+
+def prune_tree(path, keep):
+    """
+    Remove the files of a directory tree, and the folders left empty.
+    :param path: The root of the tree, which is not removed
+    :param keep: Function telling if a file is kept, given its path
+    """
+    for root, dirs, files in os.walk(path, topdown=False):
+        for f in files:
+            file_path = os.path.join(root, f)
+            if keep(file_path):
+                continue
+
+            log.debug("Removing stale artifact '{}'".format(file_path))
+            os.remove(file_path)
+
+        if root != path and not os.listdir(root):
+            os.rmdir(root)
+
+
+def _source_key(src):
+    st = os.stat(src)
+    return {'path': os.path.abspath(src),
+            'size': st.st_size,
+            'mtime': st.st_mtime_ns,
+            'inode': st.st_ino}
+
+
+def _staged_key(dst):
+    try:
+        st = os.stat(dst)
+    except FileNotFoundError:
+        return
+
+    return {'size': st.st_size,
+            'mtime': st.st_mtime_ns}
@@ -0,0 +1,139 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import logging
+import os
+import zipfile
+import zlib
+
+log = logging.getLogger(__name__)
+
+
+class CompressionPolicy(object):
+    """
+    Decides how each member of a package is stored, based on its
+    package content type. Descriptors are always compressed, images
+    in already compressed formats are stored as they are, and other
+    images are compressed only if a sample of their content shows
+    that it is worth it.
+    """
+
+    # Compression modes
+    STORE = 'store'
+    DEFLATE = 'deflate'
+    PROBE = 'probe'
+
+    DEFAULT_LEVEL = 6
+
+    # Compression mode by package content type
+    DEFAULT_MODES = {
+        'application/sonata.package_descriptor': DEFLATE,
+        'application/sonata.service_descriptors': DEFLATE,
+        'application/sonata.function_descriptor': DEFLATE,
+        'application/sonata.qcow2_files': STORE,
+        'application/sonata.vmdk_files': STORE,
+        'application/sonata.iso_files': STORE,
+        'application/sonata.raw_files': PROBE,
+    }
+
+    # Size and number of the samples read by the probe
+    PROBE_SAMPLE_SIZE = 64 * 1024
+    PROBE_SAMPLES = 4
+
+    # Minimum size reduction of the samples to compress a member
+    PROBE_MIN_SAVING = 0.1
+
+    def __init__(self, level=DEFAULT_LEVEL, modes=None,
+                 default_mode=PROBE):
+        """
+        :param level: The compression level (1-9) of compressed members.
+                      Level 0 disables compression.
+        :param modes: Compression modes by content type,
+                      overriding the default ones
+        :param default_mode: The mode of content types without policy
+        """
+        self._level = level
+        self._modes = dict(CompressionPolicy.DEFAULT_MODES)
+        if modes:
+            self._modes.update(modes)
+        self._default_mode = default_mode
+
+    @property
+    def level(self):
+        return self._level
+
+    def mode(self, content_type):
+        """Obtain the compression mode of a content type"""
+        if not self._level:
+            return CompressionPolicy.STORE
+        return self._modes.get(content_type, self._default_mode)
+
+    def compression(self, content_type, filename=None):
+        """
+        Obtain the zipfile compression of a package member.
+        :param content_type: The package content type of the member
+        :param filename: The file of the member, sampled by the probe
+        :return: tuple (compress_type, compress_level)
+        """
+        mode = self.mode(content_type)
+        if mode == CompressionPolicy.PROBE:
+            mode = CompressionPolicy.DEFLATE \
+                if filename and self.probe(filename) \
+                else CompressionPolicy.STORE
+
+        if mode == CompressionPolicy.DEFLATE:
+            return zipfile.ZIP_DEFLATED, self._level
+
+        return zipfile.ZIP_STORED, None
+
+    def probe(self, filename):
+        """
+        Sample the content of a file, spread evenly over the file,
+        and check if it compresses well enough.
+        :param filename: The file to probe
+        :return: True if the file should be compressed
+        """
+        size = os.path.getsize(filename)
+        if size == 0:
+            return False
+
+        sample_size = CompressionPolicy.PROBE_SAMPLE_SIZE
+        samples = CompressionPolicy.PROBE_SAMPLES
+        step = max(sample_size, size // samples)
+
+        raw = compressed = 0
+        with open(filename, 'rb') as f:
+            for offset in range(0, size, step)[:samples]:
+                f.seek(offset)
+                data = f.read(sample_size)
+                raw += len(data)
+                compressed += len(zlib.compress(data, 1))
+
+        saving = 1 - compressed / raw
+        log.debug("Compression probe of '{}': {:.1%} saving"
+                  .format(filename, saving))
+
+        return saving >= CompressionPolicy.PROBE_MIN_SAVING
@@ -24,17 +24,30 @@
 # acknowledge the contributions of their colleagues of the SONATA
 # partner consortium (www.sonata-nfv.eu).
 
+import functools
 import logging
 import time
 
+from son.trace import tracer
+
 
 def performance(method):
+    """
+    Log the duration of each call of a method, which is also
+    traced as a span of the 'packager' category when tracing is
+    enabled (see son.trace.tracer).
+    """
+    name = method.__qualname__
+
+    @functools.wraps(method)
     def measure(*args, **kwargs):
         log = logging.getLogger(method.__module__)
-        start = time.time()
-        result = method(*args, **kwargs)
+        start = time.perf_counter_ns()
+        with tracer.span(name, 'packager'):
+            result = method(*args, **kwargs)
         log.info('{0} executed in {1:.3f} sec'
-                 .format(method.__name__, time.time() - start))
+                 .format(method.__name__,
+                         (time.perf_counter_ns() - start) / 1e9))
         return result
 
     return measure
@@ -0,0 +1,130 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import logging
+import threading
+
+from son.schema import descriptor_io
+
+log = logging.getLogger(__name__)
+
+# Package member mapping the artifacts with duplicated content
+# to the member that holds their content
+ALIASES_NAME = 'META-INF/ALIASES.MF'
+
+
+class ContentIndex(object):
+    """
+    Keeps track of the content of the artifacts of a package, so that
+    artifacts with the same content are stored only once. The first
+    artifact registered with a given content holds it and the
+    following ones become aliases of the first. Artifact sizes are
+    also kept, so that only artifacts with the size of a previous one
+    have to be hashed to look for duplicates.
+    """
+
+    def __init__(self):
+        self._sizes = set()
+        self._blobs = dict()
+        self._aliases = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def aliases(self):
+        """Dictionary with the artifact holding the content of each alias"""
+        with self._lock:
+            return dict(self._aliases)
+
+    def sorted_aliases(self):
+        """
+        Obtain the aliases, with the content of each group of identical
+        artifacts held by the artifact with the lowest name. Unlike
+        the aliases property, the result does not depend on the order
+        in which the artifacts were registered.
+        :return: Dictionary with the artifact holding the
+                 content of each alias
+        """
+        with self._lock:
+            groups = dict()
+            for alias, blob in self._aliases.items():
+                groups.setdefault(blob, [blob]).append(alias)
+
+        aliases = dict()
+        for names in groups.values():
+            names.sort()
+            for name in names[1:]:
+                aliases[name] = names[0]
+        return aliases
+
+    def may_contain(self, size):
+        """Checks if an artifact with the given size was registered"""
+        with self._lock:
+            return size in self._sizes
+
+    def lookup(self, md5):
+        """
+        Obtain the artifact holding a content.
+        :param md5: The MD5 of the content
+        :return: The name of the artifact, None if not registered
+        """
+        with self._lock:
+            return self._blobs.get(md5)
+
+    def add(self, name, size, md5):
+        """
+        Register an artifact.
+        :param name: The name of the artifact in the package
+        :param size: The size of the artifact
+        :param md5: The MD5 of the artifact
+        :return: The name of the artifact holding its content,
+                 which is the artifact itself if it is the first
+        """
+        with self._lock:
+            self._sizes.add(size)
+            blob = self._blobs.setdefault(md5, name)
+            if blob != name:
+                log.debug("Artifact '{}' has the same content as '{}'"
+                          .format(name, blob))
+                self._aliases[name] = blob
+            return blob
+
+
+def read_aliases(pck):
+    """
+    Read the aliases of a package.
+    :param pck: The zipfile.ZipFile of the package
+    :return: Dictionary with the member holding the content of each
+             alias, empty if the package has no aliases
+    """
+    if ALIASES_NAME not in pck.NameToInfo:
+        return dict()
+
+    return descriptor_io.load(pck.read(ALIASES_NAME)) or dict()
+
+
+def dump_aliases(aliases):
+    """Obtain the content of the aliases member of a package"""
+    return descriptor_io.dump(aliases).encode('utf-8')
@@ -0,0 +1,207 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import logging
+import os
+import zipfile
+
+from son.package.archive import PackageArchive
+from son.package.dedup import ALIASES_NAME, read_aliases
+from son.package.hashing import hash_file, hash_stream
+from son.schema import descriptor_io
+
+log = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'META-INF/MANIFEST.MF'
+DELTA_MANIFEST_NAME = 'META-INF/DELTA.MF'
+
+
+class DeltaBase(object):
+    """
+    A previous package, used as the base of a delta package.
+    The delta package only contains the members of the new package
+    whose content is not present in the base package, under any name.
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: The base package file
+        """
+        self._filename = filename
+        self._md5 = hash_file(filename)['md5']
+        self._contents = set(content_md5s(read_manifest(filename))
+                             .values())
+
+    @property
+    def filename(self):
+        return self._filename
+
+    @property
+    def md5(self):
+        return self._md5
+
+    def changed_members(self, manifest):
+        """
+        Obtain the members of a new package that are not in the base.
+        :param manifest: The package descriptor of the new package
+        :return: List of the names of the changed or new members
+        """
+        return [name for name, md5 in content_md5s(manifest).items()
+                if not md5 or md5 not in self._contents]
+
+    def delta_manifest(self, members, package_md5=None):
+        """
+        Create the delta descriptor of a delta package.
+        :param members: The package content members in the delta package
+        :param package_md5: The MD5 of the full package
+        :return: The delta descriptor
+        """
+        delta_manifest = {'base_package': os.path.basename(self._filename),
+                          'base_package_md5': self._md5,
+                          'package_content': sorted(members)}
+        if package_md5:
+            delta_manifest['package_md5'] = package_md5
+        return delta_manifest
+
+
+def read_manifest(package):
+    """
+    Read the package descriptor of a package file.
+    :param package: The package file
+    :return: The package descriptor
+    """
+    with zipfile.ZipFile(package) as pck:
+        return descriptor_io.load(pck.read(MANIFEST_NAME))
+
+
+def content_md5s(manifest):
+    """
+    Obtain the MD5 of each package content entry of a package descriptor.
+    :return: Dictionary of MD5 hashes by package member name
+    """
+    return {pce['name'].lstrip('/'): pce.get('md5')
+            for pce in manifest.get('package_content') or []}
+
+
+def reconstruct(base_package, delta_package, dst_file):
+    """
+    Rebuild the full package from its base package and a delta
+    package. Members are copied as they are stored in their packages
+    and their MD5 hashes are checked against the package descriptor.
+    Members that are not in the delta package are taken from the
+    member of the base package with the same content. The MD5 of the
+    rebuilt package is checked against the one of the full package,
+    if the delta package records it.
+    :param base_package: The base package file
+    :param delta_package: The delta package file
+    :param dst_file: The full package file to create
+    :return: The MD5 of the full package, None on failure
+    """
+    with zipfile.ZipFile(base_package) as base, \
+            zipfile.ZipFile(delta_package) as delta:
+
+        if DELTA_MANIFEST_NAME not in delta.NameToInfo:
+            log.error("'{}' is not a delta package".format(delta_package))
+            return
+
+        delta_manifest = descriptor_io.load(delta.read(DELTA_MANIFEST_NAME))
+        base_md5 = hash_file(base_package)['md5']
+        if base_md5 != delta_manifest['base_package_md5']:
+            log.error("Package '{}' is not the base of delta package '{}'. "
+                      "Expected MD5 {}, found {}"
+                      .format(base_package, delta_package,
+                              delta_manifest['base_package_md5'], base_md5))
+            return
+
+        package_md5 = write_full_package(base, delta, dst_file)
+
+    expected_md5 = delta_manifest.get('package_md5')
+    if package_md5 and expected_md5 and package_md5 != expected_md5:
+        log.error("Package rebuilt from '{}' has MD5 {}, expected {}"
+                  .format(delta_package, package_md5, expected_md5))
+        os.remove(dst_file)
+        return
+
+    return package_md5
+
+
+def write_full_package(base, delta, dst_file, check=True):
+    """
+    Write the full package of a delta package. The members are
+    written in the same order as in the full package generated by
+    son-package: the members and the package descriptor in the
+    sorted order of their names, then the aliases. As they are copied
+    as stored, the full package is the same file as the one generated
+    by a (reproducible) build of the same project.
+    :param base: The zipfile.ZipFile of the base package
+    :param delta: The zipfile.ZipFile of the delta package
+    :param dst_file: The full package file to create, e.g. os.devnull
+                     to only compute its MD5
+    :param check: Check the MD5 of each member against
+                  the package descriptor
+    :return: The MD5 of the full package, None on failure
+    """
+    # Member of the base package holding each content
+    base_aliases = read_aliases(base)
+    base_members = {
+        md5: base_aliases.get(name, name)
+        for name, md5 in content_md5s(
+            descriptor_io.load(base.read(MANIFEST_NAME))).items()}
+
+    manifest = descriptor_io.load(delta.read(MANIFEST_NAME))
+    aliases = read_aliases(delta)
+    md5s = content_md5s(manifest)
+
+    archive = PackageArchive(dst_file)
+    for name in sorted([name for name in md5s if name not in aliases] +
+                       [MANIFEST_NAME]):
+        md5 = md5s.get(name)
+        source, src_name = delta, name
+        if name not in delta.NameToInfo:
+            source, src_name = base, base_members.get(md5, name)
+
+        if src_name not in source.NameToInfo:
+            log.error("Member '{}' not found in base package '{}'"
+                      .format(name, base.filename))
+            archive.discard()
+            return
+
+        if check and md5:
+            with source.open(src_name) as member:
+                member_md5 = hash_stream(member)['md5']
+            if member_md5 != md5:
+                log.error("Member '{}' of '{}' does not match the "
+                          "package descriptor".format(src_name,
+                                                      source.filename))
+                archive.discard()
+                return
+
+        archive.copy_member(source, src_name, name)
+
+    if aliases:
+        archive.copy_member(delta, ALIASES_NAME)
+
+    return archive.close()
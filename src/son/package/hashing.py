@@ -0,0 +1,186 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Algorithms supported for artifact hashing. MD5 is the
+# one required by the package descriptor schema.
+ALGORITHMS = ('md5', 'sha256', 'blake2b')
+
+# Default size of the chunks read from disk
+CHUNK_SIZE = 1024 * 1024
+
+# Files bigger than this are hashed through mmap (if enabled)
+MMAP_THRESHOLD = 64 * 1024 * 1024
+
+# Keep one reusable read buffer per thread and chunk size
+_buffers = threading.local()
+
+
+def get_buffer(size=CHUNK_SIZE):
+    """
+    Obtain a reusable buffer of the given size for the calling thread.
+    """
+    buffers = getattr(_buffers, 'buffers', None)
+    if buffers is None:
+        buffers = _buffers.buffers = dict()
+    if size not in buffers:
+        buffers[size] = bytearray(size)
+    return buffers[size]
+
+
+def check_algorithms(algorithms):
+    """
+    Ensure that all the given hash algorithms are supported.
+    """
+    for algorithm in algorithms:
+        if algorithm not in ALGORITHMS:
+            raise ValueError("Unsupported hash algorithm '{}'"
+                             .format(algorithm))
+
+
+class MultiHash(object):
+    """
+    Computes several digests over the same data, so that
+    a single read is enough to obtain all of them.
+    """
+
+    def __init__(self, algorithms=('md5',)):
+        check_algorithms(algorithms)
+        self._hashes = [(algorithm, hashlib.new(algorithm))
+                        for algorithm in algorithms]
+
+    def update(self, data):
+        for _, h in self._hashes:
+            h.update(data)
+
+    def hexdigests(self):
+        return {algorithm: h.hexdigest() for algorithm, h in self._hashes}
+
+
+def hash_stream(stream, algorithms=('md5',), chunk_size=CHUNK_SIZE):
+    """
+    Hash the remaining content of a binary stream.
+    :param stream: The stream, opened in binary mode
+    :param algorithms: The hash algorithms to compute
+    :param chunk_size: The size of each read
+    :return: Dictionary of hex digests, by algorithm
+    """
+    mh = MultiHash(algorithms)
+    buf = get_buffer(chunk_size)
+    view = memoryview(buf)
+    while True:
+        n = stream.readinto(buf)
+        if not n:
+            break
+        mh.update(view[:n])
+
+    return mh.hexdigests()
+
+
+def hash_file(filename, algorithms=('md5',), chunk_size=CHUNK_SIZE,
+              use_mmap=False):
+    """
+    Hash the content of a file.
+    :param filename: The file to hash
+    :param algorithms: The hash algorithms to compute
+    :param chunk_size: The size of each read
+    :param use_mmap: Map big files in memory instead of reading them.
+                     Mapped pages are accounted in the resident memory
+                     of the process, so this is disabled by default.
+    :return: Dictionary of hex digests, by algorithm
+    """
+    with open(filename, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if not use_mmap or size < MMAP_THRESHOLD:
+            return hash_stream(f, algorithms, chunk_size)
+
+        mh = MultiHash(algorithms)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                for offset in range(0, size, chunk_size):
+                    mh.update(view[offset:offset + chunk_size])
+            finally:
+                view.release()
+
+        return mh.hexdigests()
+
+
+def list_tree(path):
+    """
+    List the files of a directory tree.
+    :param path: The root of the tree
+    :return: Sorted list of file paths relative to the root,
+             always using '/' as separator
+    """
+    files = []
+    for root, dirs, filenames in os.walk(path):
+        rel_root = os.path.relpath(root, path)
+        for f in filenames:
+            rel_path = f if rel_root == os.curdir \
+                else os.path.join(rel_root, f)
+            files.append(rel_path.replace(os.sep, '/'))
+
+    return sorted(files)
+
+
+def hash_tree(path, algorithms=('md5',), chunk_size=CHUNK_SIZE, jobs=None):
+    """
+    Hash a directory tree. Files are hashed in parallel and their
+    digests are combined in the sorted order of their relative
+    paths, so the result only depends on the names and contents of
+    the files, not on the file system or on the number of workers.
+    :param path: The root of the tree
+    :param algorithms: The hash algorithms to compute
+    :param chunk_size: The size of each read
+    :param jobs: Number of files hashed in parallel
+    :return: Dictionary of hex digests, by algorithm
+    """
+    check_algorithms(algorithms)
+    files = list_tree(path)
+
+    def file_digests(rel_path):
+        return hash_file(os.path.join(path, *rel_path.split('/')),
+                         algorithms, chunk_size)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        digests = executor.map(file_digests, files)
+
+        # Each entry of the tree contributes with
+        # "<relative path>\0<digest>\n" to the tree digest
+        tree = [(algorithm, hashlib.new(algorithm))
+                for algorithm in algorithms]
+        for rel_path, digest in zip(files, digests):
+            for algorithm, h in tree:
+                h.update(rel_path.encode('utf-8') + b'\0' +
+                         digest[algorithm].encode('ascii') + b'\n')
+
+    return {algorithm: h.hexdigest() for algorithm, h in tree}
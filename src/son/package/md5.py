@@ -24,27 +24,23 @@
 # acknowledge the contributions of their colleagues of the SONATA
 # partner consortium (www.sonata-nfv.eu).
 
-import hashlib
 import os
 
+from son.package.hashing import CHUNK_SIZE, hash_file, hash_tree
+from son.trace import tracer
 
-def generate_hash(f, cs=128):
+
+@tracer.traced(category='hashing')
+def generate_hash(f, cs=CHUNK_SIZE):
     return __generate_hash__(f, cs) \
         if os.path.isfile(f) \
         else __generate_hash_path__(f, cs)
 
 
-def __generate_hash__(f, cs=128):
-    hash = hashlib.md5()
-    with open(f, "rb") as file:
-        for chunk in iter(lambda: file.read(cs), b''):
-            hash.update(chunk)
-    return hash.hexdigest()
+def __generate_hash__(f, cs=CHUNK_SIZE):
+    tracer.count('bytes', os.path.getsize(f))
+    return hash_file(f, ('md5',), cs)['md5']
 
 
-def __generate_hash_path__(p, cs=128):
-    hash = hashlib.md5()
-    for root, dir, files in os.walk(p):
-        for f in files:
-            hash.update(__generate_hash__(f, cs))
-    return hash.hexdigest()
+def __generate_hash_path__(p, cs=CHUNK_SIZE):
+    return hash_tree(p, ('md5',), cs)['md5']
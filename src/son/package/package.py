@@ -27,52 +27,122 @@
 import logging
 import os
 import pathlib
+import posixpath
+import queue
 import shutil
 import sys
+import threading
 import zipfile
-from contextlib import closing
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import coloredlogs
 import requests
 import validators
-import yaml
 
 from son.catalogue.catalogue_client import CatalogueClient
+from son.package.archive import PackageArchive
+from son.package.cache import BuildCache, prune_tree
+from son.package.compression import CompressionPolicy
 from son.package.decorators import performance
+from son.package.dedup import ALIASES_NAME, ContentIndex, dump_aliases
+from son.package.delta import DeltaBase, DELTA_MANIFEST_NAME, \
+    MANIFEST_NAME, write_full_package
+from son.package.hashing import list_tree
 from son.package.md5 import generate_hash
+from son.package.remote import RemoteArtifactCache, fetch_urls
+from son.package.staging import STAGED_COPY, STAGING_METHODS, \
+    STAGING_MODES, STAGING_SAFE, copy_file, link_and_hash, link_or_copy
+from son.trace import tracer
 from son.workspace.project import Project
 from son.workspace.workspace import Workspace
 from son.schema.validator import SchemaValidator
+from son.schema import descriptor_io
 
 log = logging.getLogger(__name__)
 
+# Content type of the package descriptor (META-INF/MANIFEST.MF)
+MANIFEST_CONTENT_TYPE = "application/sonata.package_descriptor"
+
 
 class Packager(object):
 
+    # Maximum number of VNFs requested to the
+    # catalogue servers at the same time
+    MAX_CATALOGUE_REQUESTS = 8
+
     def __init__(self, workspace, project, dst_path=None, generate_pd=True,
-                 version="1.0"):
+                 version="1.0", jobs=1, use_cache=True, direct=False,
+                 compression_level=CompressionPolicy.DEFAULT_LEVEL,
+                 schema_validator=None, catalogue_clients=None,
+                 delta_from=None, reproducible=False, plan=False,
+                 staging_mode=STAGING_SAFE, dedup=False):
 
         # Assign parameters
         coloredlogs.install(level=workspace.log_level)
         self._version = version
+        self._jobs = max(1, jobs)
+        self._use_cache = use_cache and not direct and not plan
+        self._build_cache = None
+
+        # In plan mode, the package descriptor is computed from the
+        # sources, which are hashed in parallel, and nothing is written
+        self._plan = plan
+        self._hash_executor = None
+        if plan:
+            direct = False
+            self._hash_executor = ThreadPoolExecutor(max_workers=self._jobs)
+
+        # In direct mode, artifacts are written straight into the
+        # package file instead of being staged in the destination folder
+        self._direct = direct
+        self._archive = None
+
+        # Reproducible packages only depend on the project content
+        self._reproducible = reproducible
+
+        # Artifacts are staged as reflinks (or, if allowed, hard
+        # links) of their sources when possible (see son.package.staging)
+        self._staging_mode = staging_mode
+
+        # Decides how each member is compressed in the package
+        self._compression_policy = CompressionPolicy(level=compression_level)
         self._package_descriptor = None
         self._workspace = workspace
         self._project = project
 
-        # Create a schema validator
-        self._schema_validator = SchemaValidator(workspace)
+        # Create a schema validator, unless a shared one is given
+        self._schema_validator = schema_validator or \
+            SchemaValidator(workspace)
 
         self._catalogueClients = []
 
         # Read catalogue servers from workspace
-        # configfile and create clients
-        for cat in workspace.catalogue_servers:
-            self._catalogueClients.append(CatalogueClient(cat['url']))
+        # configfile and create clients (unless shared ones are given)
+        if catalogue_clients is not None:
+            self._catalogueClients = list(catalogue_clients)
+        else:
+            for cat in workspace.catalogue_servers:
+                self._catalogueClients.append(CatalogueClient(cat['url']))
 
         # Keep track of VNF packaging referenced in NS
         self._ns_vnf_registry = {}
 
+        # Guards the registries shared by parallel VNF workers
+        self._lock = threading.RLock()
+
+        # Identical artifacts are staged only once. With dedup, they
+        # are also stored once in the package, the others being
+        # declared in META-INF/ALIASES.MF, which not every consumer
+        # of packages understands.
+        self._dedup = dedup
+        self._content_index = ContentIndex()
+        self._dedup_lock = threading.Lock()
+
+        # Size of each package content artifact, by member name
+        self._artifact_sizes = {}
+
         self._dst_path = dst_path
+        self._package_file = None
 
         # Specifies THE service template of this package
         self._entry_service_template = None
@@ -87,27 +157,50 @@ class Packager(object):
         # This will be included in the Artifact Dependencies Section
         self._artifact_dependencies = []
 
+        # Checks of remote artifacts shared by the builds of the workspace
+        self._remote_cache = None
+        if use_cache:
+            self._remote_cache = RemoteArtifactCache(os.path.join(
+                workspace.ws_root,
+                workspace.dirs[Workspace.CONFIG_STR_CACHE_DIR]))
+
         # States if this package is self-contained,
         # i.e. if contains all its relevant artifacts
         self._sealed = True
 
+        # Previous package, to generate a delta package against it.
+        # It may be in the destination folder (e.g. the package of the
+        # previous build), so it is kept when the folder is cleaned up.
+        self._delta_base = DeltaBase(delta_from) if delta_from else None
+        self._keep_files = [os.path.abspath(delta_from)] \
+            if delta_from else []
+
         # Clear and create package specific folder
         if generate_pd:
             self.init_package_skeleton(dst_path)
             self.package_descriptor = self._project
 
+    @tracer.traced(category='packager')
     def init_package_skeleton(self, dst_path):
         """
         Validate and initialize the destination folder
         for the creation of the package artifacts.
         :param dst_path: The directory of the package components
         """
+        if self._plan:
+            # Nothing is written, the destination only names the members
+            self._dst_path = os.path.abspath(dst_path) if dst_path else \
+                os.path.join(self._project.project_root, "target")
+            return
+
         if not dst_path:
             self._dst_path = os.path.join(self._project.project_root, "target")
 
         elif os.path.isdir(dst_path):  # dir exists?
 
-            if len(os.listdir(dst_path)) > 0:  # dir not empty?
+            # dir not empty and not holding a previous build?
+            if len(os.listdir(dst_path)) > 0 and not self._direct and \
+                    not (self._use_cache and BuildCache.exists(dst_path)):
                 log.error("Destination directory '{}' is not empty"
                           .format(os.path.abspath(dst_path)))
 
@@ -121,15 +214,55 @@ class Packager(object):
         else:
             self._dst_path = os.path.abspath(dst_path)
 
-        if os.path.exists(self._dst_path):
+        if self._direct:
+            # Only the package file will be written. Keep it under
+            # a temporary name until the package is generated.
+            os.makedirs(self._dst_path, exist_ok=True)
+            self._archive = PackageArchive(
+                os.path.join(self._dst_path,
+                             '.package-{}.son.part'.format(os.getpid())),
+                policy=self._compression_policy, jobs=self._jobs,
+                reproducible=self._reproducible)
+            return
+
+        if self._use_cache and BuildCache.exists(self._dst_path):
+            log.debug("Reusing artifacts of the previous build at '{}'"
+                      .format(self._dst_path))
+
+        elif os.path.exists(self._dst_path) and self._keep_files:
+            prune_tree(self._dst_path,
+                       lambda path: os.path.abspath(path) in self._keep_files)
+
+        elif os.path.exists(self._dst_path):
             shutil.rmtree(self._dst_path)
             os.makedirs(self._dst_path, exist_ok=False)
 
+        if self._use_cache:
+            os.makedirs(self._dst_path, exist_ok=True)
+            self._build_cache = BuildCache(self._dst_path)
+            self._build_cache.load()
+
     @property
     def package_descriptor(self):
         return self._package_descriptor
 
+    @property
+    def package_file(self):
+        """The package file, once it is generated"""
+        return self._package_file
+
+    @property
+    def dedup(self):
+        """Whether artifacts with identical content are stored once"""
+        return self._dedup
+
+    @property
+    def artifact_sizes(self):
+        """The size of each package content artifact, by member name"""
+        return self._artifact_sizes
+
     @package_descriptor.setter
+    @tracer.traced(category='packager')
     def package_descriptor(self, project):
         """
         Create and set the full package descriptor as a dictionary.
@@ -138,6 +271,8 @@ class Packager(object):
         """
         log.info('Create Package Content Section')
         package_content = self.package_pcs()
+        if self._hash_executor:
+            self._hash_executor.shutdown()
 
         log.info('Create Package Resolver Section')
         package_resolver = self.package_prs()
@@ -160,12 +295,34 @@ class Packager(object):
         self._package_descriptor.update(package_dependencies)
         self._package_descriptor.update(artifact_dependencies)
 
-        # Create the manifest folder and file
-        meta_inf = os.path.join(self._dst_path, "META-INF")
-        os.makedirs(meta_inf, exist_ok=True)
-        with open(os.path.join(meta_inf, "MANIFEST.MF"), "w") as manifest:
-            manifest.write(yaml.dump(self.package_descriptor,
-                                     default_flow_style=False))
+        if self._reproducible:
+            sort_package_descriptor(self._package_descriptor)
+
+        # Discard artifacts of previous builds that were not reused
+        if self._build_cache:
+            self._build_cache.prune(keep=self._keep_files)
+            self._build_cache.save()
+
+        # Create the manifest folder and file (unless planning)
+        with tracer.span('Packager.write_manifest', 'packager') as span:
+            manifest = descriptor_io.dump(self.package_descriptor)
+            span.count('bytes', len(manifest))
+            if self._archive:
+                aliases = self._content_index.aliases
+                if aliases:
+                    self._archive.add_bytes(dump_aliases(aliases),
+                                            ALIASES_NAME,
+                                            MANIFEST_CONTENT_TYPE)
+                self._archive.add_bytes(manifest.encode('utf-8'),
+                                        MANIFEST_NAME,
+                                        MANIFEST_CONTENT_TYPE)
+                self._archive.close()
+            elif not self._plan:
+                meta_inf = os.path.join(self._dst_path, "META-INF")
+                os.makedirs(meta_inf, exist_ok=True)
+                with open(os.path.join(meta_inf, "MANIFEST.MF"),
+                          "wb") as mf:
+                    mf.write(manifest.encode('utf-8'))
 
         # Validate PD
         log.debug("Validating Package Descriptor")
@@ -176,6 +333,8 @@ class Packager(object):
             log.debug("Failed to validate Package Descriptor. "
                       "Aborting package creation.")
             self._package_descriptor = None
+            if self._archive:
+                self._archive.discard()
             return
 
     @performance
@@ -234,6 +393,11 @@ class Packager(object):
             return False
         pcs += vnfds
 
+        # Wait for the artifacts hashed in parallel (in plan mode)
+        for pce in pcs:
+            if isinstance(pce['md5'], Future):
+                pce['md5'] = pce['md5'].result()
+
         return dict(package_content=pcs)
 
     @performance
@@ -276,8 +440,11 @@ class Packager(object):
                       "This section will not be included.")
             return dict()
 
+        self.check_artifact_dependencies()
+
         return dict(artifact_dependencies=self._artifact_dependencies)
 
+    @tracer.traced(category='packager')
     def generate_nsd(self):
         """
         Compile information for the service descriptor section.
@@ -302,15 +469,16 @@ class Packager(object):
             return
         else:
             nsd_filename = nsd_list[0]
-            with open(os.path.join(base_path, nsd_filename), 'r') as _file:
-                nsd = yaml.load(_file)
+            nsd_descriptor = descriptor_io.load_descriptor(
+                os.path.join(base_path, nsd_filename))
+            nsd = nsd_descriptor.content
 
         # Validate NSD
         log.debug("Validating Service Descriptor NSD='{}'"
                   .format(nsd_filename))
 
         if not self._schema_validator.validate(
-                nsd, SchemaValidator.SCHEMA_SERVICE_DESCRIPTOR):
+                nsd_descriptor, SchemaValidator.SCHEMA_SERVICE_DESCRIPTOR):
 
             log.error("Failed to validate Service Descriptor '{}'. "
                       "Aborting package creation".format(nsd_filename))
@@ -329,18 +497,19 @@ class Packager(object):
         # Create SD location
         nsd = os.path.join(base_path, nsd_filename)
         sd_path = os.path.join(self._dst_path, "service_descriptors")
-        os.makedirs(sd_path, exist_ok=True)
 
         # Copy service descriptor file
         sd = os.path.join(sd_path, nsd_filename)
-        self.copy_descriptor_file(nsd, sd)
+        sd_md5 = self.stage_descriptor(
+            nsd, sd, "application/sonata.service_descriptors",
+            descriptor=nsd_descriptor)
 
         # Generate NSD package content entry
         pce = []
         pce_sd = dict()
         pce_sd["content-type"] = "application/sonata.service_descriptors"
         pce_sd["name"] = "/service_descriptors/{}".format(nsd_filename)
-        pce_sd["md5"] = generate_hash(nsd)
+        pce_sd["md5"] = sd_md5
         pce.append(pce_sd)
 
         # Specify the NSD as THE entry service template of package descriptor
@@ -348,6 +517,7 @@ class Packager(object):
 
         return pce
 
+    @tracer.traced(category='packager')
     def generate_vnfds(self):
         """
         Compile information for the function descriptors.
@@ -388,6 +558,7 @@ class Packager(object):
 
         return pcs
 
+    @tracer.traced(category='packager')
     def load_external_vnfds(self, vnf_id_list):
         """
         This method is responsible to load all VNFs, required
@@ -401,47 +572,65 @@ class Packager(object):
         log.debug("Loading the following VNF descriptors: {}"
                   .format(vnf_id_list))
 
-        # Iterate through the VNFs required by the NS
+        catalogue_dir = os.path.join(
+            self._workspace.ws_root,
+            self._workspace.dirs[Workspace.CONFIG_STR_CATALOGUE_VNF_DIR])
+
+        # >> First, check which VNFs are in the workspace catalogue
+        missing_vnfs = []
         for vnf_id in vnf_id_list:
 
             log.debug("Probing workspace catalogue for VNF id='{}'..."
                       .format(vnf_id))
 
-            # >> First, check if this VNF is in the workspace catalogue
-            catalogue_path = os.path.join(
-                self._workspace.ws_root,
-                self._workspace.dirs[Workspace.CONFIG_STR_CATALOGUE_VNF_DIR],
-                vnf_id)
-
+            catalogue_path = os.path.join(catalogue_dir, vnf_id)
             if os.path.isdir(catalogue_path):
                 # Exists! Save catalogue path of this vnf for later packaging
                 log.debug("Found VNF id='{}' in workspace catalogue '{}'"
                           .format(vnf_id, catalogue_path))
                 continue
 
-            log.debug("VNF id='{}' is not present in workspace catalogue. "
-                      "Contacting catalogue servers...".format(vnf_id))
+            if vnf_id not in missing_vnfs:
+                log.debug("VNF id='{}' is not present in workspace "
+                          "catalogue.".format(vnf_id))
+                missing_vnfs.append(vnf_id)
 
-            # If not in WS catalogue, get the VNF from the catalogue servers
-            vnfd = self.load_vnf_from_catalogue_server(vnf_id)
+        if not missing_vnfs:
+            return True
 
+        # If not in WS catalogue, get the VNFs from the catalogue servers,
+        # with a bounded number of VNFs requested at the same time
+        log.debug("Contacting catalogue servers for {} VNFs..."
+                  .format(len(missing_vnfs)))
+
+        workers = min(len(missing_vnfs), Packager.MAX_CATALOGUE_REQUESTS)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            vnfds = list(executor.map(
+                tracer.propagate(self.load_vnf_from_catalogue_server),
+                missing_vnfs))
+
+        unresolved = []
+        for vnf_id, vnfd in zip(missing_vnfs, vnfds):
             if not vnfd:
-                log.warning("VNF id='{}' is not present in catalogue servers."
-                            .format(vnf_id))
-                return False
+                unresolved.append(vnf_id)
+                continue
 
             # Create dir to hold the retrieved VNF in workspace catalogue
             log.debug("VNF id='{}' retrieved from the catalogue servers. "
                       "Loading to workspace cache.".format(vnf_id))
 
-            os.mkdir(catalogue_path)
-            vnfd_f = open(os.path.join(catalogue_path,
-                                       vnfd['name'] +
-                                       "." +
-                                       self._workspace.descriptor_extension),
-                          'w')
-
-            yaml.dump(vnfd, vnfd_f, default_flow_style=False)
+            catalogue_path = os.path.join(catalogue_dir, vnf_id)
+            os.makedirs(catalogue_path, exist_ok=True)
+            with open(os.path.join(catalogue_path,
+                                   vnfd['name'] + "." +
+                                   self._workspace.descriptor_extension),
+                      'w') as vnfd_f:
+                descriptor_io.dump(vnfd, vnfd_f)
+
+        if unresolved:
+            log.warning("The following VNFs are not present in catalogue "
+                        "servers: {}".format(', '.join(unresolved)))
+            return False
 
         return True
 
@@ -456,28 +645,44 @@ class Packager(object):
             lambda file: os.path.isdir(os.path.join(base_path, file)),
             os.listdir(base_path))
 
-        pcs = []
-        for vnf in vnf_folders:
-            pc_entries = self.generate_vnfd_entry(
-                os.path.join(base_path, vnf), vnf)
-
-            if not pc_entries or len(pc_entries) == 0:
-                continue
-            for pce in iter(pc_entries):
-                pcs.append(pce)
-
-        return pcs
+        return self.generate_vnfd_entries(base_path, vnf_folders)
 
     def generate_external_vnfds(self, base_path, vnf_ids):
         vnf_folders = filter(
             lambda file: os.path.isdir(os.path.join(base_path, file)) and
             file in vnf_ids, os.listdir(base_path))
 
-        pcs = []
-        for vnf in vnf_folders:
-            pc_entries = self.generate_vnfd_entry(os.path.join(
-                base_path, vnf), vnf)
+        return self.generate_vnfd_entries(base_path, vnf_folders)
+
+    def generate_vnfd_entries(self, base_path, vnf_folders):
+        """
+        Compile the package content entries of a set of VNF folders.
+        When more than one job is configured, the VNFs are processed
+        concurrently. Entries are always returned in the (sorted) order
+        of the VNF folders, regardless of the order of completion.
+        :param base_path: base dir location of the VNF folders
+        :param vnf_folders: names of the VNF folders to process
+        :return: The package content entries of all VNFs
+        """
+        vnf_folders = sorted(vnf_folders)
+
+        @tracer.propagate
+        def vnfd_entry(vnf):
+            with tracer.span('Packager.generate_vnfd_entry', 'packager',
+                             vnf=vnf):
+                return self.generate_vnfd_entry(
+                    os.path.join(base_path, vnf), vnf)
+
+        if self._jobs > 1 and len(vnf_folders) > 1:
+            log.debug("Processing {} VNFs using {} jobs"
+                      .format(len(vnf_folders), self._jobs))
+            with ThreadPoolExecutor(max_workers=self._jobs) as executor:
+                results = list(executor.map(vnfd_entry, vnf_folders))
+        else:
+            results = [vnfd_entry(vnf) for vnf in vnf_folders]
 
+        pcs = []
+        for pc_entries in results:
             if not pc_entries or len(pc_entries) == 0:
                 continue
             for pce in iter(pc_entries):
@@ -518,15 +723,16 @@ class Packager(object):
             return
 
         else:
-            with open(os.path.join(base_path, vnfd_list[0]), 'r') as _file:
-                vnfd = yaml.load(_file)
+            vnfd_descriptor = descriptor_io.load_descriptor(
+                os.path.join(base_path, vnfd_list[0]))
+            vnfd = vnfd_descriptor.content
 
         vnfd_path = os.path.join(os.path.basename(base_path), vnfd_list[0])
 
         # Validate VNFD
         log.debug("Validating VNF descriptor file='{}'".format(vnfd_path))
         if not self._schema_validator.validate(
-                vnfd, SchemaValidator.SCHEMA_FUNCTION_DESCRIPTOR):
+                vnfd_descriptor, SchemaValidator.SCHEMA_FUNCTION_DESCRIPTOR):
 
             log.exception("Failed to validate VNF descriptor '{}'"
                           .format(vnfd_path))
@@ -544,17 +750,19 @@ class Packager(object):
         pce = []
         # Create fd location
         fd_path = os.path.join(self._dst_path, "function_descriptors")
-        os.makedirs(fd_path, exist_ok=True)
 
         # Copy the descriptor file
         fd = os.path.join(fd_path, vnfd_list[0])
-        self.copy_descriptor_file(os.path.join(base_path, vnfd_list[0]), fd)
+        fd_md5 = self.stage_descriptor(
+            os.path.join(base_path, vnfd_list[0]), fd,
+            "application/sonata.function_descriptor",
+            descriptor=vnfd_descriptor)
 
         # Generate VNFD Entry
         pce_fd = dict()
         pce_fd["content-type"] = "application/sonata.function_descriptor"
         pce_fd["name"] = "/function_descriptors/{}".format(vnfd_list[0])
-        pce_fd["md5"] = generate_hash(fd)
+        pce_fd["md5"] = fd_md5
         pce.append(pce_fd)
 
         if 'virtual_deployment_units' in vnfd:
@@ -568,21 +776,11 @@ class Packager(object):
                 vdu_image_path = vdu['vm_image']
 
                 if validators.url(vdu_image_path):  # Check if is URL/URI.
-                    try:
-                        # Check if the image URL exists with a short Timeout
-                        requests.head(vdu_image_path, timeout=1)
-
-                    except (requests.Timeout, requests.ConnectionError):
-                        log.warning("Failed to verify the "
-                                    "existence of vm_image '{}'"
-                                    .format(vdu['vm_image']))
-
-                    # Add image URL to artifact dependencies
+                    # Add image URL to artifact dependencies, all of
+                    # them are fetched and hashed at once afterwards
                     self._add_artifact_dependency(
                         name=vnfd['name'] + '-' + vdu['id'] + '-vm_image',
-                        url=vdu['vm_image'],
-                        md5='02236f2ae558018ed14b5222ef1bd9f1')
-                    # TODO: remote url must provide md5? This is dummy!
+                        url=vdu['vm_image'])
 
                     continue
 
@@ -602,15 +800,15 @@ class Packager(object):
                             dir_p='', dir_o=''))
 
                     elif os.path.isdir(bd):
-                        for root, dirs, files in os.walk(bd):
-                            dir_o = root[len(bd):]
-                            dir_p = dir_o.replace(os.path.sep, "/")
-                            for f in files:
-                                if dir_o.startswith(os.path.sep):
-                                    dir_o = dir_o[1:]
-                                pce.append(self.__pce_img_gen__(
-                                    root, vnf, vdu, f,
-                                    dir_p=dir_p, dir_o=dir_o))
+                        # Sorted, so that entries are stable across builds
+                        for rel_path in list_tree(bd):
+                            dir_p, f = posixpath.split(rel_path)
+                            dir_o = os.path.join(*dir_p.split('/')) \
+                                if dir_p else ''
+                            pce.append(self.__pce_img_gen__(
+                                os.path.join(bd, dir_o), vnf, vdu, f,
+                                dir_p='/' + dir_p if dir_p else '',
+                                dir_o=dir_o))
 
                 elif vdu['vm_image_format'] == 'docker':
                     log.debug("Referenced vm_image is docker '{}'"
@@ -626,13 +824,208 @@ class Packager(object):
         a new file and writes in it the digested content.
         :param src_descriptor:
         :param dst_descriptor:
-        :return:
+        :return: The MD5 hash of the new file
         """
-        with open(src_descriptor, "r") as vnfd_file:
-            vnf_content = yaml.load(vnfd_file)
+        descriptor = descriptor_io.load_descriptor(src_descriptor)
+        with open(dst_descriptor, "wb") as vnfd_file:
+            vnfd_file.write(descriptor.digested)
 
-        with open(dst_descriptor, "w") as vnfd_file:
-            vnfd_file.write(yaml.dump(vnf_content, default_flow_style=False))
+        return descriptor.digested_md5
+
+    @tracer.traced(category='staging')
+    def stage_descriptor(self, src, dst, content_type=None, descriptor=None):
+        """
+        Stage the digested content of a descriptor file
+        (see copy_descriptor_file) and obtain its MD5 hash.
+        :param src: The source descriptor file
+        :param dst: The location of the staged descriptor
+        :param content_type: The package content type of the descriptor
+        :param descriptor: The Descriptor of the source file, if it
+                           was already loaded
+        :return: The MD5 hash of the staged descriptor
+        """
+        descriptor = descriptor or descriptor_io.load_descriptor(src)
+        arcname = self._arcname(dst)
+        tracer.annotate(file=arcname)
+        tracer.count('bytes', len(descriptor.digested))
+        self._artifact_sizes[arcname] = len(descriptor.digested)
+        if self._plan:
+            return descriptor.digested_md5
+
+        if self._archive:
+            return self._archive.add_bytes(descriptor.digested,
+                                           self._arcname(dst), content_type)
+
+        def write_descriptor(src_descriptor, dst_descriptor):
+            with open(dst_descriptor, "wb") as vnfd_file:
+                vnfd_file.write(descriptor.digested)
+            return descriptor.digested_md5
+
+        return self.stage_file(src, dst, copy_function=write_descriptor)
+
+    @tracer.traced(category='staging')
+    def stage_file(self, src, dst, copy_function=None, content_type=None):
+        """
+        Stage a package artifact, i.e. place a copy of the source
+        file in the destination folder, and obtain its MD5 hash.
+        Depending on the staging mode, the copy may be a reflink or
+        a hard link of the source instead.
+        Artifacts left unchanged since the previous build are reused.
+        In direct mode, the artifact is written to the package instead.
+        Artifacts copied as they are (without copy_function) with the
+        same content as a previous artifact are stored only once.
+        :param src: The source file
+        :param dst: The location of the staged file
+        :param copy_function: The function that creates the staged file.
+                              It may return the MD5 hash of the file,
+                              which is computed otherwise. If not
+                              specified, the file is copied and hashed
+                              in a single pass.
+        :param content_type: The package content type of the artifact
+        :return: The MD5 hash of the staged file. In plan mode, the
+                 Future of the MD5 hash of the source file.
+        """
+        arcname = self._arcname(dst)
+        tracer.annotate(file=arcname)
+        if copy_function:
+            return self._stage_file(src, dst, copy_function)
+
+        size = os.path.getsize(src)
+        tracer.count('bytes', size)
+        self._artifact_sizes[arcname] = size
+
+        if self._plan:
+            # Nothing is staged, sources are hashed in parallel
+            return self._hash_executor.submit(
+                tracer.propagate(generate_hash), src)
+
+        if self._archive and not self._dedup:
+            # Every artifact is written, whatever its content
+            return self._archive.add_file(src, arcname, content_type)
+
+        if self._archive:
+            # Check and write one artifact at a time, so that each
+            # content is written only once. The archive writes one
+            # member at a time anyway.
+            with self._dedup_lock:
+                md5, duplicate = self._stage_duplicate(src, dst, size)
+                if not duplicate:
+                    md5 = self._archive.add_file(src, arcname, content_type,
+                                                 md5=md5)
+                    self._content_index.add(arcname, size, md5)
+            return md5
+
+        md5, duplicate = self._stage_duplicate(src, dst, size)
+        if duplicate:
+            return md5
+
+        md5 = self._stage_file(src, dst, md5=md5)
+
+        # Identical artifacts staged at the same time
+        blob = self._content_index.add(arcname, size, md5)
+        if blob != arcname:
+            self._link_artifact(src, dst, blob, md5)
+
+        return md5
+
+    def _stage_duplicate(self, src, dst, size):
+        """
+        Stage an artifact with the same content as a previously
+        staged one, as an alias of the latter. Only artifacts with
+        the size of a previous one are hashed.
+        :return: Tuple with the MD5 hash of the artifact, if it was
+                 computed, and whether its content was staged before.
+                 The hash of an artifact that is not a duplicate is
+                 given to its staging, so it is not read twice.
+        """
+        if not self._content_index.may_contain(size):
+            return None, False
+
+        md5 = self._build_cache.lookup(src, dst, staged=False) \
+            if self._build_cache else None
+        md5 = md5 or generate_hash(src)
+
+        blob = self._content_index.lookup(md5)
+        if not blob:
+            return md5, False
+
+        self._content_index.add(self._arcname(dst), size, md5)
+        if not self._archive:
+            self._link_artifact(src, dst, blob, md5)
+
+        return md5, True
+
+    @tracer.traced(category='staging')
+    def _link_artifact(self, src, dst, blob, md5):
+        """
+        Make a staged artifact a hard link to the staged
+        artifact with the same content, to save disk space.
+        """
+        blob_path = os.path.join(self._dst_path, *blob.split('/'))
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+
+        if not os.path.exists(dst) or \
+                not os.path.samefile(blob_path, dst):
+            log.debug("Linking staged artifact '{}' to '{}'"
+                      .format(dst, blob_path))
+            tmp_dst = dst + '.link'
+            try:
+                os.link(blob_path, tmp_dst)
+                os.replace(tmp_dst, dst)
+
+            except OSError:
+                # Hard links are not supported, keep a copy
+                if not os.path.exists(dst):
+                    copy_file(blob_path, dst)
+
+        if self._build_cache:
+            # The artifact shares its content with the source
+            # as much as the staged artifact it is linked to
+            self._build_cache.store(src, dst, md5,
+                                    self._build_cache.staged_as(blob_path))
+
+    def _stage_file(self, src, dst, copy_function=None, md5=None):
+        """
+        Stage an artifact, reusing the staged file of a previous
+        build if possible.
+        :param md5: The MD5 hash of the source, if already known.
+                    The source is then not hashed again.
+        :return: The MD5 hash of the staged file
+        """
+        if self._build_cache:
+            # Staged files are only reused if the current
+            # staging mode allows the way they were staged
+            cached_md5 = self._build_cache.lookup(
+                src, dst, staged_as=STAGING_METHODS[self._staging_mode])
+            if cached_md5:
+                log.debug("Reusing staged artifact '{}'".format(dst))
+                return cached_md5
+
+            # Source is unchanged but the staged copy is not (or was
+            # staged otherwise), restore it without hashing it again
+            cached_md5 = self._build_cache.lookup(src, dst, staged=False) \
+                if not copy_function else None
+            if cached_md5:
+                log.debug("Restoring staged artifact '{}'".format(dst))
+                md5 = cached_md5
+
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if copy_function:
+            md5 = copy_function(src, dst) or generate_hash(dst)
+            staged_as = STAGED_COPY
+        elif md5:
+            staged_as = link_or_copy(src, dst, self._staging_mode)
+        else:
+            md5, staged_as = link_and_hash(src, dst, self._staging_mode)
+
+        if self._build_cache:
+            self._build_cache.store(src, dst, md5, staged_as)
+
+        return md5
+
+    def _arcname(self, dst):
+        """Obtain the package member name of a staged location"""
+        return os.path.relpath(dst, self._dst_path).replace(os.sep, '/')
 
     def __pce_img_gen__(self, bd, vnf, vdu, f, dir_p='', dir_o=''):
         pce = dict()
@@ -649,11 +1042,12 @@ class Packager(object):
     def __pce_img_gen_fc__(self, img_format, vnf, f, root, dir_o=''):
         fd_path = os.path.join("{}_files".format(img_format), vnf, dir_o)
         fd_path = os.path.join(self._dst_path, fd_path)
-        os.makedirs(fd_path, exist_ok=True)
         fd = os.path.join(fd_path, f)
-        shutil.copyfile(os.path.join(root, f), fd)
-        return generate_hash(fd)
+        return self.stage_file(
+            os.path.join(root, f), fd,
+            content_type="application/sonata.{}_files".format(img_format))
 
+    @tracer.traced(category='packager')
     def generate_package(self, name):
         """
         Generate the final package version.
@@ -661,6 +1055,10 @@ class Packager(object):
         the project name will be used if no name provided
         """
 
+        if self._plan:
+            log.critical("Packages are not generated in plan mode.")
+            exit(1)
+
         # Validate all needed information
         if not self._package_descriptor:
             log.critical("Missing package descriptor. "
@@ -674,20 +1072,134 @@ class Packager(object):
 
         # Generate package file
         zip_name = os.path.join(self._dst_path, name + '.son')
-        with closing(zipfile.ZipFile(zip_name, 'w')) as pck:
-            for base, dirs, files in os.walk(self._dst_path):
-                for file_name in files:
-                    full_path = os.path.join(base, file_name)
-                    relative_path = \
-                        full_path[len(self._dst_path) + len(os.sep):]
+        tracer.annotate(package=name)
+        if self._archive and self._reproducible:
+            # Artifacts were written in the order they were processed
+            package_md5 = self._write_sorted_package(
+                self._archive.filename, zip_name)
+        elif self._archive:
+            # Artifacts were already written to the package
+            os.replace(self._archive.filename, zip_name)
+            package_md5 = self._archive.md5
+        else:
+            # Content type of each member, to decide its compression
+            content_types = {
+                pce['name'].lstrip('/'): pce['content-type']
+                for pce in self._package_descriptor['package_content']}
+            content_types[MANIFEST_NAME] = MANIFEST_CONTENT_TYPE
+
+            # A delta package only has the members changed since the base
+            members = None
+            if self._delta_base:
+                members = self._delta_base.changed_members(
+                    self._package_descriptor)
+                zip_name = os.path.join(self._dst_path,
+                                        name + '.delta.son')
+                log.info("Delta package against '{}': {} changed members"
+                         .format(self._delta_base.filename, len(members)))
+
+            # With dedup, artifacts with the content
+            # of another one are not stored
+            aliases = self._content_index.sorted_aliases() \
+                if self._dedup else {}
+
+            # Members are added in the sorted order of their names,
+            # not in the order of the file system. A delta package is
+            # completed afterwards, with its delta descriptor.
+            pck_name = zip_name + '.part' if members is not None \
+                else zip_name
+            pck = PackageArchive(pck_name, policy=self._compression_policy,
+                                 jobs=self._jobs,
+                                 reproducible=self._reproducible)
+            for arcname in list_tree(self._dst_path):
+                full_path = os.path.join(self._dst_path, *arcname.split('/'))
+                if full_path == zip_name or \
+                        full_path in self._keep_files or \
+                        arcname == BuildCache.__cache_name__ or \
+                        arcname in aliases:
+                    continue
+
+                if members is not None and \
+                        arcname not in members and \
+                        arcname != MANIFEST_NAME:
+                    continue
+
+                pck.add_file(full_path, arcname, content_types.get(arcname))
 
-                    if not full_path == zip_name:
-                        pck.write(full_path, relative_path)
+            if aliases:
+                pck.add_bytes(dump_aliases(aliases), ALIASES_NAME,
+                              MANIFEST_CONTENT_TYPE)
 
-        package_md5 = generate_hash(zip_name)
+            package_md5 = pck.close()
+            if members is not None:
+                package_md5 = self._complete_delta_package(
+                    pck_name, zip_name, members)
+
+        self._package_file = zip_name
         log.info("Package generated successfully.\nFile: {}\nMD5: {}\n"
                  .format(os.path.abspath(zip_name), package_md5))
 
+        return package_md5
+
+    def _write_sorted_package(self, part_name, zip_name):
+        """
+        Write the members of a package generated in direct mode in the
+        order and with the aliases of a package generated from the
+        destination folder, so that both are the same file. Members
+        are copied as they are stored, without compressing them again.
+        :param part_name: The package generated in direct mode
+        :param zip_name: The package file to create
+        :return: The MD5 of the package
+        """
+        aliases = self._content_index.aliases
+        sorted_aliases = self._content_index.sorted_aliases()
+
+        with zipfile.ZipFile(part_name) as part:
+            names = set(part.namelist()) | set(aliases)
+            names.discard(ALIASES_NAME)
+
+            pck = PackageArchive(zip_name, policy=self._compression_policy,
+                                 reproducible=self._reproducible)
+            for arcname in sorted(names - set(sorted_aliases)):
+                # Content held by the first artifact processed
+                pck.copy_member(part, aliases.get(arcname, arcname),
+                                arcname)
+
+        if sorted_aliases:
+            pck.add_bytes(dump_aliases(sorted_aliases), ALIASES_NAME,
+                          MANIFEST_CONTENT_TYPE)
+
+        os.remove(part_name)
+        return pck.close()
+
+    def _complete_delta_package(self, part_name, zip_name, members):
+        """
+        Add the delta descriptor to a delta package. It records the
+        MD5 of the full package, which is computed by rebuilding the
+        full package from the base and delta packages, as son-package
+        --reconstruct does, without writing it.
+        :param part_name: The delta package, without delta descriptor
+        :param zip_name: The delta package file to create
+        :param members: The package content members in the delta package
+        :return: The MD5 of the delta package
+        """
+        with zipfile.ZipFile(self._delta_base.filename) as base, \
+                zipfile.ZipFile(part_name) as part:
+            full_md5 = write_full_package(base, part, os.devnull,
+                                          check=False)
+            log.info("Full package MD5: {}".format(full_md5))
+
+            pck = PackageArchive(zip_name, policy=self._compression_policy,
+                                 reproducible=self._reproducible)
+            for zinfo in part.infolist():
+                pck.copy_member(part, zinfo.filename)
+
+        delta_manifest = self._delta_base.delta_manifest(members, full_md5)
+        pck.add_bytes(descriptor_io.dump(delta_manifest).encode('utf-8'),
+                      DELTA_MANIFEST_NAME, MANIFEST_CONTENT_TYPE)
+        os.remove(part_name)
+        return pck.close()
+
     def register_ns_vnf(self, vnf_id):
         """
         Add a vnf to the NS VNF registry.
@@ -695,19 +1207,21 @@ class Packager(object):
         :return: True for successful registry.
                  False if the VNF already exists in the registry.
         """
-        if vnf_id in self._ns_vnf_registry:
-            return False
+        with self._lock:
+            if vnf_id in self._ns_vnf_registry:
+                return False
 
-        self._ns_vnf_registry[vnf_id] = False
-        return True
+            self._ns_vnf_registry[vnf_id] = False
+            return True
 
     def check_in_ns_vnf(self, vnf_id):
         """Marks a VNF as packaged in the SD VNF registry."""
-        if vnf_id not in self._ns_vnf_registry:
-            return False
+        with self._lock:
+            if vnf_id not in self._ns_vnf_registry:
+                return False
 
-        self._ns_vnf_registry[vnf_id] = True
-        return True
+            self._ns_vnf_registry[vnf_id] = True
+            return True
 
     def get_unpackaged_ns_vnfs(self):
         """
@@ -715,9 +1229,10 @@ class Packager(object):
         by NS but weren't packaged.
         """
         u_vnfs = []
-        for vnf in self._ns_vnf_registry:
-            if not self._ns_vnf_registry[vnf]:
-                u_vnfs.append(vnf)
+        with self._lock:
+            for vnf in self._ns_vnf_registry:
+                if not self._ns_vnf_registry[vnf]:
+                    u_vnfs.append(vnf)
 
         return u_vnfs
 
@@ -726,46 +1241,87 @@ class Packager(object):
 
         log.debug("Adding package resolver entry '{}'".format(name))
 
-        # Check if already included
-        for pr_entry in self._package_resolvers:
-            if pr_entry['name'] == name:
-                log.debug("Package resolver entry '{}' "
-                          "was previously added. Ignoring."
-                          .format(name))
-                return
+        with self._lock:
+            # Check if already included
+            for pr_entry in self._package_resolvers:
+                if pr_entry['name'] == name:
+                    log.debug("Package resolver entry '{}' "
+                              "was previously added. Ignoring."
+                              .format(name))
+                    return
 
-        pr_entry = {'name': name,
-                    'credentials': {
-                        'username': username,
-                        'password': password
-                    }}
+            pr_entry = {'name': name,
+                        'credentials': {
+                            'username': username,
+                            'password': password
+                        }}
 
-        self._package_resolvers.append(pr_entry)
+            self._package_resolvers.append(pr_entry)
 
-    def _add_artifact_dependency(self, name, url, md5, username='username',
-                                 password='password'):
+    def _add_artifact_dependency(self, name, url, md5=None,
+                                 username='username', password='password'):
 
         log.debug("Adding artifact dependency entry '{}'".format(name))
 
-        # Check if already included
+        with self._lock:
+            # Check if already included
+            for ad_entry in self._artifact_dependencies:
+                if ad_entry['name'] == name:
+                    log.debug("Artifact dependency entry '{}' "
+                              "was previously added. Ignoring."
+                              .format(name))
+                    return
+
+            ad_entry = {'name': name,
+                        'url': url,
+                        'credentials': {
+                            'username': username,
+                            'password': password
+                        }}
+            if md5:
+                ad_entry['md5'] = md5
+            self._artifact_dependencies.append(ad_entry)
+
+            # Set package sealed to false as it will not be self-contained
+            self._sealed = False
+
+    @tracer.traced(category='packager')
+    def check_artifact_dependencies(self):
+        """
+        Obtain the MD5 hashes of the remote artifact dependencies, e.g.
+        vm_images referenced by URL. The artifacts are fetched at the
+        same time and hashed as they are streamed. The hashes are kept
+        in the workspace cache, so that following builds only fetch
+        the artifacts that changed. In plan mode, nothing is fetched:
+        only the hashes found in the workspace cache, even expired,
+        are used and the other artifacts are left without MD5.
+        """
+        if self._remote_cache:
+            self._remote_cache.load()
+
+        urls = [ad_entry['url'] for ad_entry in self._artifact_dependencies]
+        if self._plan:
+            entries = {url: self._remote_cache.lookup(url, fresh=False)
+                       for url in urls} if self._remote_cache else {}
+        else:
+            entries = fetch_urls(urls, cache=self._remote_cache)
+
         for ad_entry in self._artifact_dependencies:
-            if ad_entry['name'] == name:
-                log.debug("Artifact dependency entry '{}' "
-                          "was previously added. Ignoring."
-                          .format(name))
-                return
+            entry = entries.get(ad_entry['url'])
+            if self._plan and not entry:
+                log.info("vm_image '{}' is not in the workspace cache, "
+                         "its MD5 is not planned".format(ad_entry['url']))
+                continue
+
+            if not entry or not entry['md5']:
+                log.warning("Failed to obtain the MD5 of vm_image '{}'"
+                            .format(ad_entry['url']))
+                continue
 
-        ad_entry = {'name': name,
-                    'url': url,
-                    'md5': md5,
-                    'credentials': {
-                        'username': username,
-                        'password': password
-                    }}
-        self._artifact_dependencies.append(ad_entry)
+            ad_entry['md5'] = entry['md5']
 
-        # Set package sealed to false as it will not be self-contained
-        self._sealed = False
+        if self._remote_cache and not self._plan:
+            self._remote_cache.save()
 
     def load_vnf_from_catalogue_server(self, vnf_id):
 
@@ -775,23 +1331,32 @@ class Packager(object):
                         "Please check the workspace configuration.")
             return
 
-        # For now, perform sequential requests.
-        # In the future, this should be parallel
+        # Request the VNF from all the servers at once,
         # the first to arrive, the first to be consumed!
-        for client in self._catalogueClients:
+        # Requests run on daemon threads, so the servers that did not
+        # respond yet are ignored and do not delay the exit.
+        responses = queue.Queue()
+        get_vnf = tracer.propagate(self._get_catalogue_vnf)
+
+        def request(client):
+            vnfd = None
+            try:
+                vnfd = get_vnf(client, vnf_id)
+            finally:
+                responses.put((client, vnfd))
 
-            log.debug("Contacting catalogue server '{}'..."
-                      .format(client.base_url))
-            # Check if catalogue server is alive!
-            if not client.alive():
-                log.warning("Catalogue server '{}' is not available."
-                            .format(client.base_url))
-                continue
+        for client in self._catalogueClients:
+            threading.Thread(target=request, args=(client,),
+                             daemon=True).start()
 
-            vnfd = client.get_vnf(vnf_id)
+        for _ in self._catalogueClients:
+            client, vnfd = responses.get()
             if not vnfd:
                 continue
 
+            log.debug("VNF id='{}' obtained from catalogue server '{}'"
+                      .format(vnf_id, client.base_url))
+
             # Mark this catalogue server as a dependency
             self._add_package_resolver(client.base_url)
 
@@ -799,6 +1364,94 @@ class Packager(object):
 
         return
 
+    @staticmethod
+    def _get_catalogue_vnf(client, vnf_id):
+        """
+        Obtain a VNF from a catalogue server.
+        :return: The VNF descriptor, None if the server is
+                 unavailable or the VNF is not valid
+        """
+        log.debug("Contacting catalogue server '{}'..."
+                  .format(client.base_url))
+        try:
+            vnfd = client.get_vnf(vnf_id)
+
+        except requests.exceptions.RequestException:
+            log.warning("Catalogue server '{}' is not available."
+                        .format(client.base_url))
+            return
+
+        except descriptor_io.YAMLError:
+            log.warning("Invalid VNF id='{}' obtained from catalogue "
+                        "server '{}'".format(vnf_id, client.base_url))
+            return
+
+        if not isinstance(vnfd, dict):
+            return
+
+        return vnfd
+
+
+def sort_package_descriptor(pd):
+    """
+    Sort the entries of the sections of a package descriptor by name.
+    Their order is meaningless, but it depends on the order in which
+    VNFs and artifacts were processed, so it is fixed in reproducible
+    packages.
+    :param pd: The package descriptor, sorted in place
+    """
+    for section in ('package_content', 'package_resolvers',
+                    'artifact_dependencies'):
+        if pd.get(section):
+            pd[section].sort(key=lambda entry: entry['name'])
+
+
+def print_plan(packager, file=sys.stdout):
+    """
+    Print the package descriptor computed in plan mode, as the
+    META-INF/MANIFEST.MF of the package, followed by the size of
+    the package content by content type. The report is made of YAML
+    comments, so the whole output is still a valid descriptor.
+    :param packager: The Packager, in plan mode
+    """
+    pd = packager.package_descriptor
+    sizes = packager.artifact_sizes
+    print(descriptor_io.dump(pd), end='', file=file)
+
+    by_type = {}
+    content = {}
+    for pce in pd['package_content']:
+        size = sizes.get(pce['name'].lstrip('/'), 0)
+        count, total = by_type.get(pce['content-type'], (0, 0))
+        by_type[pce['content-type']] = (count + 1, total + size)
+        content[pce['md5']] = size
+
+    width = max([len(t) for t in by_type] + [len('Content type')])
+    row = "# {:<" + str(width) + "}  {:>6}  {:>14}"
+
+    print("#", file=file)
+    print(row.format("Content type", "Files", "Size"), file=file)
+    for content_type, (count, total) in sorted(by_type.items()):
+        print(row.format(content_type, count, total), file=file)
+    print(row.format("Total", len(pd['package_content']), sum(
+        total for _, total in by_type.values())), file=file)
+
+    print("# Identical content, stored once{}: {} bytes less"
+          .format('' if packager.dedup else " with --dedup",
+                  sum(total for _, total in by_type.values()) -
+                  sum(content.values())), file=file)
+
+    dependencies = pd.get('artifact_dependencies') or []
+    if dependencies:
+        print("# Artifact dependencies, not included: {}"
+              .format(len(dependencies)), file=file)
+
+    # Remote artifacts are not fetched when planning
+    for ad_entry in dependencies:
+        if not ad_entry.get('md5'):
+            print("# Not in the workspace cache, MD5 unknown: {}"
+                  .format(ad_entry['url']), file=file)
+
 
 def get_vnf_id(vnfd):
     return get_vnf_id_full(vnfd['vendor'], vnfd['name'], vnfd['version'])
@@ -854,13 +1507,235 @@ def main():
         help="create the package with the specific name",
         required=False)
 
+    parser.add_argument(
+        "--direct",
+        help="write the package artifacts directly into the package file, "
+             "without staging them in the destination folder",
+        action="store_true",
+        required=False)
+
+    parser.add_argument(
+        "--no-cache",
+        help="discard the artifacts of previous builds and "
+             "package the project from scratch",
+        action="store_true",
+        required=False)
+
+    parser.add_argument(
+        "--reproducible",
+        help="generate the same package file for the same project "
+             "content: members are sorted and get fixed timestamps and "
+             "permissions",
+        action="store_true",
+        required=False)
+
+    parser.add_argument(
+        "--staging",
+        help="how artifacts are staged in the destination folder: "
+             "'safe' clones (reflink) the sources when the file system "
+             "supports it and copies them otherwise, so that staged "
+             "artifacts never share their content with the sources, "
+             "'link' also hard links them, so that staged artifacts "
+             "modified in place modify their sources, and 'copy' "
+             "always copies them. Default is 'safe'",
+        choices=STAGING_MODES,
+        default=STAGING_SAFE,
+        required=False)
+
+    parser.add_argument(
+        "--dedup",
+        help="store artifacts with identical content only once in the "
+             "package, declaring the others in META-INF/ALIASES.MF. "
+             "Packages generated with --dedup can only be read by "
+             "consumers that support it",
+        action="store_true",
+        required=False)
+
+    parser.add_argument(
+        "--compression-level",
+        help="compression level (1-9) of the compressed package members. "
+             "Level 0 disables compression. Default is {}"
+             .format(CompressionPolicy.DEFAULT_LEVEL),
+        type=int,
+        default=CompressionPolicy.DEFAULT_LEVEL,
+        choices=range(10),
+        metavar="LEVEL",
+        required=False)
+
+    parser.add_argument(
+        "-j", "--jobs",
+        help="number of VNFs to be processed, and package members to be "
+             "compressed, in parallel. With --batch, number of projects "
+             "to be packaged in parallel. Default is 1. With --verify "
+             "or --plan, number of members verified, or artifacts "
+             "hashed, in parallel. Default is the number of CPUs",
+        type=int,
+        required=False)
+
+    parser.add_argument(
+        "--delta-from",
+        help="generate a delta package, holding only the members that "
+             "changed since the given previous package",
+        metavar="PACKAGE",
+        required=False)
+
+    parser.add_argument(
+        "--reconstruct",
+        help="rebuild a full package from its base package and a delta "
+             "package",
+        nargs=2,
+        metavar=("BASE", "DELTA"),
+        required=False)
+
+    parser.add_argument(
+        "--inspect",
+        help="list the members of a package, with their sizes, content "
+             "types and MD5 hashes, without extracting it",
+        metavar="PACKAGE",
+        required=False)
+
+    parser.add_argument(
+        "--verify",
+        help="check the MD5 of every member of a package against its "
+             "package descriptor, and validate the package descriptor, "
+             "without extracting the package",
+        metavar="PACKAGE",
+        required=False)
+
+    parser.add_argument(
+        "--plan",
+        help="validate the project and resolve its dependencies, "
+             "hashing the artifacts straight from their sources, and "
+             "print the package descriptor of the package, with the "
+             "size of its content, without staging the artifacts or "
+             "writing the package",
+        action="store_true",
+        required=False)
+
+    parser.add_argument(
+        "--batch",
+        help="package all the projects matching the given paths or "
+             "glob patterns in a single run",
+        nargs='+',
+        metavar="PROJECT",
+        required=False)
+
+    tracer.add_arguments(parser)
+
     args = parser.parse_args()
 
+    if args.trace:
+        tracer.trace_to(args.trace, args.trace_format)
+
+    if args.inspect:
+        from son.package.reader import PackageReader, print_members
+
+        try:
+            with PackageReader(args.inspect) as reader:
+                print_members(reader)
+        except (OSError, zipfile.BadZipFile) as e:
+            print("Failed to inspect package '{}': {}"
+                  .format(args.inspect, e), file=sys.stderr)
+            exit(1)
+        return
+
+    if args.verify:
+        from son.package.verify import PackageVerifier, print_report
+
+        ws_root = args.workspace or Workspace.DEFAULT_WORKSPACE_DIR
+        if os.path.isfile(os.path.join(ws_root,
+                                       Workspace.__descriptor_name__)):
+            workspace = Workspace.__create_from_descriptor__(ws_root)
+        else:
+            workspace = Workspace(ws_root)
+
+        verifier = PackageVerifier(SchemaValidator(workspace),
+                                   jobs=args.jobs)
+        try:
+            report = verifier.verify(args.verify)
+        except (OSError, zipfile.BadZipFile) as e:
+            print("Failed to verify package '{}': {}"
+                  .format(args.verify, e), file=sys.stderr)
+            exit(1)
+
+        print_report(report)
+        if not report['ok']:
+            exit(1)
+        return
+
+    if args.reconstruct:
+        from son.package.delta import read_manifest, reconstruct
+
+        base, delta = args.reconstruct
+        name = args.name
+        if not name:
+            manifest = read_manifest(delta)
+            name = manifest['vendor'] + "." + manifest['name'] + "." + \
+                manifest['version']
+
+        zip_name = os.path.join(args.destination or os.getcwd(),
+                                name + '.son')
+        package_md5 = reconstruct(base, delta, zip_name)
+        if not package_md5:
+            print("Failed to reconstruct the package", file=sys.stderr)
+            exit(1)
+
+        print("Package reconstructed successfully.\nFile: {}\nMD5: {}"
+              .format(os.path.abspath(zip_name), package_md5))
+        return
+
+    if args.delta_from and args.direct:
+        print("--delta-from can not be used with --direct", file=sys.stderr)
+        exit(1)
+
+    if args.plan and (args.batch or args.direct or args.delta_from):
+        print("--plan can not be used with --batch, --direct or "
+              "--delta-from", file=sys.stderr)
+        exit(1)
+
     if args.workspace:
         ws_root = args.workspace
     else:
         ws_root = Workspace.DEFAULT_WORKSPACE_DIR
 
+    jobs = args.jobs or 1
+    if args.plan and not args.jobs:
+        jobs = os.cpu_count() or 1
+
+    if args.batch:
+        from son.package.batch import BatchPackager, find_projects, \
+            print_summary
+
+        if not __validate_directory__(
+                paths={ws_root: Workspace.__descriptor_name__}):
+            return
+
+        projects = find_projects(args.batch)
+        if not projects:
+            print("No projects found matching '{}'"
+                  .format(' '.join(args.batch)), file=sys.stderr)
+            exit(1)
+
+        workspace = Workspace.__create_from_descriptor__(ws_root)
+        batch = BatchPackager(workspace, dst_path=args.destination,
+                              jobs=jobs,
+                              use_cache=not args.no_cache,
+                              direct=args.direct,
+                              compression_level=args.compression_level,
+                              reproducible=args.reproducible,
+                              staging_mode=args.staging,
+                              dedup=args.dedup)
+
+        try:
+            summaries = batch.package_projects(projects)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            exit(1)
+        print_summary(summaries)
+        if any(s['status'] != BatchPackager.STATUS_OK for s in summaries):
+            exit(1)
+        return
+
     prj_root = args.project if args.project else os.getcwd()
 
     # Validate given arguments
@@ -874,5 +1749,21 @@ def main():
     workspace = Workspace.__create_from_descriptor__(ws_root)
     project = Project.__create_from_descriptor__(workspace, prj_root)
 
-    pck = Packager(workspace, project, dst_path=args.destination)
+    pck = Packager(workspace, project, dst_path=args.destination,
+                   jobs=jobs, use_cache=not args.no_cache,
+                   direct=args.direct,
+                   compression_level=args.compression_level,
+                   delta_from=args.delta_from,
+                   reproducible=args.reproducible,
+                   plan=args.plan,
+                   staging_mode=args.staging,
+                   dedup=args.dedup)
+
+    if args.plan:
+        if not pck.package_descriptor:
+            print("Failed to plan the package", file=sys.stderr)
+            exit(1)
+        print_plan(pck)
+        return
+
     pck.generate_package(args.name)
@@ -0,0 +1,158 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import logging
+import sys
+import zipfile
+
+from son.package.dedup import read_aliases
+from son.package.delta import MANIFEST_NAME
+from son.schema import descriptor_io
+
+log = logging.getLogger(__name__)
+
+
+class PackageReader(object):
+    """
+    Random access to the content of a package file, without
+    extracting it. Opening a package only reads the zip central
+    directory and the package descriptor (META-INF/MANIFEST.MF).
+    Other members are only read when they are opened, as their
+    streams are read.
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: The package file
+        """
+        self._filename = filename
+        self._zip = zipfile.ZipFile(filename)
+        self._aliases = read_aliases(self._zip)
+
+        self._manifest = dict()
+        if MANIFEST_NAME in self._zip.NameToInfo:
+            self._manifest = \
+                descriptor_io.load(self._zip.read(MANIFEST_NAME)) or dict()
+        else:
+            log.warning("Package '{}' has no package descriptor"
+                        .format(filename))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __contains__(self, name):
+        """Checks if the package stores the content of a member"""
+        name = name.lstrip('/')
+        return self._aliases.get(name, name) in self._zip.NameToInfo
+
+    @property
+    def filename(self):
+        return self._filename
+
+    @property
+    def manifest(self):
+        """The package descriptor, empty if the package has none"""
+        return self._manifest
+
+    @property
+    def aliases(self):
+        """Dictionary with the member holding the content of each alias"""
+        return self._aliases
+
+    def members(self):
+        """
+        List the members of the package. Package content entries
+        come first, in the order of the package descriptor, followed
+        by the members that are not package content.
+        :return: List of dictionaries with the name, content type and
+                 declared MD5 ('content-type' and 'md5', None if not
+                 declared) of each member, along with the member that
+                 stores its data ('stored_as'), its 'size' and its
+                 'compressed_size', which are None if it is missing
+        """
+        members = []
+        names = set()
+        for pce in self._manifest.get('package_content') or []:
+            name = pce['name'].lstrip('/')
+            names.add(name)
+            members.append(self._member(name, pce.get('content-type'),
+                                        pce.get('md5')))
+
+        for info in self._zip.infolist():
+            if info.filename not in names and not info.is_dir():
+                members.append(self._member(info.filename))
+
+        return members
+
+    def _member(self, name, content_type=None, md5=None):
+        stored_as = self._aliases.get(name, name)
+        info = self._zip.NameToInfo.get(stored_as)
+        return {'name': name,
+                'content-type': content_type,
+                'md5': md5,
+                'stored_as': stored_as,
+                'size': info.file_size if info else None,
+                'compressed_size': info.compress_size if info else None}
+
+    def open(self, name):
+        """
+        Open a member of the package. Its data is read, and
+        decompressed, as the returned stream is read.
+        :param name: The name of the member, e.g. as in the package
+                     descriptor. The content of an alias is read
+                     from the member that stores it.
+        :return: A binary file object
+        :raises KeyError: if the package has no such member
+        """
+        name = name.lstrip('/')
+        return self._zip.open(self._aliases.get(name, name))
+
+    def close(self):
+        self._zip.close()
+
+
+def print_members(reader, file=sys.stdout):
+    """
+    Print the members of a package, as listed by PackageReader.members.
+    Aliases are shown with the member that stores their content.
+    """
+    members = reader.members()
+    names = [m['name'] if m['stored_as'] == m['name']
+             else "{} -> {}".format(m['name'], m['stored_as'])
+             for m in members]
+    width = max([len(name) for name in names] + [len('Name')])
+    row = "{:<" + str(width) + "}  {:>12}  {:>12}  {:<40}  {}"
+
+    print(row.format("Name", "Size", "Compressed", "Content type", "MD5"),
+          file=file)
+    for name, m in zip(names, members):
+        print(row.format(name, *['-' if m[key] is None else m[key]
+                                 for key in ('size', 'compressed_size',
+                                             'content-type', 'md5')]),
+              file=file)
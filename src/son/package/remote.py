@@ -0,0 +1,298 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from son.package.hashing import CHUNK_SIZE
+from son.schema import descriptor_io
+from son.trace import tracer
+
+log = logging.getLogger(__name__)
+
+# Maximum number of remote artifacts fetched at the same time
+MAX_REQUESTS = 16
+
+# Seconds to wait for the server to respond (connect, read)
+FETCH_TIMEOUT = (3.05, 30)
+
+# Serializes the saves of the caches of the builds run by the
+# threads of a process (e.g. son-package --batch), which each
+# have their own cache of the same workspace file
+_save_lock = threading.Lock()
+
+
+class RemoteArtifactCache(object):
+    """
+    Keeps the metadata of remote artifacts, e.g. vm_images referenced
+    by URL, in the workspace: their HTTP status, size, validators
+    (ETag and Last-Modified) and MD5 hash. An entry is reused by other
+    builds without contacting the server until it is older than the
+    cache TTL. Then, it is revalidated with a conditional request and
+    the artifact is only fetched again if it changed.
+    """
+
+    CACHE_VERSION = "0.1"
+
+    # Seconds during which a check is reused
+    DEFAULT_TTL = 3600
+
+    __cache_name__ = 'remote-artifacts.yml'
+
+    def __init__(self, cache_dir, ttl=DEFAULT_TTL):
+        self._cache_dir = cache_dir
+        self._filename = os.path.join(cache_dir,
+                                      RemoteArtifactCache.__cache_name__)
+        self._ttl = ttl
+        self._entries = dict()
+        self._updated = set()
+        self._lock = threading.Lock()
+
+    @property
+    def filename(self):
+        return self._filename
+
+    def load(self):
+        """
+        Load the cached checks.
+        An unreadable or outdated cache is discarded.
+        """
+        with self._lock:
+            self._entries = self._read()
+
+    def save(self):
+        """
+        Write the checks updated by this build. Entries written
+        meanwhile by other builds are kept.
+        """
+        with _save_lock, self._lock:
+            if not self._updated:
+                return
+
+            entries = self._read()
+            for url in self._updated:
+                entries[url] = self._entries[url]
+
+            try:
+                os.makedirs(self._cache_dir, exist_ok=True)
+                fd, tmp_filename = tempfile.mkstemp(
+                    dir=self._cache_dir,
+                    prefix=RemoteArtifactCache.__cache_name__ + '.')
+                try:
+                    with os.fdopen(fd, 'w') as cache_file:
+                        descriptor_io.dump(
+                            {'version': RemoteArtifactCache.CACHE_VERSION,
+                             'entries': entries}, cache_file)
+                    os.replace(tmp_filename, self._filename)
+
+                except OSError:
+                    os.remove(tmp_filename)
+                    raise
+
+            except OSError as e:
+                log.warning("Unable to save the remote artifact cache "
+                            "'{}': {}".format(self._filename, e))
+                return
+
+            self._entries = entries
+            self._updated.clear()
+
+    def lookup(self, url, fresh=True):
+        """
+        Obtain the metadata of a remote artifact.
+        :param url: The URL of the artifact
+        :param fresh: Require the entry not to be expired.
+                      If False, expired entries are also returned,
+                      e.g. to revalidate them.
+        :return: The cached entry, None if there is no valid entry
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+
+        if not entry or \
+                fresh and time.time() - entry['checked'] > self._ttl:
+            return
+
+        return entry
+
+    def store(self, url, entry):
+        """
+        Record the metadata of a remote artifact.
+        :param url: The URL of the artifact
+        :param entry: The metadata obtained from the server
+        """
+        entry = dict(entry, checked=time.time())
+        with self._lock:
+            self._entries[url] = entry
+            self._updated.add(url)
+
+    def _read(self):
+        if not os.path.isfile(self._filename):
+            return dict()
+
+        try:
+            with open(self._filename, 'r') as cache_file:
+                cache = descriptor_io.load(cache_file)
+
+        except descriptor_io.YAMLError:
+            log.warning("Discarding invalid remote artifact cache '{}'"
+                        .format(self._filename))
+            return dict()
+
+        if not isinstance(cache, dict) or \
+                cache.get('version') != RemoteArtifactCache.CACHE_VERSION:
+            log.debug("Discarding outdated remote artifact cache '{}'"
+                      .format(self._filename))
+            return dict()
+
+        return cache.get('entries') or dict()
+
+
+def create_session(max_requests=MAX_REQUESTS):
+    """
+    Create an HTTP session whose connection pools
+    can be used by several threads at the same time.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=max_requests)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+@tracer.traced('GET', 'http')
+def fetch_url(session, url, entry=None, timeout=FETCH_TIMEOUT):
+    """
+    Fetch a remote artifact, computing its MD5 hash as it is
+    streamed, without keeping it in memory. If a previous entry with
+    validators is given, the artifact is only fetched if it changed.
+    :param session: The HTTP session
+    :param url: The URL of the artifact
+    :param entry: The cached entry of the artifact
+    :param timeout: Seconds to wait for the server
+    :return: Dictionary with the HTTP status, size, ETag, Last-Modified
+             and MD5 of the artifact, None if the server is unavailable
+    """
+    tracer.annotate(url=url)
+    headers = dict()
+    if entry and entry.get('md5'):
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    try:
+        with session.get(url, headers=headers, stream=True,
+                         timeout=timeout) as response:
+            tracer.annotate(status=response.status_code)
+
+            if headers and response.status_code == \
+                    requests.codes.not_modified:
+                log.debug("Remote artifact '{}' did not change"
+                          .format(url))
+                return dict(entry)
+
+            size = response.headers.get('Content-Length')
+            result = {'status': response.status_code,
+                      'size': int(size) if size and size.isdigit()
+                      else None,
+                      'etag': response.headers.get('ETag'),
+                      'last_modified': response.headers.get('Last-Modified'),
+                      'md5': None}
+
+            if response.status_code != requests.codes.ok:
+                return result
+
+            log.debug("Fetching remote artifact '{}'".format(url))
+            md5 = hashlib.md5()
+            fetched = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                md5.update(chunk)
+                fetched += len(chunk)
+            tracer.count('bytes', fetched)
+
+            result['md5'] = md5.hexdigest()
+            return result
+
+    except requests.RequestException as e:
+        log.debug("Failed to fetch remote artifact '{}': {}"
+                  .format(url, e))
+        return
+
+
+def fetch_urls(urls, cache=None, max_requests=MAX_REQUESTS,
+               timeout=FETCH_TIMEOUT):
+    """
+    Fetch several remote artifacts at the same time, over pooled
+    connections. Artifacts in the cache are not requested again
+    until their entries expire, and then only if they changed.
+    :param urls: The URLs of the artifacts
+    :param cache: The RemoteArtifactCache of the workspace
+    :param max_requests: Maximum number of requests at the same time
+    :param timeout: Seconds to wait for each server
+    :return: Dictionary with the entry of each URL, as in fetch_url
+    """
+    entries = dict()
+    pending = []
+    for url in urls:
+        if url in entries or url in pending:
+            continue
+
+        entry = cache.lookup(url) if cache else None
+        if entry:
+            log.debug("Using cached entry of '{}'".format(url))
+            entries[url] = entry
+        else:
+            pending.append(url)
+
+    if not pending:
+        return entries
+
+    def fetch(url):
+        entry = cache.lookup(url, fresh=False) if cache else None
+        return fetch_url(session, url, entry, timeout)
+
+    log.debug("Fetching {} remote artifacts".format(len(pending)))
+    session = create_session(max_requests)
+    with session, ThreadPoolExecutor(
+            max_workers=min(len(pending), max_requests)) as executor:
+
+        for url, entry in zip(pending, executor.map(
+                tracer.propagate(fetch), pending)):
+            entries[url] = entry
+            # Unavailable servers are contacted again on the next build
+            if entry and cache:
+                cache.store(url, entry)
+
+    return entries
@@ -0,0 +1,266 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import errno
+import hashlib
+import logging
+import os
+import shutil
+
+from son.package.hashing import get_buffer, hash_file
+from son.trace import tracer
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+# Size of the buffers used to copy artifacts
+BUFFER_SIZE = 1024 * 1024
+
+# How artifacts are staged from their sources:
+# - safe (default): clone the source (reflink) if the file system
+#   supports it, copy it otherwise. Staged artifacts never share
+#   their content with the sources, even if either of them is
+#   modified in place after the build.
+# - link: clone the source if possible, hard link it otherwise, and
+#   copy it only if neither is possible. Hard linked artifacts share
+#   their content with their sources: a staged artifact modified in
+#   place (or whose permissions are changed) also modifies its source.
+# - copy: always copy the source
+STAGING_LINK = 'link'
+STAGING_SAFE = 'safe'
+STAGING_COPY = 'copy'
+STAGING_MODES = (STAGING_LINK, STAGING_SAFE, STAGING_COPY)
+
+# How a staged artifact was produced from its source
+STAGED_REFLINK = 'reflink'
+STAGED_HARDLINK = 'hardlink'
+STAGED_COPY = 'copy'
+
+# Staged artifacts allowed by each staging mode
+STAGING_METHODS = {
+    STAGING_LINK: (STAGED_REFLINK, STAGED_HARDLINK, STAGED_COPY),
+    STAGING_SAFE: (STAGED_REFLINK, STAGED_COPY),
+    STAGING_COPY: (STAGED_COPY,)}
+
+# ioctl cloning a file on Linux (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+# Pairs of devices between which reflinks or hard links failed,
+# so that they are not attempted again for each artifact
+_unsupported = set()
+
+
+def link_file(src, dst, mode=STAGING_SAFE):
+    """
+    Stage a file without copying its content, as a clone (reflink) or
+    a hard link of the source, as allowed by the staging mode. Clones
+    and hard links require the source and destination to be on the
+    same file system. An existing destination is replaced.
+    :param src: The source file
+    :param dst: The destination file
+    :param mode: The staging mode (see STAGING_MODES)
+    :return: STAGED_REFLINK or STAGED_HARDLINK if the file was
+             staged, None if it must be copied
+    """
+    remove_file(dst)
+    if mode == STAGING_COPY:
+        return
+
+    devices = (os.stat(src).st_dev,
+               os.stat(os.path.dirname(os.path.abspath(dst))).st_dev)
+
+    if (STAGED_REFLINK,) + devices not in _unsupported:
+        if reflink(src, dst):
+            tracer.annotate(staged_as=STAGED_REFLINK)
+            return STAGED_REFLINK
+        _unsupported.add((STAGED_REFLINK,) + devices)
+
+    if mode == STAGING_LINK and \
+            (STAGED_HARDLINK,) + devices not in _unsupported:
+        try:
+            os.link(src, dst)
+            tracer.annotate(staged_as=STAGED_HARDLINK)
+            return STAGED_HARDLINK
+
+        except OSError as e:
+            log.debug("Unable to hard link '{}': {}".format(src, e))
+            _unsupported.add((STAGED_HARDLINK,) + devices)
+
+
+def reflink(src, dst):
+    """
+    Clone a file: the clone shares the content of the source
+    until either of them is modified (copy on write).
+    :param src: The source file
+    :param dst: The clone to create
+    :return: True if the file was cloned, False if the platform
+             or the file system do not support it
+    """
+    if fcntl is None:
+        return False
+
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'xb') as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                return True
+
+            except OSError as e:
+                log.debug("Unable to clone '{}': {}".format(src, e))
+
+        os.remove(dst)
+        return False
+
+    except OSError as e:
+        if e.errno == errno.EEXIST:
+            raise
+        return False
+
+
+def remove_file(filename):
+    """
+    Remove a file, if it exists. Staged files are replaced instead of
+    being overwritten, as they may be hard links to their sources.
+    """
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+
+@tracer.traced(category='staging')
+def link_and_hash(src, dst, mode=STAGING_SAFE):
+    """
+    Stage a file and obtain its MD5 hash. The file is linked if the
+    staging mode allows it, and it is only read to be hashed.
+    Otherwise it is copied and hashed in a single pass.
+    :param src: The source file
+    :param dst: The destination file
+    :param mode: The staging mode (see STAGING_MODES)
+    :return: Tuple with the MD5 hash of the staged file and
+             how it was staged (STAGED_REFLINK, STAGED_HARDLINK
+             or STAGED_COPY)
+    """
+    method = link_file(src, dst, mode)
+    if method:
+        tracer.count('bytes', os.path.getsize(src))
+        return hash_file(src)['md5'], method
+
+    return copy_and_hash(src, dst), STAGED_COPY
+
+
+@tracer.traced(category='staging')
+def link_or_copy(src, dst, mode=STAGING_SAFE):
+    """
+    Stage a file whose hash is already known, linking
+    it if the staging mode allows it, copying it otherwise.
+    :param src: The source file
+    :param dst: The destination file
+    :param mode: The staging mode (see STAGING_MODES)
+    :return: How the file was staged (STAGED_REFLINK,
+             STAGED_HARDLINK or STAGED_COPY)
+    """
+    method = link_file(src, dst, mode)
+    if not method:
+        copy_file(src, dst)
+    return method or STAGED_COPY
+
+
+@tracer.traced(category='staging')
+def copy_and_hash(src, dst):
+    """
+    Copy a file while hashing its content, so that the data is
+    read only once. Each chunk read from the source is hashed and
+    written to the destination from the same (reusable) buffer.
+    An existing destination is replaced.
+    :param src: The source file
+    :param dst: The destination file
+    :return: The MD5 hash of the copied file
+    """
+    md5 = hashlib.md5()
+    buf = get_buffer(BUFFER_SIZE)
+    view = memoryview(buf)
+
+    remove_file(dst)
+
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        tracer.count('bytes', os.fstat(fsrc.fileno()).st_size)
+        while True:
+            n = fsrc.readinto(buf)
+            if not n:
+                break
+            md5.update(view[:n])
+            fdst.write(view[:n])
+
+    return md5.hexdigest()
+
+
+@tracer.traced(category='staging')
+def copy_file(src, dst):
+    """
+    Copy a file whose hash is already known. The data is copied
+    inside the kernel (copy_file_range or sendfile), without passing
+    through user space, whenever the platform supports it.
+    An existing destination is replaced.
+    :param src: The source file
+    :param dst: The destination file
+    """
+    remove_file(dst)
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        tracer.count('bytes', size)
+        try:
+            _copy_in_kernel(fsrc.fileno(), fdst.fileno(), size)
+            return
+
+        except OSError:
+            # Not supported between these files, copy in user space
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+
+        shutil.copyfileobj(fsrc, fdst, BUFFER_SIZE)
+
+
+def _copy_in_kernel(fd_src, fd_dst, size):
+    if hasattr(os, 'copy_file_range'):
+        copy = os.copy_file_range
+    elif hasattr(os, 'sendfile'):
+        def copy(fd_in, fd_out, count):
+            return os.sendfile(fd_out, fd_in, None, count)
+    else:
+        raise OSError("In-kernel copy is not supported")
+
+    copied = 0
+    while copied < size:
+        n = copy(fd_src, fd_dst, min(size - copied, 1 << 30))
+        if n == 0:
+            break
+        copied += n
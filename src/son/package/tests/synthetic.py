@@ -0,0 +1,271 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+"""
+Synthetic workspaces and projects, to exercise the packaging of big
+projects. VM images are sparse files: creating them takes neither time
+nor disk space, while reading them goes through the whole pipeline.
+The workspaces only use the local schemas and have no catalogue
+servers, so packaging does not require network access.
+"""
+
+import os
+import resource
+import time
+import tracemalloc
+
+from son.schema import descriptor_io
+from son.trace import tracer
+from son.workspace.workspace import Workspace, Project
+
+# Schemas of the tests, copied to the synthetic workspaces
+SCHEMAS_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__)))), 'schema', 'tests',
+    'son-schema')
+
+VENDOR = 'eu.sonata-nfv.synthetic'
+VERSION = '0.1'
+
+
+def create_workspace(ws_root):
+    """
+    Create a workspace that validates descriptors against the
+    local schemas of the tests and has no catalogue servers.
+    :param ws_root: The location of the workspace
+    :return: The Workspace
+    """
+    ws = Workspace(ws_root, log_level='WARNING')
+    ws.schemas[Workspace.CONFIG_STR_SCHEMAS_LOCAL_MASTER] = \
+        os.path.join(ws_root, 'schemas')
+    ws.schemas[Workspace.CONFIG_STR_SCHEMAS_REMOTE_MASTER] = ''
+    ws.catalogue_servers = []
+    ws.create_dirs()
+    ws.create_files()
+
+    schemas_dir = ws.schemas[Workspace.CONFIG_STR_SCHEMAS_LOCAL_MASTER]
+    os.makedirs(schemas_dir)
+    for name in ('nsd-schema.yml', 'vnfd-schema.yml', 'pd-schema.yml'):
+        schema = descriptor_io.load_file(os.path.join(SCHEMAS_DIR, name))
+        if name == 'pd-schema.yml':
+            # The package descriptor schema of the tests predates the
+            # general description section generated by the packager
+            schema.pop('required', None)
+            schema['additionalProperties'] = True
+        descriptor_io.dump_file(schema, os.path.join(schemas_dir, name))
+
+    return ws
+
+
+def create_project(ws, prj_root, vnfs=1, vdus=1, image_size=0,
+                   image_format='raw', image_files=0, descriptor_size=0):
+    """
+    Create a project whose service is made of identical VNFs,
+    each VDU having its own sparse VM image.
+    :param ws: The Workspace of the project
+    :param prj_root: The location of the project
+    :param vnfs: Number of VNFs of the service
+    :param vdus: Number of VDUs of each VNF
+    :param image_size: Size of each VM image file, in bytes
+    :param image_format: The vm_image_format of the VDUs
+    :param image_files: If not 0, the VM image of each VDU is a
+                        directory with this number of image files,
+                        spread over sub-directories
+    :param descriptor_size: Minimum size of each VNF descriptor, in
+                            bytes. The descriptors are filled with
+                            connection points to reach it.
+    :return: The Project
+    """
+    config = {'name': 'synthetic-project',
+              'vendor': VENDOR,
+              'version': Project.PROJECT_VERSION,
+              'maintainer': 'SONATA',
+              'description': 'Synthetic project',
+              'catalogues': ['personal'],
+              'publish_to': ['personal']}
+
+    nsd_dir = os.path.join(prj_root, 'sources', 'nsd')
+    os.makedirs(nsd_dir)
+    descriptor_io.dump_file(config, os.path.join(
+        prj_root, Project.__descriptor_name__))
+
+    network_functions = []
+    for i in range(vnfs):
+        name = 'vnf{}'.format(i)
+        network_functions.append({'vnf_id': name,
+                                  'vnf_vendor': VENDOR,
+                                  'vnf_name': name,
+                                  'vnf_version': VERSION})
+
+        vnf_dir = os.path.join(prj_root, 'sources', 'vnf', name)
+        os.makedirs(vnf_dir)
+
+        units = []
+        for j in range(vdus):
+            if image_files:
+                image = 'vdu{}'.format(j)
+                for k in range(image_files):
+                    # Files of directory images are packaged under
+                    # the VNF, their names must differ between VDUs
+                    image_file = os.path.join(
+                        vnf_dir, image, 'part{}'.format(k % 10),
+                        'vdu{}-file{}.img'.format(j, k))
+                    os.makedirs(os.path.dirname(image_file), exist_ok=True)
+                    create_sparse_file(image_file, image_size)
+            else:
+                image = 'vdu{}.img'.format(j)
+                create_sparse_file(os.path.join(vnf_dir, image), image_size)
+            units.append({'id': str(j),
+                          'vm_image': image,
+                          'vm_image_format': image_format,
+                          'resource_requirements': {
+                              'cpu': {'vcpus': 1},
+                              'memory': {'size': 1, 'size_unit': 'GB'}}})
+
+        vnfd = {'descriptor_version': 'vnfd-schema-01',
+                'vendor': VENDOR,
+                'name': name,
+                'version': VERSION,
+                'virtual_deployment_units': units}
+        fill_descriptor(vnfd, descriptor_size)
+        descriptor_io.dump_file(vnfd, os.path.join(vnf_dir, name + '.yml'))
+
+    descriptor_io.dump_file(
+        {'descriptor_version': '1.0',
+         'vendor': VENDOR,
+         'name': 'synthetic-nsd',
+         'version': VERSION,
+         'network_functions': network_functions},
+        os.path.join(nsd_dir, 'nsd.yml'))
+
+    return Project(ws, prj_root, config)
+
+
+def fill_descriptor(vnfd, size):
+    """
+    Add connection points to a VNF descriptor until
+    its YAML document is at least of the given size.
+    """
+    def connection_point(k):
+        return {'id': 'cp{}'.format(k), 'type': 'interface'}
+
+    cp_size = len(descriptor_io.dump([connection_point(0)]))
+    missing = size - len(descriptor_io.dump(vnfd))
+    while missing > 0:
+        cps = vnfd.setdefault('connection_points', [])
+        cps.extend(connection_point(k) for k in
+                   range(len(cps), len(cps) + missing // cp_size + 1))
+        missing = size - len(descriptor_io.dump(vnfd))
+
+
+def create_sparse_file(filename, size):
+    """
+    Create a file of the given size that takes almost no disk space.
+    It starts with its own path, so that every file has a different
+    content, and the rest of it is read as zeros.
+    """
+    with open(filename, 'wb') as f:
+        f.write(os.path.abspath(filename).encode('utf-8')[:size])
+        f.truncate(size)
+
+
+def measure_packaging(ws_root, prj_root, dst_path, **options):
+    """
+    Package a project and measure the memory used by the whole
+    pipeline, from the generation of the package descriptor to the
+    package file. It is meant to run in a new process, so that the
+    resident memory is not affected by previous work.
+    :param ws_root: The location of the workspace
+    :param prj_root: The location of the project
+    :param dst_path: The destination folder of the package
+    :param options: Additional options of the Packager
+    :return: dict with the peak of memory traced by tracemalloc
+             ('traced') and the growth of the peak resident memory
+             ('rss'), both in bytes, and the package MD5 ('md5')
+    """
+    # Import before measuring, modules are not part of the pipeline
+    from son.package.package import Packager
+
+    ws = Workspace.__create_from_descriptor__(ws_root)
+    prj = Project.__create_from_descriptor__(ws, prj_root)
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    try:
+        pck = Packager(ws, prj, dst_path=dst_path, **options)
+        md5 = pck.generate_package(None)
+        _, traced = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # ru_maxrss is in kilobytes on Linux
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+    return {'traced': traced, 'rss': rss * 1024, 'md5': md5}
+
+
+def benchmark_packaging(ws_root, prj_root, dst_path, **options):
+    """
+    Package a project and measure the time spent in each phase of
+    the Packager, through the spans of the tracer, and the peak
+    resident memory of the process. It is meant to run in a new
+    process, so that the memory is not affected by previous work.
+    :param ws_root: The location of the workspace
+    :param prj_root: The location of the project
+    :param dst_path: The destination folder of the package
+    :param options: Additional options of the Packager
+    :return: dict with the wall clock 'duration' of the build, the
+             total 'duration' (seconds), number of calls ('count') and
+             'bytes' of each span name ('phases'), the number of
+             package content entries ('files'), the package size
+             ('package_size'), the peak resident memory ('peak_rss')
+             in bytes and the package MD5 ('md5')
+    """
+    from son.package.package import Packager
+
+    ws = Workspace.__create_from_descriptor__(ws_root)
+    prj = Project.__create_from_descriptor__(ws, prj_root)
+
+    trace = tracer.enable()
+    try:
+        start = time.perf_counter()
+        pck = Packager(ws, prj, dst_path=dst_path, **options)
+        md5 = pck.generate_package(None)
+        duration = time.perf_counter() - start
+    finally:
+        tracer.disable()
+
+    phases = {name: {'duration': entry['duration'] / 1e9,
+                     'count': entry['count'],
+                     'bytes': entry['counters'].get('bytes', 0)}
+              for name, entry in trace.summary().items()}
+
+    # ru_maxrss is in kilobytes on Linux
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {'duration': duration,
+            'phases': phases,
+            'files': len(pck.package_descriptor['package_content']),
+            'package_size': os.path.getsize(pck.package_file),
+            'peak_rss': rss * 1024,
+            'md5': md5}
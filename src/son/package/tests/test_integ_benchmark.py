@@ -0,0 +1,73 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import os
+import tempfile
+import unittest
+from son.package.tests import synthetic
+from son.trace import tracer
+
+
+class IntBenchmarkTests(unittest.TestCase):
+    """
+    Package a synthetic project with directory images and big
+    descriptors, as the packaging benchmark does
+    (tools/benchmarks/bench_packager.py).
+    """
+
+    def test_benchmark_packaging(self):
+        """
+        Ensures that the synthetic projects are packaged and that
+        the time and bytes of each phase are measured
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            ws_root = os.path.join(tmp, 'ws')
+            prj_root = os.path.join(tmp, 'prj')
+            ws = synthetic.create_workspace(ws_root)
+            synthetic.create_project(ws, prj_root, vnfs=2, vdus=2,
+                                     image_size=4096, image_files=12,
+                                     descriptor_size=16 * 1024)
+
+            vnfd = os.path.join(prj_root, 'sources', 'vnf', 'vnf0',
+                                'vnf0.yml')
+            self.assertGreaterEqual(os.path.getsize(vnfd), 16 * 1024)
+
+            result = synthetic.benchmark_packaging(
+                ws_root, prj_root, os.path.join(tmp, 'target'), jobs=2)
+
+        self.assertIsNone(tracer.active())
+
+        # NSD, VNFDs and the files of each image
+        self.assertEqual(result['files'], 1 + 2 * (1 + 2 * 12))
+        self.assertTrue(result['md5'])
+
+        phases = result['phases']
+        self.assertEqual(phases['Packager.generate_vnfds']['count'], 1)
+        self.assertEqual(phases['Packager.stage_file']['bytes'],
+                         2 * 2 * 12 * 4096)
+        self.assertGreater(phases['Packager.generate_package']['duration'],
+                           0)
+        self.assertGreater(result['peak_rss'], 0)
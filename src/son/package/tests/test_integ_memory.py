@@ -0,0 +1,96 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import multiprocessing
+import os
+import tempfile
+import unittest
+import zipfile
+from son.package.tests import synthetic
+
+# Size of each image (in MB) and number of images of the projects.
+# Set them to package multi-GB projects, e.g. in nightly builds.
+IMAGE_SIZE = int(os.environ.get('SON_MEMTEST_IMAGE_SIZE', 64))
+IMAGES = int(os.environ.get('SON_MEMTEST_IMAGES', 2))
+
+# Memory that packaging may use on top of the loaded modules,
+# whatever the size and number of the images
+MEMORY_BUDGET = 64 * 1024 * 1024
+
+
+class IntMemoryTests(unittest.TestCase):
+    """
+    Package synthetic projects with big sparse images and check that
+    the memory used does not exceed the budget. Each build runs in a
+    new process, to measure its peak resident memory on its own.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls._ws_root = os.path.join(cls._tmp.name, 'ws')
+        cls._prj_root = os.path.join(cls._tmp.name, 'prj')
+        ws = synthetic.create_workspace(cls._ws_root)
+        synthetic.create_project(ws, cls._prj_root, vnfs=IMAGES,
+                                 image_size=IMAGE_SIZE * 1024 * 1024)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def package(self, name, **options):
+        dst_path = os.path.join(self._tmp.name, name)
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(1) as pool:
+            usage = pool.apply(synthetic.measure_packaging,
+                               (self._ws_root, self._prj_root, dst_path),
+                               options)
+
+        self.assertLess(usage['traced'], MEMORY_BUDGET)
+        self.assertLess(usage['rss'], MEMORY_BUDGET)
+
+        # All the images made it to the package
+        package = [f for f in os.listdir(dst_path) if f.endswith('.son')]
+        with zipfile.ZipFile(os.path.join(dst_path, package[0])) as pck:
+            images = [info for info in pck.infolist()
+                      if info.filename.startswith('raw_files/')]
+        self.assertEqual(len(images), IMAGES)
+        for info in images:
+            self.assertEqual(info.file_size, IMAGE_SIZE * 1024 * 1024)
+
+    def test_staging_memory(self):
+        """
+        Ensures that staging and archiving big images
+        uses a bounded amount of memory
+        """
+        self.package('staging')
+
+    def test_direct_memory(self):
+        """
+        Ensures that writing big images straight to the package,
+        compressing them in parallel, uses a bounded amount of memory
+        """
+        self.package('direct', direct=True, jobs=4)
@@ -0,0 +1,84 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import os
+import tempfile
+import unittest
+from son.package.cache import BuildCache
+
+
+class UnitBuildCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self._tmp.name, 'source')
+        self.dst_path = os.path.join(self._tmp.name, 'target')
+        self.dst = os.path.join(self.dst_path, 'artifact')
+        os.makedirs(self.dst_path)
+        for path in (self.src, self.dst):
+            with open(path, 'w') as f:
+                f.write('content')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_lookup(self):
+        """
+        Ensures that a staged artifact is reused across builds
+        only while its source and staged file remain unchanged
+        """
+        cache = BuildCache(self.dst_path)
+        self.assertIsNone(cache.lookup(self.src, self.dst))
+        cache.store(self.src, self.dst, 'md5')
+        cache.save()
+
+        # A new build loads the index of the previous one
+        cache = BuildCache(self.dst_path)
+        cache.load()
+        self.assertEqual(cache.lookup(self.src, self.dst), 'md5')
+
+        # Modifying the source invalidates the entry
+        with open(self.src, 'a') as f:
+            f.write('more content')
+        self.assertIsNone(cache.lookup(self.src, self.dst))
+
+    def test_prune(self):
+        """
+        Ensures that files not staged by the current build are removed
+        """
+        stale_dir = os.path.join(self.dst_path, 'stale')
+        os.makedirs(stale_dir)
+        with open(os.path.join(stale_dir, 'artifact'), 'w') as f:
+            f.write('content')
+
+        cache = BuildCache(self.dst_path)
+        cache.store(self.src, self.dst, 'md5')
+        cache.save()
+        cache.prune()
+
+        self.assertTrue(os.path.isfile(self.dst))
+        self.assertTrue(os.path.isfile(cache.filename))
+        self.assertFalse(os.path.exists(stale_dir))
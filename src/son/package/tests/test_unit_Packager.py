@@ -24,10 +24,17 @@
 # acknowledge the contributions of their colleagues of the SONATA
 # partner consortium (www.sonata-nfv.eu).
 
+import os
+import shutil
+import tempfile
+import threading
 import unittest
+import zipfile
 from unittest.mock import patch
-from unittest.mock import Mock
 from unittest import mock
+
+import requests
+
 from son.package.package import Packager
 from son.workspace.workspace import Workspace
 from son.workspace.workspace import Project
@@ -36,8 +43,8 @@ from son.workspace.workspace import Project
 class UnitCreatePackageTests(unittest.TestCase):
 
     @patch('son.package.package.os.path.join')
-    @patch('son.package.package.zipfile')
-    def test_generate_package(self, m_zipfile, m_join):
+    @patch('son.package.package.PackageArchive')
+    def test_generate_package(self, m_archive, m_join):
         """
         Ensures that a package file is created with correct name and location
         """
@@ -53,22 +60,16 @@ class UnitCreatePackageTests(unittest.TestCase):
                             generate_pd=False,
                             dst_path="dst/path")
 
-        packager._package_descriptor = True
-
-        # Prepare mocks
-        context_manager_mock = Mock()
-        m_zipfile.ZipFile.return_value = context_manager_mock
-        enter_mock = Mock()
-        exit_mock = Mock()
-        setattr(context_manager_mock, '__enter__', enter_mock)
-        setattr(context_manager_mock, '__exit__', exit_mock)
+        packager._package_descriptor = {'package_content': []}
 
         # execute
         packager.generate_package("package_name")
 
         # make assertions
-        self.assertEqual(m_join.call_args_list[-1],
-                         mock.call('dst/path', 'package_name.son'))
+        self.assertIn(mock.call('dst/path', 'package_name.son'),
+                      m_join.call_args_list)
+        self.assertEqual(m_archive.call_args[0][0], m_join.return_value)
+        self.assertTrue(m_archive.return_value.close.called)
 
     def test_package_gds(self):
         """
@@ -108,3 +109,423 @@ class UnitCreatePackageTests(unittest.TestCase):
         prj_config['name'] = 'sonata - project - sample'
 
         self.assertTrue(packager.package_gds(prj_config))
+
+    @patch.object(Packager, 'generate_vnfd_entry')
+    def test_generate_vnfd_entries_parallel(self, m_vnfd_entry):
+        """
+        Ensures that VNFs processed in parallel produce the package
+        content entries in the same order as a sequential run
+        """
+        # First, create a workspace to give to Packager
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+
+        # Create project
+        project = Project(workspace, 'prj/path')
+
+        # Instantiate a Packager instance with several jobs
+        packager = Packager(workspace=workspace,
+                            project=project,
+                            generate_pd=False,
+                            dst_path="dst/path",
+                            jobs=4)
+
+        m_vnfd_entry.side_effect = \
+            lambda path, vnf: [{'name': vnf}] if vnf != 'vnf-c' else None
+
+        pcs = packager.generate_vnfd_entries(
+            'base', ['vnf-d', 'vnf-b', 'vnf-c', 'vnf-a'])
+
+        self.assertEqual([pce['name'] for pce in pcs],
+                         ['vnf-a', 'vnf-b', 'vnf-d'])
+
+    def test_load_vnf_from_catalogue_server(self):
+        """
+        Ensures that the VNF is obtained from the first catalogue
+        server to respond, without waiting for slow or dead ones
+        """
+        # First, create a workspace to give to Packager
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+
+        # Create project
+        project = Project(workspace, 'prj/path')
+
+        released = threading.Event()
+        started = threading.Event()
+        daemon = []
+
+        def catalogue(url, get_vnf):
+            client = mock.MagicMock()
+            client.base_url = url
+            client.get_vnf.side_effect = get_vnf
+            return client
+
+        def slow_vnf(vnf_id):
+            # The request does not keep the process alive
+            daemon.append(threading.current_thread().daemon)
+            started.set()
+            released.wait(5)
+            return {'name': 'slow'}
+
+        def dead_vnf(vnf_id):
+            raise requests.exceptions.ConnectionError()
+
+        clients = [catalogue('http://slow', slow_vnf),
+                   catalogue('http://dead', dead_vnf),
+                   catalogue('http://missing', lambda vnf_id: None),
+                   catalogue('http://fast', lambda vnf_id: {'name': 'fast'})]
+
+        # Instantiate a Packager instance
+        packager = Packager(workspace=workspace,
+                            project=project,
+                            generate_pd=False,
+                            dst_path="dst/path",
+                            catalogue_clients=clients)
+        try:
+            vnfd = packager.load_vnf_from_catalogue_server('vnf.id')
+        finally:
+            released.set()
+
+        self.assertEqual(vnfd, {'name': 'fast'})
+        self.assertEqual([pr['name'] for pr in packager._package_resolvers],
+                         ['http://fast'])
+        started.wait(5)
+        self.assertEqual(daemon, [True])
+
+        # No available server has the VNF
+        packager._catalogueClients = clients[1:3]
+        self.assertIsNone(
+            packager.load_vnf_from_catalogue_server('vnf.id'))
+
+    @patch.object(Packager, 'load_vnf_from_catalogue_server')
+    def test_load_external_vnfds(self, m_load_vnf):
+        """
+        Ensures that the missing VNFs are fetched into the workspace
+        catalogue and that all the unresolved VNFs are reported
+        """
+        with tempfile.TemporaryDirectory() as ws_root:
+            workspace = Workspace(ws_root, ws_name="ws_test",
+                                  log_level='debug')
+            catalogue_dir = os.path.join(
+                ws_root,
+                workspace.dirs[Workspace.CONFIG_STR_CATALOGUE_VNF_DIR])
+            os.makedirs(os.path.join(catalogue_dir, 'vnf.local'))
+
+            # Create project
+            project = Project(workspace, 'prj/path')
+
+            # Instantiate a Packager instance
+            packager = Packager(workspace=workspace,
+                                project=project,
+                                generate_pd=False,
+                                dst_path="dst/path")
+
+            m_load_vnf.side_effect = \
+                lambda vnf_id: {'name': vnf_id} \
+                if vnf_id.startswith('vnf.remote') else None
+
+            self.assertFalse(packager.load_external_vnfds(
+                ['vnf.local', 'vnf.remote1', 'vnf.unknown1',
+                 'vnf.remote2', 'vnf.unknown2']))
+
+            self.assertEqual(
+                sorted(call[0][0] for call in m_load_vnf.call_args_list),
+                ['vnf.remote1', 'vnf.remote2',
+                 'vnf.unknown1', 'vnf.unknown2'])
+            self.assertTrue(os.path.isfile(os.path.join(
+                catalogue_dir, 'vnf.remote2',
+                'vnf.remote2.' + workspace.descriptor_extension)))
+
+            self.assertTrue(packager.load_external_vnfds(
+                ['vnf.local', 'vnf.remote1', 'vnf.remote2']))
+
+    def test_stage_file_dedup(self):
+        """
+        Ensures that artifacts with identical content are staged
+        only once, and with dedup, packaged only once
+        """
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+        project = Project(workspace, 'prj/path')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            srcs = []
+            for name, content in (('a', b'image'), ('b', b'other'),
+                                  ('c', b'image')):
+                srcs.append(os.path.join(tmp, name))
+                with open(srcs[-1], 'wb') as f:
+                    f.write(content)
+
+            for direct in (False, True):
+                dst_path = os.path.join(tmp, 'target-{}'.format(direct))
+                packager = Packager(workspace=workspace,
+                                    project=project,
+                                    generate_pd=False,
+                                    direct=direct,
+                                    dedup=True)
+                packager.init_package_skeleton(dst_path)
+
+                md5s = [packager.stage_file(src, os.path.join(
+                    dst_path, 'raw_files', 'vnf{}'.format(i), 'image'))
+                    for i, src in enumerate(srcs)]
+
+                self.assertEqual(md5s[0], md5s[2])
+                self.assertNotEqual(md5s[0], md5s[1])
+                self.assertEqual(packager._content_index.aliases,
+                                 {'raw_files/vnf2/image':
+                                  'raw_files/vnf0/image'})
+
+                if direct:
+                    archive = packager._archive
+                    archive.close()
+                    with zipfile.ZipFile(archive.filename) as pck:
+                        self.assertEqual(
+                            sorted(pck.namelist()),
+                            ['raw_files/vnf0/image', 'raw_files/vnf1/image'])
+                else:
+                    self.assertTrue(os.path.samefile(
+                        os.path.join(dst_path, 'raw_files', 'vnf0', 'image'),
+                        os.path.join(dst_path, 'raw_files', 'vnf2', 'image')))
+
+    def test_package_duplicates(self):
+        """
+        Ensures that without dedup every artifact is stored in the
+        package, and that with dedup duplicates are stored as aliases
+        """
+        from son.package.dedup import ALIASES_NAME
+        from son.package.tests import synthetic
+
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = synthetic.create_workspace(os.path.join(tmp, 'ws'))
+            project = synthetic.create_project(
+                workspace, os.path.join(tmp, 'prj'), vnfs=2, image_size=1024)
+
+            # The images of both VNFs have the same content
+            vnf_dir = os.path.join(tmp, 'prj', 'sources', 'vnf')
+            shutil.copyfile(os.path.join(vnf_dir, 'vnf0', 'vdu0.img'),
+                            os.path.join(vnf_dir, 'vnf1', 'vdu0.img'))
+
+            for i, (direct, dedup) in enumerate(((False, False),
+                                                 (True, False),
+                                                 (False, True))):
+                packager = Packager(workspace, project,
+                                    dst_path=os.path.join(tmp, str(i)),
+                                    direct=direct, dedup=dedup)
+                packager.generate_package('p')
+                with zipfile.ZipFile(packager.package_file) as pck:
+                    names = pck.namelist()
+
+                self.assertIn('raw_files/vnf0/vdu0.img', names)
+                self.assertEqual('raw_files/vnf1/vdu0.img' in names,
+                                 not dedup)
+                self.assertEqual(ALIASES_NAME in names, dedup)
+
+    def test_stage_file_single_read(self):
+        """
+        Ensures that artifacts hashed to look for duplicates
+        are not hashed again when they are staged
+        """
+        from son.package import staging
+        from son.package.package import generate_hash
+
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+        project = Project(workspace, 'prj/path')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            srcs = []
+            for name in ('a', 'b', 'c'):
+                srcs.append(os.path.join(tmp, name))
+                with open(srcs[-1], 'wb') as f:
+                    f.write(name.encode() * 4)
+
+            for direct in (False, True):
+                dst_path = os.path.join(tmp, 'target-{}'.format(direct))
+                packager = Packager(workspace=workspace,
+                                    project=project,
+                                    generate_pd=False,
+                                    direct=direct,
+                                    dedup=True)
+                packager.init_package_skeleton(dst_path)
+
+                with patch('son.package.package.generate_hash',
+                           wraps=generate_hash) as m_hash, \
+                        patch('son.package.staging.copy_and_hash',
+                              wraps=staging.copy_and_hash) as m_copy_hash:
+                    md5s = [packager.stage_file(src, os.path.join(
+                        dst_path, 'raw_files', 'vnf{}'.format(i), 'image'))
+                        for i, src in enumerate(srcs)]
+
+                self.assertEqual(md5s, [generate_hash(src) for src in srcs])
+                self.assertEqual([c[0][0] for c in m_hash.call_args_list],
+                                 srcs[1:])
+                if not direct:
+                    self.assertEqual(
+                        [c[0][0] for c in m_copy_hash.call_args_list],
+                        srcs[:1])
+                    with open(os.path.join(dst_path, 'raw_files', 'vnf2',
+                                           'image'), 'rb') as f:
+                        self.assertEqual(f.read(), b'cccc')
+
+    def test_reproducible_package(self):
+        """
+        Ensures that reproducible packages of the same project are
+        identical, whatever the number of jobs and in direct mode
+        """
+        from son.package.tests import synthetic
+
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = synthetic.create_workspace(os.path.join(tmp, 'ws'))
+            project = synthetic.create_project(
+                workspace, os.path.join(tmp, 'prj'), vnfs=3, vdus=2,
+                image_size=1024)
+
+            package_md5 = set()
+            for i, direct, jobs in ((0, False, 1), (1, False, 3),
+                                    (2, True, 1), (3, True, 3)):
+                packager = Packager(workspace, project,
+                                    dst_path=os.path.join(tmp, str(i)),
+                                    direct=direct, jobs=jobs,
+                                    reproducible=True)
+                package_md5.add(packager.generate_package('p'))
+
+                with zipfile.ZipFile(packager.package_file) as pck:
+                    names = pck.namelist()
+                self.assertEqual(names, sorted(names))
+                if direct:
+                    self.assertEqual(os.listdir(os.path.join(tmp, str(i))),
+                                     ['p.son'])
+
+            self.assertEqual(len(package_md5), 1)
+
+            # With dedup, the same artifacts hold the content of aliases,
+            # even when the duplicate with the lowest name comes last
+            vnf_dir = os.path.join(tmp, 'prj', 'sources', 'vnf')
+            shutil.copyfile(os.path.join(vnf_dir, 'vnf2', 'vdu1.img'),
+                            os.path.join(vnf_dir, 'vnf0', 'vdu1.img'))
+            generate_vnfd_entry = Packager.generate_vnfd_entry
+            vnf2_done = threading.Event()
+
+            def delayed_vnfd_entry(packager, base_path, vnf):
+                if vnf == 'vnf0':
+                    vnf2_done.wait(10)
+                entries = generate_vnfd_entry(packager, base_path, vnf)
+                if vnf == 'vnf2':
+                    vnf2_done.set()
+                return entries
+
+            package_md5 = set()
+            for i, direct in ((4, False), (5, True)):
+                with patch.object(Packager, 'generate_vnfd_entry',
+                                  delayed_vnfd_entry):
+                    packager = Packager(workspace, project,
+                                        dst_path=os.path.join(tmp, str(i)),
+                                        direct=direct, jobs=3, dedup=True,
+                                        reproducible=True)
+                package_md5.add(packager.generate_package('p'))
+
+            self.assertEqual(len(package_md5), 1)
+
+    def test_staging_mode(self):
+        """
+        Ensures that artifacts hard linked to their sources by a
+        previous build are staged again when the staging mode does
+        not allow hard links
+        """
+        from son.package.staging import STAGING_LINK, STAGING_SAFE
+        from son.package.tests import synthetic
+
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = synthetic.create_workspace(os.path.join(tmp, 'ws'))
+            project = synthetic.create_project(
+                workspace, os.path.join(tmp, 'prj'), vnfs=2, image_size=1024)
+            src = os.path.join(tmp, 'prj', 'sources', 'vnf', 'vnf1',
+                               'vdu0.img')
+            dst_path = os.path.join(tmp, 'target')
+            dst = os.path.join(dst_path, 'raw_files', 'vnf1', 'vdu0.img')
+
+            Packager(workspace, project, dst_path=dst_path,
+                     staging_mode=STAGING_LINK)
+            self.assertTrue(os.path.samefile(src, dst))
+
+            Packager(workspace, project, dst_path=dst_path,
+                     staging_mode=STAGING_SAFE)
+            self.assertFalse(os.path.samefile(src, dst))
+            with open(src, 'rb') as f_src, open(dst, 'rb') as f_dst:
+                self.assertEqual(f_src.read(), f_dst.read())
+
+    def test_plan(self):
+        """
+        Ensures that the package descriptor of a plan is the one of
+        the package, and that nothing is written to the destination
+        """
+        import io
+        from son.package.package import print_plan
+        from son.package.tests import synthetic
+        from son.schema import descriptor_io
+
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = synthetic.create_workspace(os.path.join(tmp, 'ws'))
+            project = synthetic.create_project(
+                workspace, os.path.join(tmp, 'prj'), vnfs=2, vdus=2,
+                image_size=1024, image_files=3)
+
+            plan_path = os.path.join(tmp, 'plan')
+            planner = Packager(workspace, project, dst_path=plan_path,
+                               jobs=4, reproducible=True, plan=True)
+            self.assertFalse(os.path.exists(plan_path))
+
+            packager = Packager(workspace, project,
+                                dst_path=os.path.join(tmp, 'package'),
+                                reproducible=True)
+            self.assertEqual(planner.package_descriptor,
+                             packager.package_descriptor)
+            self.assertEqual(
+                planner.artifact_sizes[
+                    'raw_files/vnf0/part2/vdu1-file2.img'], 1024)
+
+            out = io.StringIO()
+            print_plan(planner, file=out)
+            self.assertEqual(descriptor_io.load(out.getvalue()),
+                             packager.package_descriptor)
+            self.assertIn('# Total', out.getvalue())
+
+    def test_plan_artifact_dependencies(self):
+        """
+        Ensures that remote artifacts are not fetched when planning,
+        only the MD5 hashes in the workspace cache are used
+        """
+        import io
+        from son.package.package import print_plan
+        from son.package.remote import RemoteArtifactCache
+        from son.package.tests import synthetic
+
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = synthetic.create_workspace(os.path.join(tmp, 'ws'))
+            project = synthetic.create_project(
+                workspace, os.path.join(tmp, 'prj'))
+
+            cached = 'http://127.0.0.1/cached.img'
+            uncached = 'http://127.0.0.1/uncached.img'
+            cache_dir = os.path.join(tmp, 'ws', workspace.dirs[
+                Workspace.CONFIG_STR_CACHE_DIR])
+            cache = RemoteArtifactCache(cache_dir, ttl=0)
+            cache.store(cached, {'status': 200, 'md5': 'md5'})
+            cache.save()
+
+            packager = Packager(workspace, project, generate_pd=False,
+                                plan=True)
+            packager._add_artifact_dependency('cached', cached)
+            packager._add_artifact_dependency('uncached', uncached)
+            with patch('son.package.package.fetch_urls') as m_fetch:
+                packager.check_artifact_dependencies()
+            m_fetch.assert_not_called()
+
+            cached_entry, uncached_entry = packager._artifact_dependencies
+            self.assertEqual(cached_entry['md5'], 'md5')
+            self.assertNotIn('md5', uncached_entry)
+
+            packager._package_descriptor = {
+                'package_content': [],
+                'artifact_dependencies': packager._artifact_dependencies}
+            out = io.StringIO()
+            print_plan(packager, file=out)
+            self.assertIn('MD5 unknown: ' + uncached, out.getvalue())
+            self.assertNotIn('MD5 unknown: ' + cached, out.getvalue())
@@ -0,0 +1,133 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import os
+import tempfile
+import unittest
+import zipfile
+from son.package import archive
+from son.package.archive import PackageArchive
+from son.package.compression import CompressionPolicy
+
+
+class UnitPackageArchiveTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self._tmp.name, 'image')
+        self.content = os.urandom(2 * 1024 * 1024 + 11)
+        with open(self.src, 'wb') as f:
+            f.write(self.content)
+        self.filename = os.path.join(self._tmp.name, 'package.son')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_package_archive(self):
+        """
+        Ensures that members and package hashes are computed
+        from the bytes written and that the package is valid
+        """
+        archive = PackageArchive(self.filename)
+        md5_image = archive.add_file(self.src, 'raw_files/vnf/image')
+        md5_mf = archive.add_bytes(b'manifest', 'META-INF/MANIFEST.MF')
+        package_md5 = archive.close()
+
+        self.assertEqual(md5_image, hashlib.md5(self.content).hexdigest())
+        self.assertEqual(md5_mf, hashlib.md5(b'manifest').hexdigest())
+        with open(self.filename, 'rb') as f:
+            self.assertEqual(package_md5, hashlib.md5(f.read()).hexdigest())
+
+        with zipfile.ZipFile(self.filename) as pck:
+            self.assertIsNone(pck.testzip())
+            self.assertEqual(pck.namelist(),
+                             ['raw_files/vnf/image', 'META-INF/MANIFEST.MF'])
+            self.assertEqual(pck.read('raw_files/vnf/image'), self.content)
+
+    def test_discard(self):
+        """
+        Ensures that an aborted package is removed
+        """
+        archive = PackageArchive(self.filename)
+        archive.add_bytes(b'content', 'member')
+        archive.discard()
+        self.assertFalse(os.path.exists(self.filename))
+
+    def test_parallel_compression(self):
+        """
+        Ensures that compressed members are valid and that the
+        package is the same regardless of the number of jobs
+        """
+        policy = CompressionPolicy(
+            modes={'application/sonata.raw_files': CompressionPolicy.DEFLATE})
+
+        # Compressible content spanning several chunks
+        with open(self.src, 'wb') as f:
+            for i in range(5):
+                f.write(os.urandom(1024) * 1024)
+
+        chunk_size = archive.DEFLATE_CHUNK_SIZE
+        archive.DEFLATE_CHUNK_SIZE = 1024 * 1024
+        try:
+            package_md5 = set()
+            for jobs in (1, 3):
+                pck = PackageArchive(self.filename, policy=policy, jobs=jobs)
+                pck.add_file(self.src, 'raw_files/vnf/image',
+                             'application/sonata.raw_files')
+                package_md5.add(pck.close())
+
+                with zipfile.ZipFile(self.filename) as zf:
+                    self.assertIsNone(zf.testzip())
+                    zinfo = zf.getinfo('raw_files/vnf/image')
+                    self.assertEqual(zinfo.compress_type,
+                                     zipfile.ZIP_DEFLATED)
+                    self.assertLess(zinfo.compress_size, zinfo.file_size)
+        finally:
+            archive.DEFLATE_CHUNK_SIZE = chunk_size
+
+        self.assertEqual(len(package_md5), 1)
+
+    def test_reproducible(self):
+        """
+        Ensures that reproducible packages do not depend on the
+        timestamps and permissions of their sources
+        """
+        package_md5 = set()
+        for mode, mtime in ((0o600, 1000000000), (0o755, 1500000000)):
+            os.chmod(self.src, mode)
+            os.utime(self.src, (mtime, mtime))
+            pck = PackageArchive(self.filename, reproducible=True)
+            pck.add_file(self.src, 'raw_files/vnf/image')
+            pck.add_bytes(b'manifest', 'META-INF/MANIFEST.MF')
+            package_md5.add(pck.close())
+
+        self.assertEqual(len(package_md5), 1)
+        with zipfile.ZipFile(self.filename) as zf:
+            for zinfo in zf.infolist():
+                self.assertEqual(zinfo.date_time,
+                                 archive.reproducible_date_time())
+                self.assertEqual(zinfo.external_attr >> 16 & 0o777, 0o644)
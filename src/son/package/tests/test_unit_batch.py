@@ -0,0 +1,149 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from son.package.batch import BatchPackager, find_projects, print_summary
+
+
+class UnitBatchPackagerTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        for name in ('prj1', 'prj2', 'other'):
+            os.makedirs(os.path.join(self._tmp.name, name))
+            with open(os.path.join(self._tmp.name, name,
+                                   'project.yml'), 'w') as f:
+                f.write('name: ' + name)
+        os.makedirs(os.path.join(self._tmp.name, 'prj3'))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_find_projects(self):
+        """
+        Ensures that only folders containing a project descriptor
+        are selected, once and in a stable order
+        """
+        projects = find_projects([os.path.join(self._tmp.name, 'prj*'),
+                                  os.path.join(self._tmp.name, 'prj1')])
+        self.assertEqual(projects,
+                         [os.path.join(self._tmp.name, 'prj1'),
+                          os.path.join(self._tmp.name, 'prj2')])
+
+    @patch('son.package.batch.CatalogueClient')
+    @patch('son.package.batch.SchemaValidator')
+    @patch('son.package.batch.Project')
+    @patch('son.package.batch.Packager')
+    def test_package_projects(self, m_packager, m_project, m_validator,
+                              m_catalogue):
+        """
+        Ensures that a failed build does not stop the
+        remaining ones and that it is reported in the summary
+        """
+        def packager(workspace, project, **kwargs):
+            pck = MagicMock()
+            if project == 'prj1':
+                pck.generate_package.side_effect = SystemExit(1)
+            else:
+                pck.generate_package.return_value = 'md5'
+                pck.package_file = 'prj2.son'
+            return pck
+
+        m_packager.side_effect = packager
+        m_project.__create_from_descriptor__ = MagicMock(
+            side_effect=lambda ws, root: os.path.basename(root))
+        workspace = MagicMock()
+        workspace.catalogue_servers = []
+
+        batch = BatchPackager(workspace, dst_path='target', jobs=2,
+                              use_cache=False)
+        summaries = batch.package_projects(['prj1', 'prj2'])
+
+        self.assertEqual([s['status'] for s in summaries],
+                         [BatchPackager.STATUS_FAILED,
+                          BatchPackager.STATUS_OK])
+        self.assertEqual(summaries[1]['md5'], 'md5')
+        self.assertEqual(summaries[1]['package'], 'prj2.son')
+
+        # Builds share the validator and use their own destination
+        _, kwargs = m_packager.call_args
+        self.assertEqual(kwargs['schema_validator'],
+                         m_validator.return_value)
+        self.assertFalse(kwargs['use_cache'])
+        self.assertIn(kwargs['dst_path'], (os.path.join('target', 'prj1'),
+                                           os.path.join('target', 'prj2')))
+
+        out = io.StringIO()
+        print_summary(summaries, file=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+    def test_destinations(self):
+        """
+        Ensures that projects whose folders have the same
+        name are packaged in different destinations
+        """
+        workspace = MagicMock()
+        workspace.catalogue_servers = []
+        with patch('son.package.batch.SchemaValidator'):
+            batch = BatchPackager(workspace, dst_path='target')
+
+        self.assertEqual(batch.destinations(['x/prj1', 'y/prj2']),
+                         [os.path.join('target', 'prj1'),
+                          os.path.join('target', 'prj2')])
+        self.assertEqual(batch.destinations(['x/a/prj', 'x/b/prj']),
+                         [os.path.join('target', 'a-prj'),
+                          os.path.join('target', 'b-prj')])
+        with self.assertRaises(ValueError):
+            batch.destinations(['prj', 'prj'])
+
+    def test_package_same_folder_names(self):
+        """
+        Ensures that the packages of projects whose folders have
+        the same name, built at the same time, are all valid
+        """
+        from son.package.tests import synthetic
+        from son.package.verify import PackageVerifier
+
+        tmp = self._tmp.name
+        workspace = synthetic.create_workspace(os.path.join(tmp, 'ws'))
+        roots = [os.path.join(tmp, name, 'prj') for name in ('a', 'b')]
+        for i, root in enumerate(roots):
+            synthetic.create_project(workspace, root, vnfs=2 + i,
+                                     image_size=1024)
+
+        batch = BatchPackager(workspace, dst_path=os.path.join(tmp, 'dst'),
+                              jobs=2)
+        summaries = batch.package_projects(roots)
+
+        self.assertEqual([s['status'] for s in summaries],
+                         [BatchPackager.STATUS_OK] * 2)
+        self.assertNotEqual(summaries[0]['package'], summaries[1]['package'])
+        for s in summaries:
+            self.assertTrue(PackageVerifier().verify(s['package'])['ok'])
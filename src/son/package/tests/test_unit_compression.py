@@ -0,0 +1,78 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import os
+import tempfile
+import unittest
+import zipfile
+from son.package.compression import CompressionPolicy
+
+
+class UnitCompressionPolicyTests(unittest.TestCase):
+
+    def _create_file(self, content):
+        f = tempfile.NamedTemporaryFile(delete=False)
+        f.write(content)
+        f.close()
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def test_compression_by_content_type(self):
+        """
+        Ensures that descriptors are compressed and that
+        already compressed images are stored
+        """
+        policy = CompressionPolicy(level=9)
+        self.assertEqual(
+            policy.compression('application/sonata.function_descriptor'),
+            (zipfile.ZIP_DEFLATED, 9))
+        self.assertEqual(
+            policy.compression('application/sonata.qcow2_files'),
+            (zipfile.ZIP_STORED, None))
+
+        # Level 0 disables compression
+        policy = CompressionPolicy(level=0)
+        self.assertEqual(
+            policy.compression('application/sonata.function_descriptor'),
+            (zipfile.ZIP_STORED, None))
+
+    def test_compression_probe(self):
+        """
+        Ensures that raw images are only compressed
+        when their content compresses well
+        """
+        policy = CompressionPolicy()
+        compressible = self._create_file(bytes(1024 * 1024))
+        incompressible = self._create_file(os.urandom(1024 * 1024))
+
+        self.assertEqual(
+            policy.compression('application/sonata.raw_files',
+                               compressible),
+            (zipfile.ZIP_DEFLATED, CompressionPolicy.DEFAULT_LEVEL))
+        self.assertEqual(
+            policy.compression('application/sonata.raw_files',
+                               incompressible),
+            (zipfile.ZIP_STORED, None))
@@ -0,0 +1,196 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import os
+import tempfile
+import unittest
+import zipfile
+from son.package.archive import PackageArchive
+from son.package.compression import CompressionPolicy
+from son.package.dedup import ALIASES_NAME, dump_aliases
+from son.package.delta import DeltaBase, DELTA_MANIFEST_NAME, \
+    MANIFEST_NAME, reconstruct
+from son.schema import descriptor_io
+
+
+class UnitDeltaTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def create_package(self, name, members, delta_base=None, aliases=None,
+                       package_md5=None):
+        """
+        Create a package with the given members, or a delta
+        package with its changed members if a base is given.
+        The content of aliases is not stored.
+        """
+        aliases = aliases or dict()
+        manifest = {'vendor': 'eu.sonata-nfv', 'name': 'sample',
+                    'version': '0.1',
+                    'package_content': [
+                        {'name': '/' + arcname,
+                         'content-type': 'application/sonata.raw_files',
+                         'md5': hashlib.md5(data).hexdigest()}
+                        for arcname, data in sorted(members.items())]}
+
+        stored = [arcname for arcname in members if arcname not in aliases]
+        if delta_base:
+            changed = delta_base.changed_members(manifest)
+            stored = [arcname for arcname in stored if arcname in changed]
+
+        filename = os.path.join(self._tmp.name, name)
+        archive = PackageArchive(filename, policy=CompressionPolicy())
+        for arcname in sorted(stored):
+            archive.add_bytes(members[arcname], arcname,
+                              'application/sonata.raw_files')
+        if aliases:
+            archive.add_bytes(dump_aliases(aliases), ALIASES_NAME)
+        archive.add_bytes(descriptor_io.dump(manifest).encode('utf-8'),
+                          MANIFEST_NAME)
+        if delta_base:
+            archive.add_bytes(descriptor_io.dump(delta_base.delta_manifest(
+                changed, package_md5)).encode('utf-8'), DELTA_MANIFEST_NAME)
+        archive.close()
+        return filename
+
+    def test_delta(self):
+        """
+        Ensures that a delta package only holds the changed members
+        and that the full package is rebuilt from base and delta
+        """
+        base = self.create_package('base.son', {
+            'raw_files/a': b'a' * 100000,
+            'raw_files/b': os.urandom(1000),
+            'raw_files/c': b'c'})
+
+        members = {'raw_files/a': b'a' * 100000,
+                   'raw_files/b': os.urandom(1000),
+                   'raw_files/d': b'new'}
+        delta_base = DeltaBase(base)
+        delta = self.create_package('delta.son', members, delta_base)
+
+        with zipfile.ZipFile(delta) as pck:
+            self.assertEqual(sorted(pck.namelist()),
+                             [DELTA_MANIFEST_NAME, MANIFEST_NAME,
+                              'raw_files/b', 'raw_files/d'])
+
+        full = os.path.join(self._tmp.name, 'full.son')
+        self.assertIsNotNone(reconstruct(base, delta, full))
+        with zipfile.ZipFile(full) as pck:
+            self.assertIsNone(pck.testzip())
+            self.assertEqual(sorted(pck.namelist()),
+                             [MANIFEST_NAME] + sorted(members))
+            for arcname, data in members.items():
+                self.assertEqual(pck.read(arcname), data)
+
+        # The delta can only be applied to its base
+        self.assertIsNone(reconstruct(full, delta, full + '.2'))
+        self.assertFalse(os.path.exists(full + '.2'))
+
+        # The rebuilt package must be the full package
+        delta = self.create_package('delta-md5.son', members, delta_base,
+                                    package_md5='0' * 32)
+        self.assertIsNone(reconstruct(base, delta, full + '.3'))
+        self.assertFalse(os.path.exists(full + '.3'))
+
+    def test_delta_aliases(self):
+        """
+        Ensures that contents stored once, or under another
+        name in the base package, are not added to the delta
+        """
+        image = os.urandom(1000)
+        base = self.create_package(
+            'base.son', {'raw_files/a': image, 'raw_files/b': image},
+            aliases={'raw_files/b': 'raw_files/a'})
+
+        members = {'raw_files/b': image, 'raw_files/c': image,
+                   'raw_files/d': b'new', 'raw_files/e': b'new'}
+        aliases = {'raw_files/c': 'raw_files/b', 'raw_files/e': 'raw_files/d'}
+        delta = self.create_package('delta.son', members, DeltaBase(base),
+                                    aliases=aliases)
+
+        with zipfile.ZipFile(delta) as pck:
+            self.assertEqual(sorted(pck.namelist()),
+                             [ALIASES_NAME, DELTA_MANIFEST_NAME,
+                              MANIFEST_NAME, 'raw_files/d'])
+
+        full = os.path.join(self._tmp.name, 'full.son')
+        self.assertIsNotNone(reconstruct(base, delta, full))
+        with zipfile.ZipFile(full) as pck:
+            self.assertEqual(sorted(pck.namelist()),
+                             [ALIASES_NAME, MANIFEST_NAME,
+                              'raw_files/b', 'raw_files/d'])
+            self.assertEqual(pck.read('raw_files/b'), image)
+
+    def test_delta_from_target(self):
+        """
+        Ensures that the base package of a delta package, taken from
+        the destination folder of the build, is kept by the build, and
+        that the package rebuilt from them is the full package
+        """
+        from son.package.package import Packager
+        from son.package.tests import synthetic
+        from son.package.verify import PackageVerifier
+
+        tmp = self._tmp.name
+        workspace = synthetic.create_workspace(os.path.join(tmp, 'ws'))
+        prj_root = os.path.join(tmp, 'prj')
+        project = synthetic.create_project(workspace, prj_root, vnfs=2,
+                                           image_size=1024)
+        image = os.path.join(prj_root, 'sources', 'vnf', 'vnf1', 'vdu0.img')
+        base = os.path.join(prj_root, 'target', 'p.son')
+
+        for use_cache in (True, False):
+            Packager(workspace, project, use_cache=use_cache,
+                     reproducible=True).generate_package('p')
+            with open(image, 'ab') as f:
+                f.write(b'changed')
+
+            packager = Packager(workspace, project, use_cache=use_cache,
+                                reproducible=True, delta_from=base)
+            packager.generate_package('p')
+            self.assertTrue(os.path.isfile(base))
+            with zipfile.ZipFile(packager.package_file) as pck:
+                self.assertNotIn('p.son', pck.namelist())
+
+            # The rebuilt package is the package of a full build
+            full_md5 = Packager(
+                workspace, project, reproducible=True,
+                dst_path=os.path.join(tmp, 'full-{}'.format(use_cache))) \
+                .generate_package('p')
+            with zipfile.ZipFile(packager.package_file) as pck:
+                self.assertEqual(descriptor_io.load(pck.read(
+                    DELTA_MANIFEST_NAME))['package_md5'], full_md5)
+
+            full = os.path.join(tmp, 'full-{}.son'.format(use_cache))
+            self.assertEqual(
+                reconstruct(base, packager.package_file, full), full_md5)
+            self.assertTrue(PackageVerifier().verify(full)['ok'])
@@ -0,0 +1,113 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import os
+import tempfile
+import unittest
+from son.package import hashing
+from son.package.md5 import generate_hash
+
+
+class UnitHashingTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.NamedTemporaryFile(delete=False)
+        self.content = os.urandom(3 * 1024 * 1024 + 7)
+        self._tmp.write(self.content)
+        self._tmp.close()
+        self.filename = self._tmp.name
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_hash_file_algorithms(self):
+        """
+        Ensures that several digests are obtained from a single read
+        """
+        digests = hashing.hash_file(self.filename, hashing.ALGORITHMS,
+                                    chunk_size=64 * 1024)
+        for algorithm in hashing.ALGORITHMS:
+            self.assertEqual(
+                digests[algorithm],
+                hashlib.new(algorithm, self.content).hexdigest())
+
+        self.assertRaises(ValueError, hashing.MultiHash, ('crc32',))
+
+    def test_hash_file_mmap(self):
+        """
+        Ensures that the mmap path produces the same digest
+        """
+        mmap_threshold = hashing.MMAP_THRESHOLD
+        hashing.MMAP_THRESHOLD = 0
+        try:
+            digests = hashing.hash_file(self.filename, use_mmap=True)
+        finally:
+            hashing.MMAP_THRESHOLD = mmap_threshold
+
+        self.assertEqual(digests['md5'],
+                         hashlib.md5(self.content).hexdigest())
+
+    def test_generate_hash(self):
+        """
+        Ensures that the MD5 of a file remains compatible
+        """
+        self.assertEqual(generate_hash(self.filename),
+                         hashlib.md5(self.content).hexdigest())
+
+
+class UnitHashTreeTests(unittest.TestCase):
+
+    def _create_tree(self, root, files):
+        for rel_path, content in files:
+            path = os.path.join(root, *rel_path.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+
+    def test_hash_tree(self):
+        """
+        Ensures that the tree digest only depends on the relative
+        paths and contents of the files
+        """
+        files = [('a', b'1'), ('dir/b', b'2'), ('dir/sub/c', b'3')]
+        with tempfile.TemporaryDirectory() as tree_1, \
+                tempfile.TemporaryDirectory() as tree_2:
+
+            # Same files, created in a different order
+            self._create_tree(tree_1, files)
+            self._create_tree(tree_2, reversed(files))
+
+            self.assertEqual(hashing.list_tree(tree_1),
+                             ['a', 'dir/b', 'dir/sub/c'])
+            digest = hashing.hash_tree(tree_1, jobs=1)
+            self.assertEqual(digest, hashing.hash_tree(tree_2, jobs=4))
+            self.assertEqual(generate_hash(tree_1), digest['md5'])
+
+            # Moving a file to another directory changes the digest
+            os.rename(os.path.join(tree_2, 'dir', 'b'),
+                      os.path.join(tree_2, 'dir', 'sub', 'b'))
+            self.assertNotEqual(digest, hashing.hash_tree(tree_2))
@@ -0,0 +1,105 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from son.package.archive import PackageArchive
+from son.package.compression import CompressionPolicy
+from son.package.dedup import ALIASES_NAME, dump_aliases
+from son.package.delta import MANIFEST_NAME
+from son.package.reader import PackageReader, print_members
+from son.schema import descriptor_io
+
+
+class UnitPackageReaderTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._image = os.urandom(3 * 1024 * 1024)
+        members = {'raw_files/a.img': self._image,
+                   'raw_files/b.img': self._image,
+                   'raw_files/missing.img': b'missing'}
+        manifest = {'package_content': [
+            {'name': '/' + name,
+             'content-type': 'application/sonata.raw_files',
+             'md5': hashlib.md5(data).hexdigest()}
+            for name, data in sorted(members.items())]}
+
+        self._package = os.path.join(self._tmp.name, 'sample.son')
+        archive = PackageArchive(self._package, policy=CompressionPolicy())
+        archive.add_bytes(self._image, 'raw_files/a.img',
+                          'application/sonata.raw_files')
+        archive.add_bytes(dump_aliases({'raw_files/b.img': 'raw_files/a.img'}),
+                          ALIASES_NAME)
+        archive.add_bytes(descriptor_io.dump(manifest).encode('utf-8'),
+                          MANIFEST_NAME)
+        archive.close()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_members(self):
+        """
+        Ensures that package content entries are listed with their
+        declared MD5 and the size of the member storing them
+        """
+        with PackageReader(self._package) as reader:
+            members = reader.members()
+
+        self.assertEqual([m['name'] for m in members],
+                         ['raw_files/a.img', 'raw_files/b.img',
+                          'raw_files/missing.img',
+                          ALIASES_NAME, MANIFEST_NAME])
+
+        a, b, missing = members[:3]
+        self.assertEqual(a['md5'], hashlib.md5(self._image).hexdigest())
+        self.assertEqual(a['size'], len(self._image))
+        self.assertEqual(b['stored_as'], 'raw_files/a.img')
+        self.assertEqual(b['size'], len(self._image))
+        self.assertIsNone(missing['size'])
+        self.assertIsNone(members[-1]['content-type'])
+
+        out = io.StringIO()
+        with PackageReader(self._package) as reader:
+            print_members(reader, file=out)
+        self.assertIn('raw_files/b.img -> raw_files/a.img', out.getvalue())
+
+    def test_open(self):
+        """
+        Ensures that members, and aliases, are read as streams
+        """
+        with PackageReader(self._package) as reader:
+            with reader.open('/raw_files/b.img') as member:
+                self.assertEqual(member.read(1024), self._image[:1024])
+
+            with reader.open('raw_files/a.img') as member:
+                self.assertEqual(member.read(), self._image)
+
+            with self.assertRaises(KeyError):
+                reader.open('raw_files/missing.img')
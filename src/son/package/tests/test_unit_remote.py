@@ -0,0 +1,166 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from son.package.remote import RemoteArtifactCache, fetch_urls
+
+
+class ArtifactHandler(BaseHTTPRequestHandler):
+
+    content = b'image' * 1024
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        ArtifactHandler.requests.append(self.path)
+        if self.path == '/missing.img':
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        if self.headers.get('If-None-Match') == ArtifactHandler.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(self.content)))
+        self.send_header('ETag', ArtifactHandler.etag)
+        self.end_headers()
+        self.wfile.write(self.content)
+
+    def log_message(self, *args):
+        pass
+
+
+class UnitRemoteArtifactTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), ArtifactHandler)
+        threading.Thread(target=self._server.serve_forever,
+                         daemon=True).start()
+        self.url = 'http://127.0.0.1:{}/'.format(self._server.server_port)
+        ArtifactHandler.content = b'image' * 1024
+        ArtifactHandler.etag = '"v1"'
+        self.md5 = hashlib.md5(ArtifactHandler.content).hexdigest()
+        ArtifactHandler.requests = []
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._tmp.cleanup()
+
+    def test_fetch_urls(self):
+        """
+        Ensures that all the URLs are fetched once and that
+        their status, size, ETag and MD5 are obtained
+        """
+        urls = [self.url + 'image{}.img'.format(i) for i in range(10)]
+        entries = fetch_urls(urls + urls + [self.url + 'missing.img'],
+                             max_requests=4)
+
+        self.assertEqual(len(ArtifactHandler.requests), 11)
+        self.assertEqual(entries[urls[3]],
+                         {'status': 200,
+                          'size': len(ArtifactHandler.content),
+                          'etag': '"v1"',
+                          'last_modified': None,
+                          'md5': self.md5})
+        self.assertEqual(entries[self.url + 'missing.img']['status'], 404)
+        self.assertIsNone(entries[self.url + 'missing.img']['md5'])
+
+        # Unavailable server
+        self.assertIsNone(fetch_urls(['http://127.0.0.1:1/image.img'])
+                          ['http://127.0.0.1:1/image.img'])
+
+    def test_cache(self):
+        """
+        Ensures that the entries are reused by following builds
+        and that expired ones are revalidated by conditional requests
+        """
+        urls = [self.url + 'image1.img', self.url + 'image2.img']
+        cache = RemoteArtifactCache(self._tmp.name)
+        cache.load()
+        fetch_urls(urls, cache=cache)
+        cache.save()
+        self.assertTrue(os.path.isfile(cache.filename))
+        self.assertEqual(len(ArtifactHandler.requests), 2)
+
+        # Following build, skips the network
+        cache = RemoteArtifactCache(self._tmp.name)
+        cache.load()
+        entries = fetch_urls(urls, cache=cache)
+        self.assertEqual(len(ArtifactHandler.requests), 2)
+        self.assertEqual(entries[urls[0]]['md5'], self.md5)
+
+        # Expired entries are revalidated, without fetching the content
+        cache = RemoteArtifactCache(self._tmp.name, ttl=-1)
+        cache.load()
+        ArtifactHandler.content = b'other' * 1024
+        entries = fetch_urls(urls, cache=cache)
+        self.assertEqual(len(ArtifactHandler.requests), 4)
+        self.assertEqual(entries[urls[0]]['md5'], self.md5)
+
+        # Changed artifacts are fetched again
+        ArtifactHandler.etag = '"v2"'
+        entries = fetch_urls(urls, cache=cache)
+        self.assertEqual(entries[urls[0]]['md5'],
+                         hashlib.md5(ArtifactHandler.content).hexdigest())
+
+    def test_concurrent_saves(self):
+        """
+        Ensures that the caches of builds run by several threads
+        keep the entries of each other when they are saved
+        """
+        caches = [RemoteArtifactCache(self._tmp.name) for _ in range(8)]
+
+        def save(i):
+            caches[i].load()
+            for j in range(20):
+                caches[i].store('{}image{}-{}.img'.format(self.url, i, j),
+                                {'status': 200, 'md5': str(j)})
+            caches[i].save()
+
+        threads = [threading.Thread(target=save, args=(i,))
+                   for i in range(len(caches))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        cache = RemoteArtifactCache(self._tmp.name)
+        cache.load()
+        for i in range(len(caches)):
+            self.assertEqual(cache.lookup(
+                '{}image{}-19.img'.format(self.url, i))['md5'], '19')
+        self.assertEqual(os.listdir(self._tmp.name),
+                         [RemoteArtifactCache.__cache_name__])
@@ -0,0 +1,127 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from son.package import staging
+
+
+class UnitStagingTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self._tmp.name, 'source')
+        self.dst = os.path.join(self._tmp.name, 'destination')
+
+        # Content spanning several copy buffers
+        self.content = os.urandom(staging.BUFFER_SIZE * 2 + 123)
+        with open(self.src, 'wb') as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _dst_content(self):
+        with open(self.dst, 'rb') as f:
+            return f.read()
+
+    def test_copy_and_hash(self):
+        """
+        Ensures that the file is copied and hashed in a single pass
+        """
+        md5 = staging.copy_and_hash(self.src, self.dst)
+        self.assertEqual(md5, hashlib.md5(self.content).hexdigest())
+        self.assertEqual(self._dst_content(), self.content)
+
+    def test_copy_file(self):
+        """
+        Ensures that the file is copied either in kernel or,
+        if not supported, in user space
+        """
+        staging.copy_file(self.src, self.dst)
+        self.assertEqual(self._dst_content(), self.content)
+
+        with patch('son.package.staging._copy_in_kernel',
+                   side_effect=OSError):
+            staging.copy_file(self.src, self.dst)
+        self.assertEqual(self._dst_content(), self.content)
+
+    def test_link_and_hash(self):
+        """
+        Ensures that in link mode the file is staged as a reflink
+        or a hard link of the source, with the hash of the source
+        """
+        with patch.object(staging, '_unsupported', set()):
+            md5, staged_as = staging.link_and_hash(
+                self.src, self.dst, staging.STAGING_LINK)
+
+        self.assertEqual(md5, hashlib.md5(self.content).hexdigest())
+        self.assertEqual(self._dst_content(), self.content)
+        self.assertIn(staged_as, (staging.STAGED_REFLINK,
+                                  staging.STAGED_HARDLINK))
+
+        # Not supported, the file is copied
+        with patch.object(staging, '_unsupported', set()), \
+                patch('son.package.staging.reflink', return_value=False), \
+                patch('os.link', side_effect=OSError):
+            md5, staged_as = staging.link_and_hash(
+                self.src, self.dst, staging.STAGING_LINK)
+        self.assertEqual(md5, hashlib.md5(self.content).hexdigest())
+        self.assertEqual(staged_as, staging.STAGED_COPY)
+        self.assertFalse(os.path.samefile(self.src, self.dst))
+
+    def test_safe_mode(self):
+        """
+        Ensures that in safe and copy modes staged
+        files never share their inode with the source
+        """
+        for mode in (staging.STAGING_SAFE, staging.STAGING_COPY):
+            with patch.object(staging, '_unsupported', set()):
+                staged_as = staging.link_or_copy(self.src, self.dst, mode)
+            self.assertIn(staged_as, staging.STAGING_METHODS[mode])
+            self.assertEqual(self._dst_content(), self.content)
+            self.assertFalse(os.path.samefile(self.src, self.dst))
+
+    def test_restage_linked_file(self):
+        """
+        Ensures that staging over a file linked to its source
+        replaces it, leaving the source unchanged
+        """
+        with patch.object(staging, '_unsupported', set()):
+            staging.link_file(self.src, self.dst, staging.STAGING_LINK)
+
+        other = os.path.join(self._tmp.name, 'other')
+        with open(other, 'wb') as f:
+            f.write(b'other content')
+
+        staging.copy_and_hash(other, self.dst)
+        staging.copy_file(other, self.dst)
+        self.assertEqual(self._dst_content(), b'other content')
+        with open(self.src, 'rb') as f:
+            self.assertEqual(f.read(), self.content)
@@ -0,0 +1,157 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from son.package.archive import PackageArchive
+from son.package.dedup import ALIASES_NAME, dump_aliases
+from son.package.delta import DELTA_MANIFEST_NAME, MANIFEST_NAME
+from son.package.verify import PackageVerifier, print_report
+from son.schema import descriptor_io
+
+
+class UnitPackageVerifierTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def create_package(self, declared, stored, aliases=None, delta=None):
+        """
+        Create a package declaring the given members,
+        which may differ from the stored ones.
+        """
+        manifest = {'package_content': [
+            {'name': '/' + name,
+             'content-type': 'application/sonata.raw_files',
+             'md5': hashlib.md5(data).hexdigest()}
+            for name, data in sorted(declared.items())]}
+
+        filename = os.path.join(self._tmp.name, 'sample.son')
+        archive = PackageArchive(filename)
+        for name, data in sorted(stored.items()):
+            archive.add_bytes(data, name)
+        if aliases:
+            archive.add_bytes(dump_aliases(aliases), ALIASES_NAME)
+        if delta:
+            archive.add_bytes(descriptor_io.dump(
+                {'package_content': delta}).encode('utf-8'),
+                DELTA_MANIFEST_NAME)
+        archive.add_bytes(descriptor_io.dump(manifest).encode('utf-8'),
+                          MANIFEST_NAME)
+        archive.close()
+        return filename
+
+    def test_verify(self):
+        """
+        Ensures that mismatched, missing and extra members are reported
+        and that the package descriptor is validated
+        """
+        image = os.urandom(100000)
+        package = self.create_package(
+            {'raw_files/a.img': image, 'raw_files/b.img': image,
+             'raw_files/changed.img': b'declared',
+             'raw_files/missing.img': b'missing'},
+            {'raw_files/a.img': image, 'raw_files/changed.img': b'stored',
+             'raw_files/extra.img': b'extra'},
+            aliases={'raw_files/b.img': 'raw_files/a.img'})
+
+        validator = MagicMock()
+        validator.validate.return_value = True
+        report = PackageVerifier(validator, jobs=2).verify(package)
+
+        status = {m['name']: m['status'] for m in report['members']}
+        self.assertEqual(status, {
+            'raw_files/a.img': PackageVerifier.STATUS_OK,
+            'raw_files/b.img': PackageVerifier.STATUS_OK,
+            'raw_files/changed.img': PackageVerifier.STATUS_MISMATCH,
+            'raw_files/missing.img': PackageVerifier.STATUS_MISSING,
+            'raw_files/extra.img': PackageVerifier.STATUS_EXTRA,
+            ALIASES_NAME: PackageVerifier.STATUS_OK,
+            MANIFEST_NAME: PackageVerifier.STATUS_OK})
+        self.assertTrue(report['valid'])
+        self.assertFalse(report['ok'])
+
+        out = io.StringIO()
+        print_report(report, file=out)
+        self.assertIn('FAILED', out.getvalue())
+
+    def test_verify_valid(self):
+        """
+        Ensures that a package matching its descriptor is only
+        reported as failed if its descriptor is invalid
+        """
+        package = self.create_package({'raw_files/a.img': b'a'},
+                                      {'raw_files/a.img': b'a'})
+        self.assertTrue(PackageVerifier().verify(package)['ok'])
+
+        validator = MagicMock()
+        validator.validate.return_value = None
+        report = PackageVerifier(validator).verify(package)
+        self.assertFalse(report['valid'])
+        self.assertFalse(report['ok'])
+
+    def test_verify_schema_unavailable(self):
+        """
+        Ensures that a package whose descriptor can not be validated,
+        as its schema can not be loaded, is reported as failed
+        """
+        package = self.create_package({'raw_files/a.img': b'a'},
+                                      {'raw_files/a.img': b'a'})
+
+        for error in (None, AssertionError, OSError):
+            validator = MagicMock()
+            validator.load_schema.return_value = None
+            validator.load_schema.side_effect = error
+            report = PackageVerifier(validator).verify(package)
+            self.assertIsNone(report['valid'])
+            self.assertFalse(report['ok'])
+            validator.validate.assert_not_called()
+
+            out = io.StringIO()
+            print_report(report, file=out)
+            self.assertIn('Package descriptor: not validated',
+                          out.getvalue())
+            self.assertIn('FAILED', out.getvalue())
+
+    def test_verify_delta(self):
+        """
+        Ensures that only the members of a delta package are verified
+        """
+        package = self.create_package(
+            {'raw_files/a.img': b'a', 'raw_files/b.img': b'b'},
+            {'raw_files/b.img': b'b'}, delta=['raw_files/b.img'])
+
+        report = PackageVerifier().verify(package)
+        self.assertTrue(report['ok'])
+        self.assertNotIn('raw_files/a.img',
+                         [m['name'] for m in report['members']])
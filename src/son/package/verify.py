@@ -0,0 +1,223 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from son.package.dedup import ALIASES_NAME
+from son.package.delta import DELTA_MANIFEST_NAME, MANIFEST_NAME, \
+    content_md5s
+from son.package.hashing import hash_stream
+from son.package.reader import PackageReader
+from son.schema import descriptor_io
+from son.schema.validator import SchemaValidator
+from son.trace import tracer
+
+log = logging.getLogger(__name__)
+
+# Members describing the package, which are not package content
+METADATA_NAMES = (MANIFEST_NAME, ALIASES_NAME, DELTA_MANIFEST_NAME)
+
+
+class PackageVerifier(object):
+    """
+    Verifies a package file against its package descriptor, reading
+    the members straight from the package. Members are hashed in
+    parallel, and the content of members stored once for several
+    package content entries (aliases) is only hashed once.
+    """
+
+    # Status of each member
+    STATUS_OK = 'ok'
+    STATUS_MISMATCH = 'mismatch'
+    STATUS_MISSING = 'missing'
+    STATUS_EXTRA = 'extra'
+
+    def __init__(self, schema_validator=None, jobs=None):
+        """
+        :param schema_validator: The SchemaValidator of the package
+                                 descriptor. If not specified, the
+                                 package descriptor is not validated.
+        :param jobs: Number of members hashed in parallel.
+                     Default is the number of CPUs.
+        """
+        self._schema_validator = schema_validator
+        self._jobs = jobs or os.cpu_count() or 1
+
+    def verify(self, filename):
+        """
+        Verify a package.
+        :param filename: The package file
+        :return: Dictionary with the 'package' file, whether the
+                 package descriptor is to be validated ('validate')
+                 and is 'valid' (None if it was not validated), the
+                 report of each member ('members') and whether the
+                 whole package is 'ok'. Each member report has the
+                 'name', 'status', expected and actual 'md5', 'size'
+                 and hashing 'duration' of the member.
+        """
+        with PackageReader(filename) as reader:
+            valid = None
+            if self._schema_validator:
+                valid = self._validate(reader.manifest)
+
+            # A delta package only holds part of the package content
+            delta = None
+            if DELTA_MANIFEST_NAME in reader:
+                with reader.open(DELTA_MANIFEST_NAME) as f:
+                    delta = set(descriptor_io.load(f)['package_content'])
+
+            declared = content_md5s(reader.manifest)
+            members = [m for m in reader.members()
+                       if delta is None or m['name'] not in declared or
+                       m['name'] in delta]
+
+            # Hash each stored member once, in parallel
+            stored = sorted({m['stored_as'] for m in members
+                             if m['name'] in declared and
+                             m['size'] is not None})
+            with ThreadPoolExecutor(max_workers=self._jobs) as executor:
+                digests = dict(zip(stored, executor.map(
+                    tracer.propagate(lambda name: _hash_member(reader, name)),
+                    stored)))
+
+        reports = [self._report(m, m['name'] in declared, digests)
+                   for m in members]
+        ok = all(r['status'] == PackageVerifier.STATUS_OK
+                 for r in reports) and \
+            (valid or self._schema_validator is None)
+
+        return {'package': filename,
+                'validate': self._schema_validator is not None,
+                'valid': valid,
+                'members': reports,
+                'ok': ok}
+
+    def _validate(self, manifest):
+        """
+        Validate the package descriptor.
+        :param manifest: The package descriptor
+        :return: Whether it is valid, None if it could not be
+                 validated because its schema could not be loaded
+        """
+        schema_id = SchemaValidator.SCHEMA_PACKAGE_DESCRIPTOR
+        try:
+            schema = self._schema_validator.load_schema(schema_id)
+
+        except (AssertionError, OSError, descriptor_io.YAMLError) as e:
+            log.debug(e)
+            schema = None
+
+        if schema is None:
+            log.error("Package descriptor not validated, unable to load "
+                      "schema '{}'".format(schema_id))
+            return
+
+        return bool(manifest) and \
+            bool(self._schema_validator.validate(manifest, schema_id))
+
+    @staticmethod
+    def _report(member, declared, digests):
+        report = {'name': member['name'],
+                  'expected': member['md5'],
+                  'md5': None,
+                  'size': member['size'],
+                  'duration': None}
+
+        if not declared:
+            if member['name'] in METADATA_NAMES:
+                report['status'] = PackageVerifier.STATUS_OK
+            else:
+                report['status'] = PackageVerifier.STATUS_EXTRA
+                log.error("Member '{}' is not in the package descriptor"
+                          .format(member['name']))
+
+        elif member['size'] is None:
+            report['status'] = PackageVerifier.STATUS_MISSING
+            log.error("Member '{}' is missing".format(member['name']))
+
+        else:
+            report['md5'], report['duration'] = \
+                digests[member['stored_as']]
+            if not member['md5'] or report['md5'] == member['md5']:
+                report['status'] = PackageVerifier.STATUS_OK
+            else:
+                report['status'] = PackageVerifier.STATUS_MISMATCH
+                log.error("Member '{}' has MD5 {}, expected {}"
+                          .format(member['name'], report['md5'],
+                                  member['md5']))
+
+        return report
+
+
+@tracer.traced(category='hashing')
+def _hash_member(reader, name):
+    tracer.annotate(member=name)
+    start = time.perf_counter()
+    with reader.open(name) as member:
+        md5 = hash_stream(member)['md5']
+    return md5, time.perf_counter() - start
+
+
+def print_report(report, file=sys.stdout):
+    """
+    Print the verification report of a package,
+    with the hashing throughput of each member.
+    """
+    members = report['members']
+    width = max([len(m['name']) for m in members] + [len('Name')])
+    row = "{:<" + str(width) + "}  {:<8}  {:>12}  {:>8}"
+
+    print(row.format("Name", "Status", "Size", "MB/s"), file=file)
+    for m in members:
+        throughput = '-'
+        if m['duration']:
+            throughput = "{:.1f}".format(
+                m['size'] / m['duration'] / (1024 * 1024))
+        print(row.format(m['name'], m['status'],
+                         '-' if m['size'] is None else m['size'],
+                         throughput), file=file)
+
+    counts = {}
+    for m in members:
+        counts[m['status']] = counts.get(m['status'], 0) + 1
+    print("\n{} members: {}".format(
+        len(members), ", ".join("{} {}".format(n, status)
+                                for status, n in sorted(counts.items()))),
+        file=file)
+
+    if report['valid'] is not None:
+        print("Package descriptor: {}".format(
+            'valid' if report['valid'] else 'invalid'), file=file)
+    elif report.get('validate'):
+        print("Package descriptor: not validated", file=file)
+
+    print("Package {}: {}".format(report['package'],
+                                  'OK' if report['ok'] else 'FAILED'),
+          file=file)
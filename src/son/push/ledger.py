@@ -0,0 +1,125 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from son.schema import descriptor_io
+
+log = logging.getLogger(__name__)
+
+# Serializes the records of the pushes run by the threads of a process
+_record_lock = threading.Lock()
+
+
+class PushLedger(object):
+    """
+    Keeps the MD5 of the packages uploaded to each platform, with the
+    response of the platform, so that a package that was already
+    uploaded is not uploaded again. Packages generated with
+    son-package --reproducible have the same MD5 as long as the
+    project does not change.
+    """
+
+    LEDGER_VERSION = "0.1"
+
+    DEFAULT_FILENAME = os.path.join(os.path.expanduser("~"),
+                                    ".son-push-ledger.yml")
+
+    def __init__(self, filename=DEFAULT_FILENAME):
+        self._filename = filename
+
+    @property
+    def filename(self):
+        return self._filename
+
+    def lookup(self, platform_url, md5):
+        """
+        Obtain the record of a package uploaded to a platform.
+        :param platform_url: The URL of the platform
+        :param md5: The MD5 of the package
+        :return: The record of the upload, with the 'package' file,
+                 the upload 'time' and the 'response' of the platform.
+                 None if the package was not uploaded.
+        """
+        return self._read().get(platform_url.rstrip('/'), {}).get(md5)
+
+    def record(self, platform_url, md5, package, response):
+        """
+        Record the upload of a package to a platform.
+        :param platform_url: The URL of the platform
+        :param md5: The MD5 of the package
+        :param package: The package file
+        :param response: The response of the platform
+        """
+        with _record_lock:
+            # Read again, other uploads may have been recorded meanwhile
+            entries = self._read()
+            entries.setdefault(platform_url.rstrip('/'), dict())[md5] = {
+                'package': os.path.abspath(package),
+                'time': time.time(),
+                'response': response}
+
+            try:
+                fd, tmp_filename = tempfile.mkstemp(
+                    dir=os.path.dirname(os.path.abspath(self._filename)),
+                    prefix=os.path.basename(self._filename) + '.')
+                try:
+                    with os.fdopen(fd, 'w') as ledger_file:
+                        descriptor_io.dump(
+                            {'version': PushLedger.LEDGER_VERSION,
+                             'entries': entries}, ledger_file)
+                    os.replace(tmp_filename, self._filename)
+
+                except OSError:
+                    os.remove(tmp_filename)
+                    raise
+
+            except OSError as e:
+                log.warning("Unable to save the push ledger '{}': {}"
+                            .format(self._filename, e))
+
+    def _read(self):
+        if not os.path.isfile(self._filename):
+            return dict()
+
+        try:
+            with open(self._filename, 'r') as ledger_file:
+                ledger = descriptor_io.load(ledger_file)
+
+        except (OSError, descriptor_io.YAMLError):
+            log.warning("Discarding invalid push ledger '{}'"
+                        .format(self._filename))
+            return dict()
+
+        if not isinstance(ledger, dict) or \
+                ledger.get('version') != PushLedger.LEDGER_VERSION:
+            return dict()
+
+        return ledger.get('entries') or dict()
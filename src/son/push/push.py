@@ -41,10 +41,15 @@ import requests
 import logging
 from json import loads
 
+from son.package.hashing import hash_file
+from son.push.ledger import PushLedger
+from son.trace import tracer
+
 log = logging.getLogger(__name__)
 
 
-def upload_package(platform_url, package_file_name):
+def upload_package(platform_url, package_file_name, ledger=None,
+                   force=False):
     """
     Upload package to platform
 
@@ -56,6 +61,14 @@ def upload_package(platform_url, package_file_name):
                               path of the package
                               to be uploaded
 
+    :param ledger: PushLedger of the uploaded packages. A
+                   package recorded in the ledger for the
+                   platform is not uploaded again, and
+                   successful uploads are recorded.
+
+    :param force: upload the package even if the
+                  ledger records it
+
     :returns: text response message of the server or
               error message
     """
@@ -70,10 +83,26 @@ def upload_package(platform_url, package_file_name):
     if not validators.url(url):
         return url, "is not a valid url."
 
+    md5 = None
+    if ledger:
+        md5 = hash_file(package_file_name)['md5']
+        record = ledger.lookup(platform_url, md5)
+        if record and not force:
+            log.info("Package '{}' (MD5 {}) was already uploaded to '{}'. "
+                     "Skipping upload.".format(package_file_name, md5,
+                                               platform_url))
+            return record['response']
+
     try:
-        with open(package_file_name, 'rb') as pkg_file:
+        with open(package_file_name, 'rb') as pkg_file, \
+                tracer.span('POST', 'http', url=url) as span:
+            span.count('bytes', os.path.getsize(package_file_name))
             r = requests.post(url, files={'package': pkg_file})
-            return r.text
+            span.annotate(status=r.status_code)
+
+        if ledger and r.ok:
+            ledger.record(platform_url, md5, package_file_name, r.text)
+        return r.text
 
     except Exception as e:
         return "Service package upload failed. " + e
@@ -103,7 +132,9 @@ def instantiate_package(platform_url, service_uuid=""):
 
         url = platform_url+"/instantiations"
 
-        r = requests.post(url, json={"service_uuid": service_uuid})
+        with tracer.span('POST', 'http', url=url) as span:
+            r = requests.post(url, json={"service_uuid": service_uuid})
+            span.annotate(status=r.status_code)
 
         return r.text
 
@@ -122,7 +153,10 @@ def _get_from_url(url):
         raise Exception(url+" is not a valid url.")
 
     try:
-        r = requests.get(url)
+        with tracer.span('GET', 'http', url=url) as span:
+            r = requests.get(url)
+            span.annotate(status=r.status_code)
+            span.count('bytes', len(r.content))
         return r.text
     except:
         raise Exception("Content cannot be downloaded from "+url)
@@ -181,12 +215,29 @@ def main():
         "-U", "--upload_package",
         help="Filename incl. path of package to be uploaded")
 
+    parser.add_argument(
+        "--ledger",
+        help="File recording the packages uploaded to each platform. "
+             "Packages already uploaded are not uploaded again. "
+             "Default is '~/.son-push-ledger.yml'",
+        default=PushLedger.DEFAULT_FILENAME)
+
+    parser.add_argument(
+        "--force",
+        help="Upload the package even if it was already uploaded",
+        action="store_true")
+
     parser.add_argument(
         "-D", "--deploy_package_uuid",
         help="UUID of package to be deployed (must be available at platform)")
 
+    tracer.add_arguments(parser)
+
     args = parser.parse_args()
 
+    if args.trace:
+        tracer.trace_to(args.trace, args.trace_format)
+
     if not args.platform_url:
         print("Platform url is required.")
 
@@ -197,7 +248,9 @@ def main():
         print(get_instances(args.platform_url))
 
     if args.upload_package:
-        print(upload_package(args.platform_url, args.upload_package))
+        print(upload_package(args.platform_url, args.upload_package,
+                             ledger=PushLedger(args.ledger),
+                             force=args.force))
 
     if args.deploy_package_uuid:
         print(instantiate_package(args.platform_url, args.deploy_package_uuid))
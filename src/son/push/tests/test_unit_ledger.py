@@ -0,0 +1,157 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from son.push.ledger import PushLedger
+from son.push.push import upload_package
+
+
+class GatekeeperHandler(BaseHTTPRequestHandler):
+
+    uploads = 0
+
+    def do_POST(self):
+        GatekeeperHandler.uploads += 1
+        self.rfile.read(int(self.headers['Content-Length']))
+        response = 'uploaded {}'.format(GatekeeperHandler.uploads).encode()
+        self.send_response(201)
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+
+class UnitPushLedgerTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self._tmp.name, 'ledger.yml')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_lookup_record(self):
+        """
+        Ensures that recorded uploads are found by platform and MD5,
+        and that the ledger is kept between instances
+        """
+        ledger = PushLedger(self.filename)
+        self.assertIsNone(ledger.lookup('http://sp1:5000', 'a' * 32))
+
+        ledger.record('http://sp1:5000/', 'a' * 32, 'p.son', 'ok')
+        record = PushLedger(self.filename).lookup('http://sp1:5000',
+                                                  'a' * 32)
+        self.assertEqual(record['package'], os.path.abspath('p.son'))
+        self.assertEqual(record['response'], 'ok')
+
+        # Each platform has its own records
+        self.assertIsNone(ledger.lookup('http://sp2:5000', 'a' * 32))
+        ledger.record('http://sp2:5000', 'a' * 32, 'p.son', 'ok2')
+        self.assertEqual(ledger.lookup('http://sp1:5000',
+                                       'a' * 32)['response'], 'ok')
+        self.assertEqual(ledger.lookup('http://sp2:5000',
+                                       'a' * 32)['response'], 'ok2')
+        self.assertIsNone(ledger.lookup('http://sp1:5000', 'b' * 32))
+
+        # Invalid ledgers are discarded
+        with open(self.filename, 'w') as ledger_file:
+            ledger_file.write('version: "0.0"\n')
+        self.assertIsNone(ledger.lookup('http://sp1:5000', 'a' * 32))
+
+    def test_concurrent_records(self):
+        """
+        Ensures that the uploads recorded by several threads
+        are all kept in the ledger
+        """
+        ledgers = [PushLedger(self.filename) for _ in range(8)]
+
+        def record(i):
+            for j in range(20):
+                ledgers[i].record('http://sp:5000', '{}-{}'.format(i, j),
+                                  'p.son', 'ok')
+
+        threads = [threading.Thread(target=record, args=(i,))
+                   for i in range(len(ledgers))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        ledger = PushLedger(self.filename)
+        for i in range(len(ledgers)):
+            for j in range(20):
+                self.assertIsNotNone(
+                    ledger.lookup('http://sp:5000', '{}-{}'.format(i, j)))
+        self.assertEqual(os.listdir(self._tmp.name), ['ledger.yml'])
+
+    def test_upload_package(self):
+        """
+        Ensures that a package recorded in the ledger is not
+        uploaded again to the same platform, unless forced
+        """
+        server = ThreadingHTTPServer(('127.0.0.1', 0), GatekeeperHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = 'http://127.0.0.1:{}'.format(server.server_port)
+        GatekeeperHandler.uploads = 0
+
+        package = os.path.join(self._tmp.name, 'p.son')
+        with open(package, 'wb') as package_file:
+            package_file.write(b'package' * 1024)
+        ledger = PushLedger(self.filename)
+
+        self.assertEqual(upload_package(url, package, ledger=ledger),
+                         'uploaded 1')
+        self.assertEqual(GatekeeperHandler.uploads, 1)
+
+        # Skipped, with the response of the recorded upload
+        self.assertEqual(upload_package(url, package, ledger=ledger),
+                         'uploaded 1')
+        self.assertEqual(GatekeeperHandler.uploads, 1)
+
+        # Forced
+        self.assertEqual(upload_package(url, package, ledger=ledger,
+                                        force=True), 'uploaded 2')
+        self.assertEqual(GatekeeperHandler.uploads, 2)
+
+        # The same platform with a trailing slash, then another package
+        self.assertEqual(upload_package(url + '/', package, ledger=ledger),
+                         'uploaded 2')
+        self.assertEqual(GatekeeperHandler.uploads, 2)
+        with open(package, 'ab') as package_file:
+            package_file.write(b'changed')
+        self.assertEqual(upload_package(url, package, ledger=ledger),
+                         'uploaded 3')
+
+        # Without ledger, always uploaded
+        self.assertEqual(upload_package(url, package), 'uploaded 4')
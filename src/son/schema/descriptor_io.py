@@ -0,0 +1,210 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+"""
+Reading and writing of YAML descriptors, e.g. service, function and
+package descriptors and workspace or project configurations.
+
+All the tools parse and generate YAML through this module. It uses
+the libyaml based loader and dumper when PyYAML is built with libyaml,
+which are several times faster than the pure Python implementation,
+and falls back to the latter otherwise. Only standard YAML tags are
+supported.
+
+Descriptor files are parsed once into Descriptor objects, which keep
+their source, digest and parsed content and are shared, by content
+digest, by all the stages of a run (validation, staging, hashing).
+"""
+
+import collections
+import hashlib
+import logging
+import threading
+
+import yaml
+
+from son.trace import tracer
+
+log = logging.getLogger(__name__)
+
+# True if the libyaml based loader and dumper are available
+LIBYAML = getattr(yaml, '__with_libyaml__', False)
+
+if LIBYAML:
+    Loader = yaml.CSafeLoader
+    Dumper = yaml.CSafeDumper
+else:
+    Loader = yaml.SafeLoader
+    Dumper = yaml.SafeDumper
+
+# Raised when a descriptor is not valid YAML
+YAMLError = yaml.YAMLError
+
+# Number of parsed descriptors kept in memory, and maximum total
+# size of their sources. Parsed descriptors take several times the
+# size of their source, so big descriptors are not kept for long.
+DESCRIPTOR_CACHE_SIZE = 1024
+DESCRIPTOR_CACHE_BYTES = 16 * 1024 * 1024
+
+_descriptors = collections.OrderedDict()
+_descriptors_lock = threading.Lock()
+_descriptors_bytes = 0
+
+
+def load(stream):
+    """
+    Parse a YAML document.
+    :param stream: The document, as a string, bytes or file object
+    :return: The parsed document
+    """
+    return yaml.load(stream, Loader=Loader)
+
+
+def dump(data, stream=None, **kwargs):
+    """
+    Generate a YAML document, in block style unless stated otherwise.
+    :param data: The document content
+    :param stream: The file object to write the document to.
+                   If not specified, the document is returned.
+    :param kwargs: Additional options of yaml.dump
+    :return: The document if no stream is given, None otherwise
+    """
+    kwargs.setdefault('default_flow_style', False)
+    return yaml.dump(data, stream, Dumper=Dumper, **kwargs)
+
+
+def load_file(filename):
+    """
+    Parse a YAML file.
+    :param filename: The file to parse
+    :return: The parsed document
+    """
+    with open(filename, 'rb') as f:
+        return load(f)
+
+
+def dump_file(data, filename, **kwargs):
+    """
+    Write a YAML file.
+    :param data: The document content
+    :param filename: The file to write
+    :param kwargs: Additional options of yaml.dump
+    """
+    with open(filename, 'w') as f:
+        dump(data, f, **kwargs)
+
+
+class Descriptor(object):
+    """
+    A descriptor parsed once. It keeps the source bytes of the
+    descriptor, their MD5 digest, the parsed content and the digested
+    content, i.e. the content dumped again in a canonical form, which
+    is generated on the first use. Descriptors are shared by all the
+    files with the same content, between threads and builds, so their
+    content must not be modified.
+    """
+
+    def __init__(self, source):
+        """
+        :param source: The content of the descriptor file, as bytes
+        """
+        self._source = source
+        self._digest = hashlib.md5(source).hexdigest()
+        self._content = load(source)
+        self._digested = None
+        self._digested_md5 = None
+
+    @property
+    def source(self):
+        return self._source
+
+    @property
+    def digest(self):
+        """The MD5 of the source of the descriptor"""
+        return self._digest
+
+    @property
+    def content(self):
+        """The parsed descriptor"""
+        return self._content
+
+    @property
+    def digested(self):
+        """The digested content of the descriptor, as bytes"""
+        if self._digested is None:
+            digested = dump(self._content).encode('utf-8')
+            self._digested_md5 = hashlib.md5(digested).hexdigest()
+            self._digested = digested
+        return self._digested
+
+    @property
+    def digested_md5(self):
+        """The MD5 of the digested content of the descriptor"""
+        if self._digested_md5 is None:
+            self.digested
+        return self._digested_md5
+
+
+@tracer.traced(category='schema')
+def load_descriptor(filename):
+    """
+    Obtain the Descriptor of a file. The file is read on every call,
+    but it is only parsed if its content was not parsed before.
+    :param filename: The descriptor file
+    :return: The Descriptor
+    """
+    with open(filename, 'rb') as f:
+        source = f.read()
+
+    tracer.annotate(file=filename)
+    tracer.count('bytes', len(source))
+
+    digest = hashlib.md5(source).hexdigest()
+    with _descriptors_lock:
+        descriptor = _descriptors.get(digest)
+        if descriptor:
+            _descriptors.move_to_end(digest)
+
+    if descriptor and descriptor.source == source:
+        log.debug("Reusing parsed descriptor '{}'".format(filename))
+        tracer.annotate(cached=True)
+        return descriptor
+
+    global _descriptors_bytes
+    descriptor = Descriptor(source)
+    with _descriptors_lock:
+        previous = _descriptors.pop(digest, None)
+        if previous:
+            _descriptors_bytes -= len(previous.source)
+        _descriptors[digest] = descriptor
+        _descriptors_bytes += len(source)
+
+        while len(_descriptors) > DESCRIPTOR_CACHE_SIZE or \
+                _descriptors_bytes > DESCRIPTOR_CACHE_BYTES:
+            _, evicted = _descriptors.popitem(last=False)
+            _descriptors_bytes -= len(evicted.source)
+
+    return descriptor
@@ -26,13 +26,15 @@
 
 import unittest
 from unittest import mock
-from son.schema.validator import load_local_schema, load_remote_schema
+from son.schema.validator import load_local_schema, load_remote_schema, \
+    SchemaValidator
+from son.workspace.workspace import Workspace
 from unittest.mock import patch
 
 
 class UnitLoadSchemaTests(unittest.TestCase):
 
-    @patch("son.schema.validator.yaml")
+    @patch("son.schema.validator.descriptor_io")
     @patch("builtins.open")
     @patch("son.schema.validator.os.path")
     def test_load_local_schema(self, m_os_path, m_open, m_yaml):
@@ -61,7 +63,7 @@ class UnitLoadSchemaTests(unittest.TestCase):
         return_dict = load_local_schema("/some/file/path")
         self.assertEqual(sample_dict, return_dict)
 
-    @patch("son.schema.validator.yaml")
+    @patch("son.schema.validator.descriptor_io")
     @patch("son.schema.validator.urllib.request.urlopen.headers."
            "get_content_charset")
     @patch("son.schema.validator.urllib.request.urlopen.read.decode")
@@ -85,3 +87,19 @@ class UnitLoadSchemaTests(unittest.TestCase):
         m_yaml.load.return_value = sample_dict
         return_dict = load_remote_schema("url")
         self.assertEqual(sample_dict, return_dict)
+
+
+class UnitValidateTests(unittest.TestCase):
+
+    def test_validate_schema_unavailable(self):
+        """
+        Ensures that a descriptor is not validated
+        when its schema can not be loaded
+        """
+        workspace = mock.MagicMock(log_level='info')
+        workspace.schemas = {
+            Workspace.CONFIG_STR_SCHEMAS_LOCAL_MASTER: '/nonexistent',
+            Workspace.CONFIG_STR_SCHEMAS_REMOTE_MASTER: 'invalid url/'}
+        validator = SchemaValidator(workspace)
+        self.assertIsNone(validator.validate(
+            {'name': 'pkg'}, SchemaValidator.SCHEMA_PACKAGE_DESCRIPTOR))
@@ -0,0 +1,127 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from son.schema import descriptor_io
+from son.schema.validator import SchemaValidator
+from son.workspace.workspace import Workspace
+
+
+class UnitDescriptorIOTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, name, content):
+        filename = os.path.join(self._tmp.name, name)
+        with open(filename, 'w') as f:
+            f.write(content)
+        return filename
+
+    def test_load_dump(self):
+        """
+        Ensures that documents are parsed and dumped in block style
+        """
+        data = descriptor_io.load("name: sample\nvdus: [vdu1, vdu2]\n")
+        self.assertEqual(data, {'name': 'sample', 'vdus': ['vdu1', 'vdu2']})
+        self.assertEqual(descriptor_io.dump(data),
+                         "name: sample\nvdus:\n- vdu1\n- vdu2\n")
+
+    def test_load_descriptor(self):
+        """
+        Ensures that a descriptor is parsed only once
+        and is digested in a canonical form
+        """
+        content = "version: '0.1'\nname: sample\n"
+        filename = self.write('vnfd.yml', content)
+        other = self.write('other.yml', content)
+
+        with patch('son.schema.descriptor_io.load',
+                   wraps=descriptor_io.load) as m_load:
+            descriptor = descriptor_io.load_descriptor(filename)
+            self.assertIs(descriptor_io.load_descriptor(other), descriptor)
+            self.assertEqual(m_load.call_count, 1)
+
+        self.assertEqual(descriptor.content,
+                         {'name': 'sample', 'version': '0.1'})
+        self.assertEqual(descriptor.digest,
+                         hashlib.md5(content.encode()).hexdigest())
+        self.assertEqual(descriptor.digested,
+                         b"name: sample\nversion: '0.1'\n")
+        self.assertEqual(descriptor.digested_md5,
+                         hashlib.md5(descriptor.digested).hexdigest())
+
+        # A changed file is parsed again
+        self.write('vnfd.yml', "name: changed\n")
+        self.assertEqual(descriptor_io.load_descriptor(filename).content,
+                         {'name': 'changed'})
+
+    @patch('son.schema.descriptor_io.DESCRIPTOR_CACHE_BYTES', 64)
+    def test_load_descriptor_cache_bytes(self):
+        """
+        Ensures that the sources of the parsed descriptors
+        kept in memory do not exceed the cache size
+        """
+        first = self.write('first.yml', "name: first\n# {}\n".format('x' * 30))
+        second = self.write('second.yml',
+                            "name: second\n# {}\n".format('x' * 30))
+
+        with patch('son.schema.descriptor_io.load',
+                   wraps=descriptor_io.load) as m_load:
+            descriptor_io.load_descriptor(first)
+            descriptor_io.load_descriptor(second)
+            descriptor_io.load_descriptor(second)
+            self.assertEqual(m_load.call_count, 2)
+
+            # Evicted to keep the second one
+            descriptor_io.load_descriptor(first)
+            self.assertEqual(m_load.call_count, 3)
+
+    @patch('son.schema.validator.jsonschema')
+    def test_validate_descriptor(self, m_jsonschema):
+        """
+        Ensures that a descriptor is validated
+        against each schema only once
+        """
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+        validator = SchemaValidator(workspace)
+        validator._schemas_library[SchemaValidator.SCHEMA_SERVICE_DESCRIPTOR] \
+            = {}
+
+        descriptor = descriptor_io.load_descriptor(
+            self.write('nsd.yml', "name: nsd\n"))
+        for i in range(3):
+            self.assertTrue(validator.validate(
+                descriptor, SchemaValidator.SCHEMA_SERVICE_DESCRIPTOR))
+
+        self.assertEqual(m_jsonschema.validate.call_count, 1)
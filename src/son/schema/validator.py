@@ -28,13 +28,15 @@ import logging
 import coloredlogs
 import validators
 import os
-import yaml
 import jsonschema
 import urllib
 from urllib.request import URLError
 from jsonschema import SchemaError
 from jsonschema import ValidationError
 from son.workspace.workspace import Workspace
+from son.schema import descriptor_io
+from son.schema.descriptor_io import Descriptor
+from son.trace import tracer
 
 log = logging.getLogger(__name__)
 
@@ -64,6 +66,9 @@ class SchemaValidator(object):
         # Keep a library of loaded schemas to avoid re-loading
         self._schemas_library = dict()
 
+        # Digests of the descriptors already validated against each schema
+        self._validated = set()
+
     def config_schema_locations(self):
         self._schemas = {
             self.SCHEMA_PACKAGE_DESCRIPTOR: {
@@ -106,6 +111,7 @@ class SchemaValidator(object):
         """
         return self._schemas[descriptor]['local']
 
+    @tracer.traced(category='schema')
     def load_schema(self, template, reload=False):
         """
         Load schema from a local file or a remote URL.
@@ -118,6 +124,8 @@ class SchemaValidator(object):
         :param reload: Force the reload, even if it was previously loaded
         :return: The loaded schema as a dictionary
         """
+        tracer.annotate(schema=template)
+
         # Check if template is already loaded and present in _schemas_library
         if template in self._schemas_library and not reload:
             log.debug("Loading previously stored schema for {}"
@@ -171,15 +179,37 @@ class SchemaValidator(object):
 
         log.error("Failed to load schema '{}'".format(template))
 
+    @tracer.traced(category='schema')
     def validate(self, descriptor, schema_id):
         """
         Validate a descriptor against a schema template
-        :param descriptor:
+        :param descriptor: The descriptor content or a Descriptor.
+                           A Descriptor is only validated once.
         :param schema_id:
         :return:
         """
+        tracer.annotate(schema=schema_id)
+        if isinstance(descriptor, Descriptor):
+            if (descriptor.digest, schema_id) in self._validated:
+                log.debug("Descriptor was previously validated against "
+                          "schema '{}'".format(schema_id))
+                tracer.annotate(cached=True)
+                return True
+
+            if not self.validate(descriptor.content, schema_id):
+                return
+
+            self._validated.add((descriptor.digest, schema_id))
+            return True
+
+        schema = self.load_schema(schema_id)
+        if schema is None:
+            log.error("Descriptor not validated, schema '{}' is not "
+                      "available".format(schema_id))
+            return
+
         try:
-            jsonschema.validate(descriptor, self.load_schema(schema_id))
+            jsonschema.validate(descriptor, schema)
             return True
 
         except ValidationError as e:
@@ -206,6 +236,16 @@ class SchemaValidator(object):
                      self.SCHEMA_SERVICE_DESCRIPTOR,
                      self.SCHEMA_FUNCTION_DESCRIPTOR}
 
+        if isinstance(descriptor, Descriptor):
+            for schema_id in templates:
+                if (descriptor.digest, schema_id) in self._validated:
+                    return schema_id
+
+            schema_id = self.get_descriptor_type(descriptor.content)
+            if schema_id:
+                self._validated.add((descriptor.digest, schema_id))
+            return schema_id
+
         # Cycle through templates until a success validation is return
         for schema_id in templates:
             try:
@@ -243,10 +283,11 @@ def write_local_schema(schemas_root, filename, schema):
         log.debug("Writing schema file '{}'".format(filename))
 
     schema_f = open(filename, 'w')
-    yaml.dump(schema, schema_f)
+    descriptor_io.dump(schema, schema_f)
     schema_f.close()
 
 
+@tracer.traced(category='schema')
 def load_local_schema(filename):
     """
     Search for a given template on the schemas folder
@@ -262,13 +303,14 @@ def load_local_schema(filename):
 
     # Read schema file and return the schema as a dictionary
     schema_f = open(filename, 'r')
-    schema = yaml.load(schema_f)
+    schema = descriptor_io.load(schema_f)
     assert isinstance(schema, dict), "Failed to load schema file '{}'. " \
                                      "Not a dictionary.".format(filename)
 
     return schema
 
 
+@tracer.traced(category='http')
 def load_remote_schema(template_url):
     """
     Retrieve a remote schema from the provided URL
@@ -277,6 +319,8 @@ def load_remote_schema(template_url):
     """
     response = urllib.request.urlopen(template_url)
     tf = response.read().decode(response.headers.get_content_charset())
-    schema = yaml.load(tf)
+    tracer.annotate(url=template_url)
+    tracer.count('bytes', len(tf))
+    schema = descriptor_io.load(tf)
     assert isinstance(schema, dict)
     return schema
@@ -0,0 +1,152 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from son.trace import tracer
+
+
+@tracer.traced(category='test')
+def stage(name, size):
+    tracer.annotate(file=name)
+    tracer.count('bytes', size)
+    return size
+
+
+class UnitTracerTests(unittest.TestCase):
+
+    def tearDown(self):
+        tracer.disable()
+
+    def test_disabled(self):
+        """
+        Ensures that nothing is recorded while tracing is disabled
+        """
+        self.assertIsNone(tracer.active())
+        with tracer.span('phase') as span:
+            span.count('bytes', 10)
+            self.assertIs(span, tracer.NULL_SPAN)
+            self.assertIsNone(tracer.current())
+
+        self.assertEqual(stage('a.img', 10), 10)
+        self.assertIs(tracer.propagate(stage), stage)
+
+    def test_nested_spans(self):
+        """
+        Ensures that spans are nested, within the same thread and
+        in worker threads, and that their counters are kept
+        """
+        t = tracer.enable()
+        with tracer.span('generate', 'packager', project='prj') as root:
+            stage('a.img', 10)
+            stage('b.img', 20)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                sizes = list(executor.map(tracer.propagate(stage),
+                                          ['c.img', 'd.img'], [30, 40]))
+
+        self.assertEqual(sizes, [30, 40])
+        spans = t.spans
+        self.assertEqual(len(spans), 5)
+        self.assertIs(spans[-1], root)
+        for span in spans[:-1]:
+            self.assertEqual(span.name, 'stage')
+            self.assertEqual(span.parent, root.id)
+            self.assertGreaterEqual(span.start, root.start)
+            self.assertLessEqual(span.end, root.end)
+        self.assertIsNone(root.parent)
+
+        summary = t.summary()
+        self.assertEqual(summary['stage']['count'], 4)
+        self.assertEqual(summary['stage']['counters'], {'bytes': 100})
+        self.assertEqual(root.args, {'project': 'prj'})
+
+    def test_shared_span(self):
+        """
+        Ensures that the counters and arguments of a span updated
+        by several worker threads at the same time are all kept
+        """
+        t = tracer.enable()
+
+        # Switch threads often, so that updates are interleaved
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6)
+
+        def download(i):
+            for _ in range(5000):
+                tracer.count('bytes', 1)
+                tracer.count('requests')
+            tracer.annotate(**{'url{}'.format(i): i})
+
+        with tracer.span('fetch', 'packager') as root:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(tracer.propagate(download), range(8)))
+
+        self.assertEqual(t.spans, [root])
+        self.assertEqual(root.counters, {'bytes': 40000,
+                                         'requests': 40000})
+        self.assertEqual(root.args,
+                         {'url{}'.format(i): i for i in range(8)})
+
+    def test_save(self):
+        """
+        Ensures that traces are saved in the Chrome
+        trace event format and as a list of spans
+        """
+        t = tracer.enable()
+        with tracer.span('generate', 'packager'):
+            stage('a.img', 10)
+            with self.assertRaises(ValueError):
+                with tracer.span('validate'):
+                    raise ValueError()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            chrome_file = os.path.join(tmp, 'trace.json')
+            t.save(chrome_file)
+            with open(chrome_file) as f:
+                events = json.load(f)['traceEvents']
+
+            json_file = os.path.join(tmp, 'spans.json')
+            t.save(json_file, tracer.FORMAT_JSON)
+            with open(json_file) as f:
+                spans = json.load(f)['spans']
+
+        complete = [e for e in events if e['ph'] == 'X']
+        self.assertEqual([e['name'] for e in complete],
+                         ['generate', 'stage', 'validate'])
+        self.assertEqual(complete[1]['args'],
+                         {'file': 'a.img', 'bytes': 10})
+        self.assertEqual(complete[2]['args'], {'error': 'ValueError'})
+        self.assertIn('thread_name', [e['name'] for e in events])
+
+        self.assertEqual([s['name'] for s in spans],
+                         ['generate', 'stage', 'validate'])
+        self.assertEqual(spans[1]['parent'], spans[0]['id'])
+        self.assertEqual(spans[1]['counters'], {'bytes': 10})
+        self.assertTrue(all(s['duration'] >= 0 for s in spans))
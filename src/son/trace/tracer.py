@@ -0,0 +1,475 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+"""
+Span based tracing of the tools, to find out where the time of a run
+is spent.
+
+A span is a timed section of the run, e.g. a phase of the packager,
+the staging of a file or an HTTP request. Spans are nested: a span
+started while another one is open in the same thread is its child,
+and functions run by worker threads may be propagated the innermost
+span of the thread that submitted them, as their parent.
+Spans also keep counters, e.g. the number of bytes they processed.
+
+Tracing is disabled unless enabled, e.g. through the --trace option
+of the tools. While disabled, span() returns a shared span that does
+nothing and traced functions are called right away, so instrumented
+code only pays for a check of the active tracer.
+
+Traces are saved as JSON, either in the Chrome trace event format
+(which can be loaded in chrome://tracing or https://ui.perfetto.dev)
+or as a list of spans with a summary by span name.
+"""
+
+import atexit
+import functools
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Formats of the saved traces
+FORMAT_CHROME = 'chrome'
+FORMAT_JSON = 'json'
+FORMATS = (FORMAT_CHROME, FORMAT_JSON)
+
+TRACE_VERSION = "0.1"
+
+# The active tracer, None while tracing is disabled
+_tracer = None
+
+
+class Span(object):
+    """
+    A timed section of a run. Spans are used as context managers,
+    times are taken from the monotonic perf_counter_ns clock.
+    The counters and arguments of a span may be updated by several
+    threads, e.g. workers sharing a propagated parent span. They are
+    replaced rather than modified, so they can be read without lock.
+    """
+
+    __slots__ = ('_tracer', '_lock', 'id', 'parent', 'name', 'category',
+                 'args', 'counters', 'thread', 'start', 'end')
+
+    def __init__(self, tracer, span_id, name, category, parent, args):
+        self._tracer = tracer
+        self._lock = threading.Lock()
+        self.id = span_id
+        self.parent = parent
+        self.name = name
+        self.category = category
+        self.args = args
+        self.counters = dict()
+        self.thread = None
+        self.start = None
+        self.end = None
+
+    @property
+    def duration(self):
+        """The duration of the span, in nanoseconds"""
+        if self.end is None:
+            return None
+        return self.end - self.start
+
+    def count(self, counter, value=1):
+        """
+        Increase a counter of the span, e.g. the bytes it processed.
+        """
+        with self._lock:
+            counters = dict(self.counters)
+            counters[counter] = counters.get(counter, 0) + value
+            self.counters = counters
+
+    def annotate(self, **args):
+        """Add arguments to the span, e.g. the file it processed"""
+        with self._lock:
+            span_args = dict(self.args)
+            span_args.update(args)
+            self.args = span_args
+
+    def __enter__(self):
+        self._tracer._push(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.annotate(error=exc_type.__name__)
+        self._tracer._pop(self)
+        return False
+
+
+class _NullSpan(object):
+    """The span used while tracing is disabled, which does nothing"""
+
+    def count(self, counter, value=1):
+        pass
+
+    def annotate(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer(object):
+    """
+    Records the spans of a run. Spans may be started and ended
+    by any thread.
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter_ns()
+        self._ids = itertools.count(1)
+        self._spans = []
+        self._threads = dict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def spans(self):
+        """The ended spans, in the order they ended"""
+        with self._lock:
+            return list(self._spans)
+
+    def span(self, name, category='', parent=None, **args):
+        """
+        Create a span, to be used as a context manager.
+        :param name: The name of the span
+        :param category: The category of the span, e.g. 'http'
+        :param parent: The parent span. Default is the innermost
+                       span open in the calling thread.
+        :param args: Arguments describing the span
+        :return: The Span
+        """
+        if parent is None:
+            parent = self.current()
+
+        with self._lock:
+            span_id = next(self._ids)
+
+        return Span(self, span_id, name, category,
+                    parent.id if parent else None, args)
+
+    def current(self):
+        """The innermost span open in the calling thread, if any"""
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    def propagate(self, function):
+        """
+        Make the innermost span open in the calling thread the
+        parent of the spans of a function run by worker threads.
+        :param function: The function given to the workers
+        :return: The function to give to the workers instead
+        """
+        parent = self.current()
+        if parent is None:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            stack = self._stack()
+            stack.append(parent)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stack.pop()
+
+        return wrapper
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _push(self, span):
+        self._stack().append(span)
+
+        thread = threading.current_thread()
+        span.thread = thread.ident
+        self._threads[thread.ident] = thread.name
+
+    def _pop(self, span):
+        stack = self._local.stack
+        if span in stack:
+            stack.remove(span)
+
+        with self._lock:
+            self._spans.append(span)
+
+    def summary(self):
+        """
+        Aggregate the spans by name.
+        :return: Dictionary with the number of spans ('count'), their
+                 total 'duration' in nanoseconds and the totals of
+                 their 'counters', by span name
+        """
+        summary = dict()
+        for span in self.spans:
+            entry = summary.setdefault(span.name, {'count': 0,
+                                                   'duration': 0,
+                                                   'counters': dict()})
+            entry['count'] += 1
+            entry['duration'] += span.duration
+            for counter, value in span.counters.items():
+                entry['counters'][counter] = \
+                    entry['counters'].get(counter, 0) + value
+
+        return summary
+
+    def to_json(self):
+        """
+        Obtain the trace as a list of spans. Times are given in
+        nanoseconds, relative to the creation of the tracer.
+        """
+        spans = sorted(self.spans, key=lambda s: (s.start, s.id))
+        return {
+            'version': TRACE_VERSION,
+            'spans': [{'id': s.id,
+                       'parent': s.parent,
+                       'name': s.name,
+                       'category': s.category,
+                       'thread': self._threads.get(s.thread),
+                       'start': s.start - self._origin,
+                       'duration': s.duration,
+                       'args': s.args,
+                       'counters': s.counters} for s in spans],
+            'summary': self.summary()}
+
+    def to_chrome_trace(self):
+        """
+        Obtain the trace in the Chrome trace event format. Each span
+        is a complete event, whose arguments include its counters.
+        """
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                   'args': {'name': name}}
+                  for tid, name in sorted(self._threads.items())]
+
+        for s in sorted(self.spans, key=lambda s: (s.start, s.id)):
+            args = dict(s.args)
+            args.update(s.counters)
+            events.append({'name': s.name,
+                           'cat': s.category,
+                           'ph': 'X',
+                           'ts': (s.start - self._origin) / 1000,
+                           'dur': s.duration / 1000,
+                           'pid': pid,
+                           'tid': s.thread,
+                           'args': args})
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, filename, fmt=FORMAT_CHROME):
+        """
+        Save the trace to a file.
+        :param filename: The trace file
+        :param fmt: The format of the trace, FORMAT_CHROME or FORMAT_JSON
+        """
+        trace = self.to_json() if fmt == FORMAT_JSON \
+            else self.to_chrome_trace()
+
+        with open(filename, 'w') as trace_file:
+            # Arguments which are not JSON types are saved as strings
+            json.dump(trace, trace_file, default=str)
+
+
+def enable():
+    """
+    Enable tracing, with a new tracer.
+    :return: The active Tracer
+    """
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def disable():
+    """
+    Disable tracing.
+    :return: The Tracer that was active, if any
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def active():
+    """The active Tracer, None if tracing is disabled"""
+    return _tracer
+
+
+def span(name, category='', parent=None, **args):
+    """
+    Create a span of the active tracer (see Tracer.span), or a span
+    that does nothing if tracing is disabled.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return NULL_SPAN
+    return tracer.span(name, category, parent, **args)
+
+
+def current():
+    """
+    The innermost span open in the calling thread, to be given as
+    the parent of the spans of worker threads. None if tracing is
+    disabled.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return None
+    return tracer.current()
+
+
+def propagate(function):
+    """
+    Make the innermost span open in the calling thread the parent of
+    the spans of a function run by worker threads (see
+    Tracer.propagate). The function is returned as it is if tracing
+    is disabled.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return function
+    return tracer.propagate(function)
+
+
+def count(counter, value=1):
+    """
+    Increase a counter of the innermost span open in the calling thread.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return
+
+    current_span = tracer.current()
+    if current_span:
+        current_span.count(counter, value)
+
+
+def annotate(**args):
+    """
+    Add arguments to the innermost span open in the calling thread.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return
+
+    current_span = tracer.current()
+    if current_span:
+        current_span.annotate(**args)
+
+
+def traced(name=None, category=''):
+    """
+    Decorator tracing each call of a function as a span.
+    :param name: The name of the spans. Default is the
+                 qualified name of the function.
+    :param category: The category of the spans
+    """
+    def decorator(function):
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return function(*args, **kwargs)
+
+            with tracer.span(span_name, category):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_to(filename, fmt=FORMAT_CHROME, name=None):
+    """
+    Trace the rest of the run, within a span named after the tool,
+    and save the trace to a file when the run ends.
+    :param filename: The trace file
+    :param fmt: The format of the trace, FORMAT_CHROME or FORMAT_JSON
+    :param name: The name of the span of the run.
+                 Default is the name of the program.
+    :return: The active Tracer
+    """
+    tracer = enable()
+    run = tracer.span(name or os.path.basename(sys.argv[0]), 'main',
+                      argv=sys.argv[1:])
+    run.__enter__()
+
+    def save():
+        run.__exit__(None, None, None)
+        try:
+            tracer.save(filename, fmt)
+            log.info("Trace saved to '{}'".format(filename))
+
+        except OSError as e:
+            log.error("Unable to save the trace '{}': {}"
+                      .format(filename, e))
+
+    atexit.register(save)
+    return tracer
+
+
+def add_arguments(parser):
+    """
+    Add the tracing options (--trace and --trace-format)
+    to the argument parser of a tool.
+    """
+    parser.add_argument(
+        "--trace",
+        help="record where the time of the run is spent, as nested "
+             "spans with their durations and byte counters, and save "
+             "it to the given file",
+        metavar="FILE",
+        required=False)
+
+    parser.add_argument(
+        "--trace-format",
+        help="format of the trace file: 'chrome' (trace event format, "
+             "for chrome://tracing or Perfetto) or 'json' (list of "
+             "spans, with a summary by span name). Default is 'chrome'",
+        choices=FORMATS,
+        default=FORMAT_CHROME,
+        required=False)
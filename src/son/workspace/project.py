@@ -28,10 +28,10 @@ import sys
 import os
 import logging
 import coloredlogs
-import yaml
 import shutil
 import pkg_resources
 
+from son.schema import descriptor_io
 
 log = logging.getLogger(__name__)
 
@@ -130,7 +130,7 @@ class Project:
 
         prj_path = os.path.join(self._prj_root, Project.__descriptor_name__)
         with open(prj_path, 'w') as prj_file:
-            prj_file.write(yaml.dump(self._prj_config))
+            prj_file.write(descriptor_io.dump(self._prj_config))
 
     def get_ns_descriptor(self):
         """
@@ -190,7 +190,7 @@ class Project:
         }
         prj_path = os.path.join(path, 'fsm.yml')
         with open(prj_path, 'w') as prj_file:
-            prj_file.write(yaml.dump(d))
+            prj_file.write(descriptor_io.dump(d))
 
     @staticmethod
     def _create_sample_ssm(path):
@@ -201,7 +201,7 @@ class Project:
         }
         prj_path = os.path.join(path, 'ssm.yml')
         with open(prj_path, 'w') as prj_file:
-            prj_file.write(yaml.dump(d))
+            prj_file.write(descriptor_io.dump(d))
 
     @staticmethod
     def _create_sample_pattern(path):
@@ -212,7 +212,7 @@ class Project:
         }
         prj_path = os.path.join(path, 'patterm.yml')
         with open(prj_path, 'w') as prj_file:
-            prj_file.write(yaml.dump(d))
+            prj_file.write(descriptor_io.dump(d))
 
     @staticmethod
     def _create_sample_vnf(path):
@@ -283,7 +283,7 @@ class Project:
                  .format(prj_filename))
 
         with open(prj_filename, 'r') as prj_file:
-            prj_config = yaml.load(prj_file)
+            prj_config = descriptor_io.load(prj_file)
 
         if not prj_config['version'] == Project.PROJECT_VERSION:
             log.warning("Reading a project configuration "
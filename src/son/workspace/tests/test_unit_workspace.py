@@ -66,7 +66,7 @@ class CreateWorkspaceTests(unittest.TestCase):
             assert '\'workspace/root/dir' in str(call)
 
     @patch('son.workspace.workspace.log')
-    @patch('son.workspace.workspace.yaml')
+    @patch('son.workspace.workspace.descriptor_io')
     @patch('builtins.open')
     @patch('son.workspace.workspace.os.path')
     def test__create_from_descriptor__(self, m_path, m_open, m_yaml, m_log):
@@ -133,7 +133,7 @@ class CreateWorkspaceTests(unittest.TestCase):
         )
 
     @patch('son.workspace.workspace.os.path')
-    @patch('son.workspace.workspace.yaml')
+    @patch('son.workspace.workspace.descriptor_io')
     @patch('builtins.open')
     def test_create_ws_descriptor(self, m_open, m_yaml, m_path):
         """
@@ -29,9 +29,10 @@ import coloredlogs
 import sys
 import os
 from os.path import expanduser
-import yaml
 
 from son.workspace.project import Project
+from son.schema import descriptor_io
+from son.trace import tracer
 
 log = logging.getLogger(__name__)
 
@@ -49,6 +50,7 @@ class Workspace:
     CONFIG_STR_CATALOGUE_NS_DIR = "ns_catalogue"
     CONFIG_STR_CATALOGUE_VNF_DIR = "vnf_catalogue"
     CONFIG_STR_CONFIG_DIR = "configuration_dir"
+    CONFIG_STR_CACHE_DIR = "cache_dir"
     CONFIG_STR_PLATFORMS_DIR = "platforms_dir"
     CONFIG_STR_PROJECTS_DIR = "projects_dir"
     CONFIG_STR_SCHEMAS_REMOTE_MASTER = "schemas_remote_master"
@@ -80,6 +82,7 @@ class Workspace:
         self.dirs[self.CONFIG_STR_CATALOGUES_DIR] = 'catalogues'
         self.dirs[self.CONFIG_STR_CONFIG_DIR] = 'configuration'
         self.dirs[self.CONFIG_STR_PLATFORMS_DIR] = 'platforms'
+        self.dirs[self.CONFIG_STR_CACHE_DIR] = 'cache'
 
         self.schemas[self.CONFIG_STR_SCHEMAS_LOCAL_MASTER] = \
             Workspace.DEFAULT_SCHEMAS_DIR
@@ -125,7 +128,7 @@ class Workspace:
                                     'personal.yml')
 
         with open(ws_file_path, 'w') as ws_file:
-            ws_file.write(yaml.dump(d, default_flow_style=False))
+            ws_file.write(descriptor_io.dump(d))
 
     def create_ws_descriptor(self):
         """
@@ -148,6 +151,9 @@ class Workspace:
                  self.CONFIG_STR_PLATFORMS_DIR:
                  self.dirs[self.CONFIG_STR_PLATFORMS_DIR],
 
+                 self.CONFIG_STR_CACHE_DIR:
+                 self.dirs[self.CONFIG_STR_CACHE_DIR],
+
                  self.CONFIG_STR_SCHEMAS_LOCAL_MASTER:
                  self.schemas[self.CONFIG_STR_SCHEMAS_LOCAL_MASTER],
 
@@ -168,7 +174,7 @@ class Workspace:
                                     Workspace.__descriptor_name__)
 
         ws_file = open(ws_file_path, 'w')
-        yaml.dump(cfg_d, ws_file, default_flow_style=False)
+        descriptor_io.dump(cfg_d, ws_file)
 
         return cfg_d
 
@@ -194,7 +200,7 @@ class Workspace:
             return None
 
         ws_file = open(ws_filename)
-        ws_config = yaml.load(ws_file)
+        ws_config = descriptor_io.load(ws_file)
 
         if not ws_config[Workspace.CONFIG_STR_VERSION] == \
                 Workspace.WORKSPACE_VERSION:
@@ -215,6 +221,11 @@ class Workspace:
         ws.dirs[Workspace.CONFIG_STR_PLATFORMS_DIR] = \
             ws_config[Workspace.CONFIG_STR_PLATFORMS_DIR]
 
+        # Optional, not present in older workspaces
+        if Workspace.CONFIG_STR_CACHE_DIR in ws_config:
+            ws.dirs[Workspace.CONFIG_STR_CACHE_DIR] = \
+                ws_config[Workspace.CONFIG_STR_CACHE_DIR]
+
         ws.schemas[Workspace.CONFIG_STR_SCHEMAS_LOCAL_MASTER] = \
             expanduser(ws_config[Workspace.CONFIG_STR_SCHEMAS_LOCAL_MASTER])
 
@@ -284,8 +295,13 @@ def main():
         required=False,
         action="store_true")
 
+    tracer.add_arguments(parser)
+
     args = parser.parse_args()
 
+    if args.trace:
+        tracer.trace_to(args.trace, args.trace_format)
+
     log_level = "INFO"
     if args.debug:
         log_level = "DEBUG"
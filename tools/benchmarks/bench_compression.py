@@ -0,0 +1,126 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+"""
+Benchmark of the parallel compression of package members.
+
+Generates a sample raw disk image with partially compressible
+content and packages it with 1 to N jobs, reporting the scaling of
+the compression. It also checks that all the generated packages
+are byte-identical.
+
+Example usage:
+
+    python tools/benchmarks/bench_compression.py --size 4 --jobs 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from son.package.archive import PackageArchive
+from son.package.compression import CompressionPolicy
+
+RAW_CONTENT_TYPE = 'application/sonata.raw_files'
+
+
+def create_sample(filename, size_gb):
+    """
+    Create a raw image made of random, zeroed and
+    repetitive blocks, similar to a disk image.
+    """
+    blocks = [os.urandom(1024 * 1024),
+              bytes(1024 * 1024),
+              os.urandom(4096) * 256]
+    with open(filename, 'wb') as f:
+        for i in range(int(size_gb * 1024)):
+            f.write(blocks[i % len(blocks)])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the parallel compression of packages")
+
+    parser.add_argument(
+        "--size", help="size in GB of the sample image. Default is 2",
+        type=float, default=2)
+
+    parser.add_argument(
+        "--jobs", help="maximum number of jobs. "
+                       "Default is the number of CPUs",
+        type=int, default=os.cpu_count())
+
+    parser.add_argument(
+        "--level", help="compression level. Default is {}"
+        .format(CompressionPolicy.DEFAULT_LEVEL),
+        type=int, default=CompressionPolicy.DEFAULT_LEVEL)
+
+    args = parser.parse_args()
+
+    policy = CompressionPolicy(
+        level=args.level,
+        modes={RAW_CONTENT_TYPE: CompressionPolicy.DEFLATE})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image = os.path.join(tmp_dir, 'sample.raw')
+        print("Generating {} GB sample image...".format(args.size))
+        create_sample(image, args.size)
+        size = os.path.getsize(image)
+
+        jobs_list = sorted({1, args.jobs} |
+                           {2 ** i for i in range(args.jobs.bit_length())
+                            if 2 ** i <= args.jobs})
+
+        print("{:>4} {:>10} {:>10} {:>8}  {}"
+              .format("jobs", "time (s)", "MB/s", "speedup", "package md5"))
+
+        base_time = None
+        digests = set()
+        for jobs in jobs_list:
+            package = os.path.join(tmp_dir, 'sample-{}.son'.format(jobs))
+            start = time.perf_counter()
+            pck = PackageArchive(package, policy=policy, jobs=jobs)
+            pck.add_file(image, 'raw_files/sample/sample.raw',
+                         RAW_CONTENT_TYPE)
+            md5 = pck.close()
+            elapsed = time.perf_counter() - start
+            os.remove(package)
+
+            base_time = base_time or elapsed
+            digests.add(md5)
+            print("{:>4} {:>10.2f} {:>10.1f} {:>8.2f}  {}"
+                  .format(jobs, elapsed, size / elapsed / 1024 / 1024,
+                          base_time / elapsed, md5))
+
+    if len(digests) != 1:
+        print("ERROR: packages differ between job counts", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+"""
+Micro-benchmark of the artifact hashing engine (son.package.hashing).
+
+Hashes a (generated or given) file with different chunk sizes and
+algorithms, and reports the throughput of each combination. The
+legacy 128-byte reader of son.package.md5 is included as a baseline.
+
+Example usage:
+
+    python tools/benchmarks/bench_hashing.py --size 4
+    python tools/benchmarks/bench_hashing.py --file disk.raw --mmap
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+from son.package.hashing import ALGORITHMS, hash_file
+
+CHUNK_SIZES = [64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024,
+               16 * 1024 * 1024]
+
+
+def create_sample(filename, size_gb):
+    block = os.urandom(1024 * 1024)
+    with open(filename, 'wb') as f:
+        for _ in range(int(size_gb * 1024)):
+            f.write(block)
+
+
+def legacy_md5(filename):
+    md5 = hashlib.md5()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(128), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def measure(label, size, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print("{:<40} {:>8.2f} s {:>10.1f} MB/s"
+          .format(label, elapsed, size / elapsed / 1024 / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the artifact hashing engine")
+
+    parser.add_argument(
+        "--file", help="file to hash. If not specified, "
+                       "a sample file is generated", required=False)
+
+    parser.add_argument(
+        "--size", help="size in GB of the generated sample file. "
+                       "Default is 2", type=float, default=2)
+
+    parser.add_argument(
+        "--mmap", help="also benchmark the mmap path",
+        action="store_true")
+
+    parser.add_argument(
+        "--legacy", help="also benchmark the legacy 128-byte reader",
+        action="store_true")
+
+    args = parser.parse_args()
+
+    tmp_dir = None
+    filename = args.file
+    if not filename:
+        tmp_dir = tempfile.TemporaryDirectory()
+        filename = os.path.join(tmp_dir.name, 'sample.img')
+        print("Generating {} GB sample file...".format(args.size))
+        create_sample(filename, args.size)
+
+    size = os.path.getsize(filename)
+    print("Hashing '{}' ({:.1f} MB)\n".format(filename, size / 1024 / 1024))
+
+    try:
+        if args.legacy:
+            measure("md5 legacy (128 B)", size, lambda: legacy_md5(filename))
+
+        for algorithm in ALGORITHMS:
+            for cs in CHUNK_SIZES:
+                measure("{} read ({} KB)".format(algorithm, cs // 1024),
+                        size, lambda: hash_file(filename, (algorithm,), cs))
+
+            if args.mmap:
+                measure("{} mmap".format(algorithm), size,
+                        lambda: hash_file(filename, (algorithm,),
+                                          use_mmap=True))
+
+        measure("md5+sha256+blake2b single read", size,
+                lambda: hash_file(filename, ALGORITHMS))
+
+    finally:
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
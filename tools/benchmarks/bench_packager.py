@@ -0,0 +1,304 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+"""
+Benchmark of the packaging pipeline on synthetic workloads.
+
+Generates a synthetic workspace and project (see
+son.package.tests.synthetic) with the given number of VNFs, VDUs,
+image sizes, directory image files and descriptor sizes, and packages
+it in several scenarios:
+
+    staging   clean build, staging the artifacts in the destination
+    direct    clean build, writing the artifacts straight to the package
+    rebuild   second build of an unchanged project, reusing the
+              artifacts staged by the first one
+
+Each build runs in a new process. The best of the repeated builds of
+each scenario is reported, with the time spent in each phase of the
+Packager, the throughput (MB/s and files/s of the project sources) and
+the peak resident memory. Results can be saved as JSON and compared
+with the results of another commit, reporting the scenarios that got
+slower than the given threshold.
+
+Example usage:
+
+    python tools/benchmarks/bench_packager.py --vnfs 8 --vdus 2 \\
+        --image-size 256 --output before.json
+    python tools/benchmarks/bench_packager.py --vnfs 8 --vdus 2 \\
+        --image-size 256 --compare before.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from son.package.tests import synthetic
+
+SCENARIOS = ('staging', 'direct', 'rebuild')
+
+RESULTS_VERSION = "0.1"
+
+# Phases of the Packager, reported in the summary table
+PHASES = ('Packager.init_package_skeleton',
+          'Packager.generate_nsd',
+          'Packager.generate_vnfds',
+          'Packager.package_ads',
+          'Packager.write_manifest',
+          'Packager.generate_package')
+
+
+def run_build(ws_root, prj_root, dst_path, **options):
+    """Run a build in a new process"""
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        return pool.apply(synthetic.benchmark_packaging,
+                          (ws_root, prj_root, dst_path), options)
+
+
+def run_scenario(scenario, tmp_dir, ws_root, prj_root, jobs, repeat):
+    """
+    Run the builds of a scenario.
+    :return: The builds, best first
+    """
+    builds = []
+    for i in range(repeat):
+        dst_path = os.path.join(tmp_dir, '{}-{}'.format(scenario, i))
+        options = {'jobs': jobs}
+        if scenario == 'direct':
+            options['direct'] = True
+        elif scenario == 'rebuild':
+            run_build(ws_root, prj_root, dst_path, **options)
+
+        builds.append(run_build(ws_root, prj_root, dst_path, **options))
+
+    return sorted(builds, key=lambda build: build['duration'])
+
+
+def source_size(prj_root):
+    """Total size of the sources of a project, in bytes"""
+    size = 0
+    for root, _, files in os.walk(os.path.join(prj_root, 'sources')):
+        for f in files:
+            size += os.path.getsize(os.path.join(root, f))
+    return size
+
+
+def git_commit():
+    """The commit of the working tree of the benchmark, if any"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))) \
+            .decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    workload = results['workload']
+    print("\nWorkload: {vnfs} VNFs x {vdus} VDUs, {image_size} MB images, "
+          "{image_files} files per image, {descriptor_size} KB "
+          "descriptors ({source_mb:.1f} MB, {files} files)"
+          .format(source_mb=workload['source_bytes'] / 1024 / 1024,
+                  **workload))
+
+    row = "{:<10} {:>4} {:>9} {:>9} {:>9} {:>9}"
+    print(row.format("scenario", "jobs", "time (s)", "MB/s", "files/s",
+                     "RSS (MB)"))
+    for scenario, r in sorted(results['scenarios'].items()):
+        print(row.format(scenario, r['jobs'],
+                         "{:.3f}".format(r['duration']),
+                         "{:.1f}".format(r['mb_per_s']),
+                         "{:.1f}".format(r['files_per_s']),
+                         "{:.1f}".format(r['peak_rss'] / 1024 / 1024)))
+
+    print("\nTime (s) by phase")
+    names = sorted(results['scenarios'])
+    row = "{:<32}" + " {:>10}" * len(names)
+    print(row.format("phase", *names))
+    for phase in PHASES:
+        print(row.format(phase, *[
+            "{:.3f}".format(results['scenarios'][name]['phases']
+                            .get(phase, {}).get('duration', 0))
+            for name in names]))
+
+
+def compare_results(results, baseline, threshold):
+    """
+    Compare the results with the baseline ones.
+    :return: The scenarios that got slower than the threshold
+    """
+    if results['workload'] != baseline['workload']:
+        print("WARNING: the baseline results are of a different workload",
+              file=sys.stderr)
+
+    print("\nComparison with {} (commit {})"
+          .format(baseline.get('time'), baseline.get('commit')))
+    row = "{:<10} {:>12} {:>12} {:>8}  {}"
+    print(row.format("scenario", "baseline (s)", "current (s)", "change",
+                     ""))
+
+    regressions = []
+    for scenario, r in sorted(results['scenarios'].items()):
+        base = baseline['scenarios'].get(scenario)
+        if not base:
+            continue
+
+        change = r['duration'] / base['duration'] - 1
+        regression = change > threshold
+        if regression:
+            regressions.append(scenario)
+        print(row.format(scenario, "{:.3f}".format(base['duration']),
+                         "{:.3f}".format(r['duration']),
+                         "{:+.1%}".format(change),
+                         "REGRESSION" if regression else ""))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the packaging of synthetic projects")
+
+    parser.add_argument(
+        "--vnfs", help="number of VNFs. Default is 4",
+        type=int, default=4)
+
+    parser.add_argument(
+        "--vdus", help="number of VDUs of each VNF. Default is 2",
+        type=int, default=2)
+
+    parser.add_argument(
+        "--image-size", help="size in MB of each image file. Default is 64",
+        type=float, default=64)
+
+    parser.add_argument(
+        "--image-files",
+        help="number of files of each VDU image. Images are single "
+             "files if 0. Default is 0",
+        type=int, default=0)
+
+    parser.add_argument(
+        "--descriptor-size",
+        help="minimum size in KB of each VNF descriptor. Default is 0",
+        type=float, default=0)
+
+    parser.add_argument(
+        "--scenarios", help="scenarios to run. Default is all of them",
+        nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+
+    parser.add_argument(
+        "--jobs", help="number of jobs of the builds. Default is 1",
+        type=int, default=1)
+
+    parser.add_argument(
+        "--repeat", help="builds of each scenario, the best one is "
+                         "reported. Default is 3",
+        type=int, default=3)
+
+    parser.add_argument(
+        "--output", help="save the results to the given JSON file")
+
+    parser.add_argument(
+        "--compare", help="compare the results with the ones saved "
+                          "in the given JSON file",
+        metavar="BASELINE")
+
+    parser.add_argument(
+        "--threshold", help="slowdown, in percent, reported as a "
+                            "regression by --compare. Default is 10",
+        type=float, default=10)
+
+    args = parser.parse_args()
+
+    workload = {'vnfs': args.vnfs,
+                'vdus': args.vdus,
+                'image_size': args.image_size,
+                'image_files': args.image_files,
+                'descriptor_size': args.descriptor_size}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ws_root = os.path.join(tmp_dir, 'ws')
+        prj_root = os.path.join(tmp_dir, 'prj')
+        print("Generating the synthetic project...")
+        ws = synthetic.create_workspace(ws_root)
+        synthetic.create_project(
+            ws, prj_root, vnfs=args.vnfs, vdus=args.vdus,
+            image_size=int(args.image_size * 1024 * 1024),
+            image_files=args.image_files,
+            descriptor_size=int(args.descriptor_size * 1024))
+        workload['source_bytes'] = source_size(prj_root)
+
+        scenarios = dict()
+        for scenario in args.scenarios:
+            print("Running scenario '{}'...".format(scenario))
+            builds = run_scenario(scenario, tmp_dir, ws_root, prj_root,
+                                  args.jobs, args.repeat)
+            best = builds[0]
+            workload['files'] = best['files']
+            scenarios[scenario] = {
+                'jobs': args.jobs,
+                'duration': best['duration'],
+                'mb_per_s': workload['source_bytes'] / best['duration'] /
+                1024 / 1024,
+                'files_per_s': best['files'] / best['duration'],
+                'peak_rss': best['peak_rss'],
+                'package_size': best['package_size'],
+                'md5': best['md5'],
+                'phases': best['phases'],
+                'runs': [build['duration'] for build in builds]}
+
+    results = {'version': RESULTS_VERSION,
+               'commit': git_commit(),
+               'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'python': platform.python_version(),
+               'cpus': os.cpu_count(),
+               'workload': workload,
+               'scenarios': scenarios}
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print("\nResults saved to '{}'".format(args.output))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare_results(results, baseline, args.threshold / 100):
+            return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+"""
+Benchmark of the parsing and generation of YAML descriptors.
+
+Generates large sample service (NSD), function (VNFD) and package
+(MANIFEST) descriptors and measures the parse and dump throughput of
+the pure Python loader/dumper and of the libyaml based ones used by
+son.schema.descriptor_io.
+
+Example usage:
+
+    python tools/benchmarks/bench_yaml.py --scale 200 --repeat 5
+"""
+
+import argparse
+import sys
+import time
+
+import yaml
+
+from son.schema import descriptor_io
+
+
+def sample_nsd(scale):
+    """Create a service descriptor with many functions and links"""
+    functions = [{'vnf_id': 'vnf_{}'.format(i),
+                  'vnf_vendor': 'eu.sonata-nfv',
+                  'vnf_name': 'vnf-sample-{}'.format(i),
+                  'vnf_version': '0.1'} for i in range(scale)]
+    links = [{'id': 'link-{}'.format(i),
+              'connectivity_type': 'E-Line',
+              'connection_points_reference':
+                  ['vnf_{}:output'.format(i), 'vnf_{}:input'.format(i + 1)]}
+             for i in range(scale)]
+    return {'descriptor_version': '1.0',
+            'vendor': 'eu.sonata-nfv.service-descriptor',
+            'name': 'sonata-sample-service',
+            'version': '0.1',
+            'author': 'SONATA',
+            'description': 'Sample service with {} functions'.format(scale),
+            'network_functions': functions,
+            'virtual_links': links}
+
+
+def sample_vnfd(scale):
+    """Create a function descriptor with many VDUs"""
+    vdus = [{'id': 'vdu{}'.format(i),
+             'vm_image': 'http://images.example.com/vdu{}.qcow2'.format(i),
+             'vm_image_format': 'qcow2',
+             'resource_requirements': {
+                 'cpu': {'vcpus': 2},
+                 'memory': {'size': 4, 'size_unit': 'GB'},
+                 'storage': {'size': 10, 'size_unit': 'GB'}},
+             'connection_points': [
+                 {'id': 'vdu{}:cp{}'.format(i, j), 'type': 'interface'}
+                 for j in range(4)]} for i in range(scale)]
+    return {'descriptor_version': 'vnfd-schema-01',
+            'vendor': 'eu.sonata-nfv',
+            'name': 'vnf-sample',
+            'version': '0.1',
+            'author': 'SONATA',
+            'description': 'Sample function with {} VDUs'.format(scale),
+            'virtual_deployment_units': vdus}
+
+
+def sample_manifest(scale):
+    """Create a package descriptor with many package contents"""
+    contents = [{'content-type': 'application/sonata.function_descriptor',
+                 'name': '/function_descriptors/vnfd-{}.yml'.format(i),
+                 'md5': '{:032x}'.format(i)} for i in range(scale * 10)]
+    return {'descriptor_version': '1.0',
+            'vendor': 'eu.sonata-nfv.package',
+            'name': 'sonata-sample-package',
+            'version': '0.1',
+            'maintainer': 'SONATA',
+            'description': 'Sample package',
+            'sealed': True,
+            'entry_service_template': '/service_descriptors/nsd.yml',
+            'package_content': contents}
+
+
+def measure(function, repeat):
+    """Best time of several runs of a function"""
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed) if best else elapsed
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the parsing and generation of descriptors")
+
+    parser.add_argument(
+        "--scale", help="number of functions/VDUs of the sample "
+                        "descriptors. Default is 100",
+        type=int, default=100)
+
+    parser.add_argument(
+        "--repeat", help="number of runs of each measure. Default is 3",
+        type=int, default=3)
+
+    args = parser.parse_args()
+
+    implementations = [('python', yaml.SafeLoader, yaml.SafeDumper)]
+    if descriptor_io.LIBYAML:
+        implementations.append(
+            ('libyaml', descriptor_io.Loader, descriptor_io.Dumper))
+    else:
+        print("libyaml is not available, "
+              "only the pure Python implementation is measured")
+
+    samples = [('NSD', sample_nsd(args.scale)),
+               ('VNFD', sample_vnfd(args.scale)),
+               ('MANIFEST', sample_manifest(args.scale))]
+
+    row = "{:<9} {:>8} {:<8} {:>10} {:>10} {:>10} {:>10}"
+    print(row.format("sample", "size KB", "impl", "parse (s)", "MB/s",
+                     "dump (s)", "MB/s"))
+
+    for name, data in samples:
+        document = descriptor_io.dump(data)
+        size = len(document.encode('utf-8'))
+        for impl, loader, dumper in implementations:
+            parse_time = measure(
+                lambda: yaml.load(document, Loader=loader), args.repeat)
+            dump_time = measure(
+                lambda: yaml.dump(data, Dumper=dumper,
+                                  default_flow_style=False), args.repeat)
+            print(row.format(
+                name, "{:.0f}".format(size / 1024), impl,
+                "{:.3f}".format(parse_time),
+                "{:.2f}".format(size / parse_time / 1024 / 1024),
+                "{:.3f}".format(dump_time),
+                "{:.2f}".format(size / dump_time / 1024 / 1024)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())